@@ -3,6 +3,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from pydantic import TypeAdapter
 
 from app.database import get_db
 from app.models import User, Agent
@@ -11,6 +12,8 @@ from app.utils import require_organization_member, raise_not_found
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
+_AGENT_SUMMARY_LIST_ADAPTER = TypeAdapter(List[AgentSummary])
+
 
 @router.get("/", response_model=List[AgentSummary])
 async def list_organization_agents(
@@ -25,21 +28,7 @@ async def list_organization_agents(
     )
     agents = result.scalars().all()
 
-    return [
-        AgentSummary(
-            id=agent.id,
-            name=agent.name,
-            type=agent.type,
-            status=agent.status,
-            success_rate=agent.success_rate,
-            total_executions=agent.total_executions,
-            avg_response_time=agent.avg_response_time,
-            training_completed=agent.training_completed,
-            is_ready=agent.is_ready,
-            created_at=agent.created_at
-        )
-        for agent in agents
-    ]
+    return _AGENT_SUMMARY_LIST_ADAPTER.validate_python(agents, from_attributes=True)
 
 
 @router.get("/{agent_id}", response_model=AgentSummary)
@@ -61,15 +50,4 @@ async def get_agent(
     if not agent:
         raise_not_found("Agent not found")
 
-    return AgentSummary(
-        id=agent.id,
-        name=agent.name,
-        type=agent.type,
-        status=agent.status,
-        success_rate=agent.success_rate,
-        total_executions=agent.total_executions,
-        avg_response_time=agent.avg_response_time,
-        training_completed=agent.training_completed,
-        is_ready=agent.is_ready,
-        created_at=agent.created_at
-    )
\ No newline at end of file
+    return AgentSummary.model_validate(agent)
\ No newline at end of file
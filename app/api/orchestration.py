@@ -17,7 +17,7 @@ from app.models.organization import Organization
 from sqlalchemy import select
 
 from app.orchestration import (
-    orchestrator_instance, template_manager,
+    orchestrator_instance, get_template_manager,
     WorkflowDefinition, WorkflowTemplate, WorkflowExecution,
     WorkflowExecutor, ExecutionMode, ExecutionPriority,
     DependencyResolver
@@ -26,6 +26,9 @@ from app.orchestration import (
 router = APIRouter(prefix="/orchestration", tags=["orchestration"])
 security = HTTPBearer()
 
+# Agentes especializados disponibles para instalar templates
+AVAILABLE_AGENTS = frozenset({"copywriter", "researcher", "scheduler", "email_responder", "data_analyzer"})
+
 
 # Request/Response Models
 class WorkflowCreateRequest(BaseModel):
@@ -187,7 +190,7 @@ async def get_workflow_visualization(
     try:
         # En implementación completa, obtener workflow de BD
         # Por ahora, usar un template como ejemplo
-        template = template_manager.get_template_by_id("content_creation")
+        template = get_template_manager().get_template_by_id("content_creation")
         if not template:
             raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -224,7 +227,7 @@ async def execute_workflow(
             raise HTTPException(status_code=404, detail="Organization not found")
 
         # Por ahora, usar template como workflow de ejemplo
-        template = template_manager.get_template_by_id(request.workflow_id)
+        template = get_template_manager().get_template_by_id(request.workflow_id)
         if not template:
             raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -362,7 +365,7 @@ async def list_templates(
 ):
     """Lista templates disponibles"""
     try:
-        templates = template_manager.get_available_templates(category)
+        templates = get_template_manager().get_available_templates(category)
 
         return [
             {
@@ -391,7 +394,7 @@ async def get_template(
 ):
     """Obtiene detalles de un template"""
     try:
-        template = template_manager.get_template_by_id(template_id)
+        template = get_template_manager().get_template_by_id(template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
 
@@ -427,7 +430,7 @@ async def install_template(
     """Instala un template creando un workflow customizado"""
     try:
         # Obtener template
-        template = template_manager.get_template_by_id(template_id)
+        template = get_template_manager().get_template_by_id(template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found")
 
@@ -440,8 +443,7 @@ async def install_template(
             raise HTTPException(status_code=404, detail="Organization not found")
 
         # Validar compatibilidad
-        available_agents = ["copywriter", "researcher", "scheduler", "email_responder", "data_analyzer"]
-        compatibility = template_manager.validate_template_compatibility(template, available_agents)
+        compatibility = get_template_manager().validate_template_compatibility(template, AVAILABLE_AGENTS)
 
         if not compatibility["compatible"]:
             raise HTTPException(
@@ -450,7 +452,7 @@ async def install_template(
             )
 
         # Instalar template
-        workflow = template_manager.install_template(
+        workflow = get_template_manager().install_template(
             template=template,
             organization_id=str(organization.id),
             customization=request.customization
@@ -484,7 +486,7 @@ async def get_template_categories(
 ):
     """Obtiene templates agrupados por categoría"""
     try:
-        categories = template_manager.get_templates_by_category()
+        categories = get_template_manager().get_templates_by_category()
 
         return {
             category: [
@@ -519,7 +521,7 @@ async def search_templates(
         if tags:
             filters["tags"] = tags.split(",")
 
-        results = template_manager.search_templates(q, filters)
+        results = get_template_manager().search_templates(q, filters)
 
         return [
             {
@@ -625,7 +627,7 @@ async def execute_workflow_stream(
             raise HTTPException(status_code=404, detail="Organization not found")
 
         # Obtener template/workflow
-        template = template_manager.get_template_by_id(request.workflow_id)
+        template = get_template_manager().get_template_by_id(request.workflow_id)
         if not template:
             raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -659,7 +661,7 @@ async def clone_workflow(
     """Clona un workflow existente"""
     try:
         # Obtener workflow original (por ahora usar template)
-        template = template_manager.get_template_by_id(workflow_id)
+        template = get_template_manager().get_template_by_id(workflow_id)
         if not template:
             raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -690,11 +692,11 @@ async def export_workflow(
 ):
     """Exporta un workflow en formato JSON"""
     try:
-        template = template_manager.get_template_by_id(workflow_id)
+        template = get_template_manager().get_template_by_id(workflow_id)
         if not template:
             raise HTTPException(status_code=404, detail="Workflow not found")
 
-        export_data = template_manager.export_template(workflow_id)
+        export_data = get_template_manager().export_template(workflow_id)
 
         return {
             "workflow_id": workflow_id,
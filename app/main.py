@@ -33,6 +33,8 @@ from app.utils.rate_limiting import limiter, rate_limit_handler
 from app.utils.security import request_validator, csp
 from app.middleware.security import SecurityMiddleware
 from app.core.cache import cache_manager
+from app.security.rate_limiter import rate_limiter
+from app.security.auth_manager import auth_manager
 from app.core.performance_monitor import performance_monitor
 from app.core.websocket_manager import connection_pool
 
@@ -99,6 +101,9 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("Performance monitoring startup failed - continuing without monitoring", error=str(e))
 
+    # Load the password hashing backend before the first login
+    await auth_manager.warmup()
+
     logger.info("AgentOS Backend started successfully")
 
     yield
@@ -129,6 +134,16 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     except Exception as e:
         logger.warning("Cache shutdown error", error=str(e))
 
+    # Close rate limiter Redis pool
+    try:
+        await rate_limiter.close()
+        logger.info("Rate limiter Redis connection closed")
+    except Exception as e:
+        logger.warning("Rate limiter shutdown error", error=str(e))
+
+    # Stop the expired-session sweep
+    auth_manager.stop_session_gc()
+
     logger.info("AgentOS Backend shutdown complete")
 
 
@@ -12,7 +12,7 @@ from .workflow_schema import (
     WorkflowVariable, WorkflowTemplate, WorkflowValidationResult
 )
 from .dependency_resolver import DependencyResolver, ExecutionGraph
-from .workflow_templates import WorkflowTemplateManager, template_manager
+from .workflow_templates import WorkflowTemplateManager, get_template_manager
 
 __all__ = [
     "AgentOrchestrator", "orchestrator_instance",
@@ -20,5 +20,12 @@ __all__ = [
     "WorkflowDefinition", "WorkflowStep", "StepCondition", "StepConnection",
     "WorkflowVariable", "WorkflowTemplate", "WorkflowValidationResult",
     "DependencyResolver", "ExecutionGraph",
-    "WorkflowTemplateManager", "template_manager"
-]
\ No newline at end of file
+    "WorkflowTemplateManager", "template_manager", "get_template_manager"
+]
+
+
+def __getattr__(name):
+    # `template_manager` se construye en el primer acceso
+    if name == "template_manager":
+        return get_template_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
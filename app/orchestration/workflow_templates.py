@@ -5,17 +5,78 @@ Sistema para gestionar templates de workflows reutilizables,
 incluyendo templates predefinidos y templates del marketplace.
 """
 
-from typing import Dict, List, Any, Optional
-import json
+from typing import AbstractSet, Dict, List, Any, Optional, Set, FrozenSet, Iterable, Tuple, Union
+import os
+import re
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
 
+import orjson
+
 from .workflow_schema import (
     WorkflowTemplate, WorkflowDefinition, WorkflowStep, WorkflowVariable,
     StepType, AgentTaskConfig, ConditionalConfig, StepConnection
 )
 
+# Tokenizador compartido por el índice y las consultas
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+
+def _uuid7() -> str:
+    """
+    Genera un UUIDv7 (RFC 9562) como string.
+
+    Los 48 bits altos son el timestamp en milisegundos, por lo que los IDs
+    generados consecutivamente quedan ordenados y contiguos en índices.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # versión 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variante RFC 4122
+    return str(uuid.UUID(int=value))
+
+
+class _TokenTrie:
+    """
+    Índice invertido sobre los tokens de los templates.
+
+    Se insertan todos los sufijos de cada token, truncados a MAX_DEPTH
+    caracteres, de modo que recorrer el trie con un fragmento devuelve los
+    templates cuyo texto contiene ese fragmento (misma semántica que la
+    búsqueda por substring). Los fragmentos más largos se buscan por sus
+    primeros MAX_DEPTH caracteres, lo que da un superconjunto que el llamador
+    confirma. Así cada token cuesta O(L * MAX_DEPTH) en vez de O(L²). Cada
+    nodo guarda su posting list de IDs de templates.
+    """
+
+    MAX_DEPTH = 8
+
+    def __init__(self):
+        self._root: Dict[str, Any] = {"children": {}, "ids": set()}
+
+    def insert(self, token: str, template_id: str) -> None:
+        """Inserta un token (y todos sus sufijos, truncados) asociado a un template"""
+        for start in range(len(token)):
+            node = self._root
+            for char in token[start:start + self.MAX_DEPTH]:
+                node = node["children"].setdefault(char, {"children": {}, "ids": set()})
+                node["ids"].add(template_id)
+
+    def lookup(self, fragment: str) -> Set[str]:
+        """
+        Devuelve los IDs de templates con algún token que contiene el fragmento
+        (o, si es más largo que MAX_DEPTH, su prefijo de MAX_DEPTH caracteres)
+        """
+        node = self._root
+        for char in fragment[:self.MAX_DEPTH]:
+            node = node["children"].get(char)
+            if node is None:
+                return set()
+        return node["ids"]
+
 
 class WorkflowTemplateManager:
     """
@@ -26,9 +87,65 @@ class WorkflowTemplateManager:
     """
 
     def __init__(self):
+        # Índices de búsqueda, mantenidos en cada registro de template
+        self._templates_by_id: Dict[str, WorkflowTemplate] = {}
+        self._search_index = _TokenTrie()
+        self._search_blob: Dict[str, str] = {}
+        self._required_agents: Dict[str, FrozenSet[str]] = {}
+        self._by_category: Dict[str, Set[str]] = {}
+        self._by_author: Dict[str, Set[str]] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+
+        # Caches de listados, invalidados por versión en cada mutación
+        self._version = 0
+        self._cached_all: Optional[Tuple[int, List[WorkflowTemplate]]] = None
+        self._cached_by_category: Optional[Tuple[int, Dict[str, List[WorkflowTemplate]]]] = None
+        self._export_cache: Dict[str, str] = {}
+
         self.built_in_templates = self._load_built_in_templates()
         self.custom_templates: Dict[str, WorkflowTemplate] = {}
 
+        for template in self.built_in_templates.values():
+            self._register_template(template)
+
+    def _register_template(self, template: WorkflowTemplate) -> None:
+        """Indexa un template para búsquedas y filtros"""
+        template_id = template.id
+        self._templates_by_id[template_id] = template
+
+        # Texto de búsqueda pre-normalizado (campos separados por \0)
+        search_blob = "\0".join([template.name, template.description, *template.tags]).lower()
+        self._search_blob[template_id] = search_blob
+
+        for token in _TOKEN_PATTERN.findall(search_blob):
+            self._search_index.insert(token, template_id)
+
+        self._required_agents[template_id] = self._compute_required_agents(template)
+
+        self._by_category.setdefault(template.category, set()).add(template_id)
+        self._by_author.setdefault(template.author, set()).add(template_id)
+        for tag in template.tags:
+            self._by_tag.setdefault(tag, set()).add(template_id)
+
+        self._export_cache.pop(template_id, None)
+        self._version += 1
+
+    @staticmethod
+    def _compute_required_agents(template: WorkflowTemplate) -> FrozenSet[str]:
+        """Extrae los tipos de agente que requiere un template"""
+        return frozenset(
+            step.agent_config.agent_type
+            for step in template.workflow_definition.steps
+            if step.agent_config
+        )
+
+    def _materialize(self, template_ids: Iterable[str]) -> List[WorkflowTemplate]:
+        """Convierte IDs indexados en templates ordenados por nombre"""
+        return sorted(
+            (self._templates_by_id[template_id] for template_id in template_ids),
+            key=lambda t: t.name
+        )
+
     def _load_built_in_templates(self) -> Dict[str, WorkflowTemplate]:
         """Carga templates predefinidos del sistema"""
         templates = {}
@@ -672,12 +789,16 @@ class WorkflowTemplateManager:
 
     def get_available_templates(self, category: Optional[str] = None) -> List[WorkflowTemplate]:
         """Obtiene templates disponibles, opcionalmente filtrados por categoría"""
-        templates = list(self.built_in_templates.values()) + list(self.custom_templates.values())
+        if self._cached_all is None or self._cached_all[0] != self._version:
+            templates = list(self.built_in_templates.values()) + list(self.custom_templates.values())
+            self._cached_all = (self._version, sorted(templates, key=lambda t: t.name))
+
+        templates = self._cached_all[1]
 
         if category:
-            templates = [t for t in templates if t.category == category]
+            return [t for t in templates if t.category == category]
 
-        return sorted(templates, key=lambda t: t.name)
+        return list(templates)
 
     def get_template_by_id(self, template_id: str) -> Optional[WorkflowTemplate]:
         """Obtiene un template específico por ID"""
@@ -766,6 +887,7 @@ class WorkflowTemplateManager:
         """
         # Crear template
         template = WorkflowTemplate(
+            id=_uuid7(),
             name=template_metadata["name"],
             description=template_metadata["description"],
             category=template_metadata.get("category", "custom"),
@@ -778,42 +900,40 @@ class WorkflowTemplateManager:
 
         # Guardar en custom templates
         self.custom_templates[template.id] = template
+        self._register_template(template)
 
         return template
 
     def validate_template_compatibility(
         self,
         template: WorkflowTemplate,
-        available_agents: List[str]
+        available_agents: Union[AbstractSet[str], Iterable[str]]
     ) -> Dict[str, Any]:
         """
         Valida que un template sea compatible con los agentes disponibles
 
         Args:
             template: Template a validar
-            available_agents: Lista de agentes disponibles
+            available_agents: Agentes disponibles (preferiblemente un set/frozenset)
 
         Returns:
             Resultado de validación con compatibilidad y requisitos faltantes
         """
-        required_agents = set()
-        missing_agents = []
+        # Agentes requeridos precalculados al registrar el template
+        required_agents = self._required_agents.get(template.id)
+        if required_agents is None:
+            required_agents = self._compute_required_agents(template)
 
-        # Extraer agentes requeridos
-        for step in template.workflow_definition.steps:
-            if step.agent_config:
-                required_agents.add(step.agent_config.agent_type)
+        if not isinstance(available_agents, (set, frozenset)):
+            available_agents = frozenset(available_agents)
 
-        # Verificar disponibilidad
-        for agent_type in required_agents:
-            if agent_type not in available_agents:
-                missing_agents.append(agent_type)
+        missing_agents = sorted(required_agents - available_agents)
 
         is_compatible = len(missing_agents) == 0
 
         return {
             "compatible": is_compatible,
-            "required_agents": list(required_agents),
+            "required_agents": sorted(required_agents),
             "missing_agents": missing_agents,
             "validation_message": (
                 "Template is compatible" if is_compatible
@@ -823,16 +943,22 @@ class WorkflowTemplateManager:
 
     def get_templates_by_category(self) -> Dict[str, List[WorkflowTemplate]]:
         """Agrupa templates por categoría"""
-        categories = {}
-        all_templates = self.get_available_templates()
+        if self._cached_by_category is None or self._cached_by_category[0] != self._version:
+            categories = {}
+            all_templates = self.get_available_templates()
 
-        for template in all_templates:
-            category = template.category or "uncategorized"
-            if category not in categories:
-                categories[category] = []
-            categories[category].append(template)
+            for template in all_templates:
+                category = template.category or "uncategorized"
+                if category not in categories:
+                    categories[category] = []
+                categories[category].append(template)
 
-        return categories
+            self._cached_by_category = (self._version, categories)
+
+        return {
+            category: list(templates)
+            for category, templates in self._cached_by_category[1].items()
+        }
 
     def search_templates(self, query: str, filters: Optional[Dict[str, Any]] = None) -> List[WorkflowTemplate]:
         """
@@ -845,64 +971,129 @@ class WorkflowTemplateManager:
         Returns:
             Lista de templates que coinciden
         """
-        templates = self.get_available_templates()
-        results = []
+        # Listado por filtros: no hay texto que comprobar
+        if not query:
+            return self._apply_filters_only(filters)
 
         query_lower = query.lower()
 
-        for template in templates:
-            # Verificar si coincide con el query
-            matches_query = (
-                query_lower in template.name.lower() or
-                query_lower in template.description.lower() or
-                any(query_lower in tag.lower() for tag in template.tags)
+        # Candidatos desde el índice invertido: intersección de posting lists
+        query_tokens = _TOKEN_PATTERN.findall(query_lower)
+        if query_tokens:
+            candidate_ids = set.intersection(
+                *(self._search_index.lookup(token) for token in query_tokens)
             )
+        else:
+            candidate_ids = set(self._templates_by_id)
+
+        if filters:
+            candidate_ids = self._apply_filters(candidate_ids, filters)
+
+        # El índice solo acota candidatos; confirmar coincidencia exacta
+        return self._materialize(
+            template_id for template_id in candidate_ids
+            if query_lower in self._search_blob[template_id]
+        )
+
+    def _apply_filters_only(self, filters: Optional[Dict[str, Any]]) -> List[WorkflowTemplate]:
+        """Resuelve una búsqueda sin texto usando solo los índices secundarios"""
+        if not filters:
+            return self.get_available_templates()
 
-            if not matches_query:
-                continue
+        # Partir de la categoría cuando existe, en lugar de todos los templates
+        if "category" in filters:
+            candidate_ids = set(self._by_category.get(filters["category"], set()))
+        else:
+            candidate_ids = set(self._templates_by_id)
 
-            # Aplicar filtros
-            if filters:
-                if "category" in filters and template.category != filters["category"]:
-                    continue
+        return self._materialize(self._apply_filters(candidate_ids, filters))
 
-                if "tags" in filters:
-                    filter_tags = filters["tags"]
-                    if isinstance(filter_tags, str):
-                        filter_tags = [filter_tags]
-                    if not any(tag in template.tags for tag in filter_tags):
-                        continue
+    def _apply_filters(self, candidate_ids: Set[str], filters: Dict[str, Any]) -> Set[str]:
+        """Aplica filtros (category, tags, author) como intersección con los índices secundarios"""
+        # Normalizar filtros una sola vez
+        filter_tags = filters.get("tags")
+        if isinstance(filter_tags, str):
+            filter_tags = frozenset([filter_tags])
+        elif filter_tags is not None:
+            filter_tags = frozenset(filter_tags)
 
-                if "author" in filters and template.author != filters["author"]:
-                    continue
+        if "category" in filters:
+            candidate_ids &= self._by_category.get(filters["category"], set())
 
-            results.append(template)
+        if filter_tags is not None:
+            tagged_ids = set()
+            for tag in filter_tags:
+                tagged_ids |= self._by_tag.get(tag, set())
+            candidate_ids &= tagged_ids
 
-        return results
+        if "author" in filters:
+            candidate_ids &= self._by_author.get(filters["author"], set())
+
+        return candidate_ids
 
     def export_template(self, template_id: str) -> str:
-        """Exporta un template a formato JSON"""
+        """Exporta un template a formato JSON (cacheado por template)"""
+        cached = self._export_cache.get(template_id)
+        if cached is not None:
+            return cached
+
         template = self.get_template_by_id(template_id)
         if not template:
             raise ValueError(f"Template {template_id} not found")
 
-        return template.json(indent=2, ensure_ascii=False)
+        payload = orjson.dumps(template.model_dump(mode="json"), option=orjson.OPT_INDENT_2).decode()
+        self._export_cache[template_id] = payload
+
+        return payload
 
-    def import_template(self, template_json: str) -> WorkflowTemplate:
+    def import_template(self, template_json: Union[str, bytes]) -> WorkflowTemplate:
         """Importa un template desde JSON"""
-        template_data = json.loads(template_json)
+        template_data = orjson.loads(template_json)
+        return self._import_template_data(template_data, datetime.now())
+
+    def import_templates(self, templates_json: Union[str, bytes]) -> List[WorkflowTemplate]:
+        """Importa un lote de templates desde un array JSON (un solo parseo)"""
+        templates_data = orjson.loads(templates_json)
+        if not isinstance(templates_data, list):
+            raise ValueError("Expected a JSON array of templates")
+
+        # Un único timestamp para todo el lote
+        imported_at = datetime.now()
+
+        return [
+            self._import_template_data(template_data, imported_at)
+            for template_data in templates_data
+        ]
+
+    def _import_template_data(self, template_data: Dict[str, Any], imported_at: datetime) -> WorkflowTemplate:
+        """Valida y registra un template ya parseado"""
         template = WorkflowTemplate.parse_obj(template_data)
 
         # Asignar nuevo ID para evitar conflictos
-        template.id = str(uuid.uuid4())
-        template.created_at = datetime.now()
-        template.updated_at = datetime.now()
+        template.id = _uuid7()
+        template.created_at = template.updated_at = imported_at
 
         # Guardar en custom templates
         self.custom_templates[template.id] = template
+        self._register_template(template)
 
         return template
 
 
-# Instancia global del template manager
-template_manager = WorkflowTemplateManager()
\ No newline at end of file
+# Instancia global del template manager, construida en el primer uso
+_template_manager: Optional[WorkflowTemplateManager] = None
+
+
+def get_template_manager() -> WorkflowTemplateManager:
+    """Obtiene el template manager global, creándolo en el primer acceso"""
+    global _template_manager
+    if _template_manager is None:
+        _template_manager = WorkflowTemplateManager()
+    return _template_manager
+
+
+def __getattr__(name: str) -> Any:
+    # Acceso diferido a `template_manager` (PEP 562) para importadores existentes
+    if name == "template_manager":
+        return get_template_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 
 
 class AgentBase(BaseModel):
@@ -62,22 +62,20 @@ class AgentInDBBase(AgentBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Agent(AgentInDBBase):
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
+
     success_rate: Optional[float] = None
     is_ready: Optional[bool] = None
     is_principal_agent: Optional[bool] = None
 
     @classmethod
     def from_orm_with_computed(cls, orm_obj):
-        agent = cls.from_orm(orm_obj)
-        agent.success_rate = orm_obj.success_rate
-        agent.is_ready = orm_obj.is_ready
-        agent.is_principal_agent = orm_obj.is_principal_agent
-        return agent
+        # Computed fields are ORM properties, read directly via from_attributes
+        return cls.model_validate(orm_obj)
 
 
 class AgentInDB(AgentInDBBase):
@@ -96,8 +94,7 @@ class AgentSummary(BaseModel):
     is_ready: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class AgentExecution(BaseModel):
@@ -113,8 +110,7 @@ class AgentExecution(BaseModel):
     cost: Optional[float] = None
     timestamp: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class AgentPerformance(BaseModel):
@@ -130,5 +126,4 @@ class AgentPerformance(BaseModel):
     most_common_topics: List[str]
     performance_trend: str  # improving, declining, stable
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from uuid import UUID
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 
 
 class OrganizationBase(BaseModel):
@@ -40,12 +40,11 @@ class OrganizationInDBBase(OrganizationBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Organization(OrganizationInDBBase):
-    pass
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class OrganizationInDB(OrganizationInDBBase):
@@ -61,8 +60,7 @@ class OrganizationSummary(BaseModel):
     plan: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="forbid")
 
 
 class OrganizationStats(BaseModel):
@@ -72,5 +70,4 @@ class OrganizationStats(BaseModel):
     success_rate: float
     avg_response_time: float
 
-    class Config:
-        from_attributes = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+"""
+Fernet backend selection for the encryption manager.
+
+Uses the Rust-native `rfernet` implementation when it is installed (much lower
+per-call overhead on short payloads) and falls back to `cryptography.fernet`.
+Both produce standard Fernet tokens, so ciphertext is interchangeable.
+"""
+
+from typing import Sequence, Union
+from cryptography.fernet import Fernet as _CryptographyFernet, InvalidToken
+
+try:
+    import rfernet as _rfernet
+except ImportError:
+    _rfernet = None
+
+
+if _rfernet is not None:
+    class Fernet:
+        """`cryptography.fernet.Fernet`-compatible wrapper around rfernet"""
+
+        def __init__(self, key: Union[bytes, str]):
+            if isinstance(key, bytes):
+                key = key.decode()
+            self._fernet = _rfernet.Fernet(key)
+
+        @staticmethod
+        def generate_key() -> bytes:
+            return _CryptographyFernet.generate_key()
+
+        def encrypt(self, data: bytes) -> bytes:
+            # rfernet tokens are str; keep cryptography's bytes interface
+            return self._fernet.encrypt(data).encode()
+
+        def decrypt(self, token: Union[bytes, str]) -> bytes:
+            try:
+                if isinstance(token, bytes):
+                    token = token.decode("ascii")
+                return self._fernet.decrypt(token)
+            except (_rfernet.DecryptionError, UnicodeDecodeError) as e:
+                raise InvalidToken from e
+
+    BACKEND = "rfernet"
+else:
+    Fernet = _CryptographyFernet
+    BACKEND = "cryptography"
+
+
+class MultiFernet:
+    """Encrypt with the first key, try each key in order on decrypt
+    (same semantics as `cryptography.fernet.MultiFernet`)"""
+
+    def __init__(self, fernets: Sequence[Fernet]):
+        fernets = list(fernets)
+        if not fernets:
+            raise ValueError("MultiFernet requires at least one Fernet instance")
+        self._fernets = fernets
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernets[0].encrypt(data)
+
+    def decrypt(self, token: Union[bytes, str]) -> bytes:
+        for fernet in self._fernets:
+            try:
+                return fernet.decrypt(token)
+            except InvalidToken:
+                pass
+        raise InvalidToken
+
+
+__all__ = ["Fernet", "MultiFernet", "InvalidToken", "BACKEND"]
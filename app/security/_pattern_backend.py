@@ -0,0 +1,98 @@
+"""
+Multi-pattern matcher backend for the sandbox code validator.
+
+Uses Hyperscan when it is installed (all patterns compiled into one
+automaton and scanned in a single pass) and falls back to a single
+alternation regex, compiled with RE2 (linear-time, no backtracking) when
+`google-re2` is installed and with `re` otherwise. All are case-insensitive
+and report which pattern matched, or None.
+"""
+
+import re
+from typing import List, Optional, Sequence
+
+try:
+    import hyperscan as _hyperscan
+except ImportError:
+    _hyperscan = None
+
+try:
+    import re2 as _re2
+except ImportError:
+    _re2 = None
+
+
+class _RegexPatternSet:
+    """All patterns fused into one alternation, one scan per search"""
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns: List[str] = list(patterns)
+        self._regex = None
+        if not self.patterns:
+            return
+
+        alternation = "(?i)" + "|".join(
+            f"(?P<p{i}>{pattern})" for i, pattern in enumerate(self.patterns)
+        )
+
+        if _re2 is not None:
+            try:
+                self._regex = _re2.compile(alternation)
+            except _re2.error:
+                # Syntax RE2 does not support; use `re`
+                pass
+
+        if self._regex is None:
+            self._regex = re.compile(alternation)
+
+    def search(self, text: str) -> Optional[str]:
+        if self._regex is None:
+            return None
+        match = self._regex.search(text)
+        if match is None:
+            return None
+        return self.patterns[int(match.lastgroup[1:])]
+
+
+if _hyperscan is not None:
+    class PatternSet:
+        """Hyperscan block-mode database over all patterns"""
+
+        def __init__(self, patterns: Sequence[str]):
+            self.patterns: List[str] = list(patterns)
+            self._db = None
+            if not self.patterns:
+                return
+
+            try:
+                db = _hyperscan.Database()
+                db.compile(
+                    expressions=[pattern.encode() for pattern in self.patterns],
+                    ids=list(range(len(self.patterns))),
+                    elements=len(self.patterns),
+                    flags=[_hyperscan.HS_FLAG_CASELESS | _hyperscan.HS_FLAG_SINGLEMATCH] * len(self.patterns)
+                )
+                self._db = db
+            except _hyperscan.error:
+                # Syntax Hyperscan does not support; use the regex fallback
+                self._fallback = _RegexPatternSet(self.patterns)
+
+        def search(self, text: str) -> Optional[str]:
+            if self._db is None:
+                return self._fallback.search(text) if self.patterns else None
+
+            matched: List[int] = []
+
+            def on_match(pattern_id, start, end, flags, context):
+                matched.append(pattern_id)
+
+            self._db.scan(text.encode(), match_event_handler=on_match)
+            return self.patterns[min(matched)] if matched else None
+
+    BACKEND = "hyperscan"
+else:
+    PatternSet = _RegexPatternSet
+    BACKEND = "re2" if _re2 is not None else "re"
+
+
+__all__ = ["PatternSet", "BACKEND"]
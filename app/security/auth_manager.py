@@ -3,35 +3,187 @@ Authentication and Authorization Manager for AgentOS
 Robust authentication with 2FA, JWT tokens, API keys, and RBAC
 """
 
-from typing import Optional, Dict, List, Tuple, Any
+from typing import Optional, Dict, List, Set, FrozenSet, Mapping, Tuple, Any
+from types import MappingProxyType
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status, Security, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
+import functools
 import secrets
+import json
 import pyotp
 import qrcode
+import qrcode.image.svg
 import io
 import base64
 import hashlib
 import hmac
 import time
 import logging
+import math
+import os
+import mmap
+import struct
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from dataclasses import dataclass, field
 from enum import Enum
+from abc import ABC, abstractmethod
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import redis.asyncio as redis
+import numpy as np
 import re
+import string
 
 logger = logging.getLogger(__name__)
 
+# Password strength patterns
+_UPPER_RE = re.compile(r'[A-Z]')
+_LOWER_RE = re.compile(r'[a-z]')
+_DIGIT_RE = re.compile(r'\d')
+_SPECIAL_RE = re.compile(r'[!@#$%^&*()_+\-=\[\]{}|;:,.<>?]')
+_REPEAT_RE = re.compile(r'(.)\1{3,}')  # 4+ repeated characters
+_SEQUENCE_RE = re.compile(r'(012|123|234|345|456|567|678|789|890|abc|bcd|cde|def)')
+
+# Password generation
+_SYSRAND = secrets.SystemRandom()
+_PASSWORD_SPECIAL_CHARS = "!@#$%^&*()_+-=[]{}|;:,.<>?"
+_PASSWORD_ALPHABET = string.ascii_letters + string.digits + _PASSWORD_SPECIAL_CHARS
+_PASSWORD_BYTE_LIMIT = 256 - 256 % len(_PASSWORD_ALPHABET)
+
+_COMMON_PASSWORDS = frozenset({
+    "password", "123456", "123456789", "qwerty", "abc123",
+    "password123", "admin", "letmein", "welcome", "monkey"
+})
+
+
+class PasswordBloomFilter:
+    """Compact membership test for large leaked-password corpora.
+
+    File layout: 12-byte header (uint64 bit count, uint32 hash count, little
+    endian) followed by the bit array. Probe positions use double hashing over a
+    single 128-bit blake2b digest. False positives only cause a password to be
+    rejected as "too common".
+    """
+
+    _HEADER = struct.Struct("<QI")
+    _PERSON = b"agentos-pwbloom"
+
+    def __init__(self, bits, num_bits: int, num_hashes: int):
+        self._bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def build(cls, passwords, error_rate: float = 0.001) -> "PasswordBloomFilter":
+        """Build filter sized for the given passwords at the target false positive rate"""
+
+        passwords = list(passwords)
+        capacity = max(1, len(passwords))
+        num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+
+        bloom = cls(bytearray((num_bits + 7) // 8), num_bits, num_hashes)
+        for password in passwords:
+            bloom.add(password)
+        return bloom
+
+    @classmethod
+    def load(cls, path: str) -> "PasswordBloomFilter":
+        """Memory-map a filter file produced by save()"""
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        num_bits, num_hashes = cls._HEADER.unpack_from(mapped)
+        return cls(memoryview(mapped)[cls._HEADER.size:], num_bits, num_hashes)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self._HEADER.pack(self.num_bits, self.num_hashes))
+            f.write(self._bits)
+
+    def _positions(self, password: str):
+        digest = hashlib.blake2b(
+            password.lower().encode(), digest_size=16, person=self._PERSON
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, password: str):
+        for pos in self._positions(password):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, password: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(password))
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _now_epoch() -> int:
+    """Current time as epoch seconds"""
+    return int(time.time())
+
+def _epoch_isoformat(epoch: int) -> str:
+    """Epoch seconds to naive UTC ISO 8601"""
+    return (_EPOCH + timedelta(seconds=epoch)).isoformat()
+
+def _utc_epoch(dt: datetime) -> float:
+    """Naive UTC datetime to epoch seconds, independent of the host timezone"""
+    return (dt - _EPOCH).total_seconds()
+
+def _from_utc_epoch(epoch: float) -> datetime:
+    """Epoch seconds to naive UTC datetime"""
+    return _EPOCH + timedelta(seconds=epoch)
+
+_FINGERPRINT_HEADERS = ("user-agent", "accept", "accept-language", "accept-encoding")
+
 class UserRole(Enum):
     ADMIN = "admin"
     USER = "user"
     VIEWER = "viewer"
     API_USER = "api_user"
 
+# RBAC permissions matrix: role -> resource -> allowed actions
+_PERMISSIONS: Mapping[UserRole, Mapping[str, FrozenSet[str]]] = MappingProxyType({
+    UserRole.ADMIN: MappingProxyType({
+        "*": frozenset({"*"})  # Admin has access to everything
+    }),
+    UserRole.USER: MappingProxyType({
+        "agents": frozenset({"read", "create", "update", "delete"}),
+        "workflows": frozenset({"read", "create", "update", "delete"}),
+        "executions": frozenset({"read", "create"}),
+        "marketplace": frozenset({"read", "publish"}),
+        "billing": frozenset({"read"}),
+        "profile": frozenset({"read", "update"}),
+        "api_keys": frozenset({"read", "create", "delete"}),
+        "sessions": frozenset({"read", "delete"})
+    }),
+    UserRole.VIEWER: MappingProxyType({
+        "agents": frozenset({"read"}),
+        "workflows": frozenset({"read"}),
+        "executions": frozenset({"read"}),
+        "marketplace": frozenset({"read"}),
+        "profile": frozenset({"read"}),
+        "billing": frozenset({"read"})
+    }),
+    UserRole.API_USER: MappingProxyType({
+        "agents": frozenset({"read", "create", "update", "delete"}),
+        "workflows": frozenset({"read", "create", "update", "delete"}),
+        "executions": frozenset({"read", "create"}),
+        "marketplace": frozenset({"read"})
+    })
+})
+_NO_PERMISSIONS: Mapping[str, FrozenSet[str]] = MappingProxyType({})
+
 class SessionStatus(Enum):
     ACTIVE = "active"
     EXPIRED = "expired"
@@ -53,6 +205,8 @@ class AuthConfig:
     require_numbers: bool = True
     require_special_chars: bool = True
     password_history_count: int = 5
+    bcrypt_rounds: int = 12  # Tune per deployment for login latency
+    common_passwords_bloom_path: Optional[str] = None  # PasswordBloomFilter file, e.g. built from HIBP
 
     # 2FA settings
     totp_issuer: str = "AgentOS"
@@ -63,6 +217,7 @@ class AuthConfig:
     max_sessions_per_user: int = 5
     session_timeout_hours: int = 24
     remember_me_days: int = 30
+    session_gc_interval_seconds: int = 60
 
     # Security settings
     max_login_attempts: int = 5
@@ -70,6 +225,13 @@ class AuthConfig:
     require_2fa_for_admin: bool = True
     force_password_change_days: int = 90
 
+    # API key lookup cache
+    api_key_cache_size: int = 10000
+    api_key_cache_ttl_seconds: int = 60
+
+    # Storage backend (None keeps auth state in process memory)
+    redis_url: Optional[str] = None
+
 @dataclass
 class LoginAttempt:
     identifier: str
@@ -85,46 +247,701 @@ class UserSession:
     user_id: str
     ip_address: str
     user_agent: str
-    created_at: datetime
-    last_activity: datetime
-    expires_at: datetime
+    # Epoch seconds (UTC)
+    created_at: int
+    last_activity: int
+    expires_at: int
     status: SessionStatus
     remember_me: bool = False
     device_fingerprint: Optional[str] = None
 
+class AuthStore(ABC):
+    """Storage backend for sessions, login attempts, one-time tokens and JWT revocation"""
+
+    # --- Sessions ---
+
+    @abstractmethod
+    async def put_session(self, session: UserSession, max_sessions: int) -> List[str]:
+        """Store session, evicting the user's least recently active sessions
+        so at most max_sessions remain. Returns the evicted session ids."""
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[UserSession]:
+        """Get session by id"""
+
+    @abstractmethod
+    async def touch_session(self, session_id: str, last_activity: int):
+        """Update session last activity"""
+
+    @abstractmethod
+    async def revoke_session(self, session_id: str) -> Optional[UserSession]:
+        """Remove session and return it, if it existed"""
+
+    @abstractmethod
+    async def get_user_session_ids(self, user_id: str) -> List[str]:
+        """Get ids of all stored sessions for a user"""
+
+    @abstractmethod
+    async def sweep_expired_sessions(self, now: int) -> List[str]:
+        """Remove sessions that expired before now (epoch seconds). Returns their ids."""
+
+    # --- JWT revocation ---
+
+    @abstractmethod
+    async def revoke_jti(self, jti: str, expiry: Optional[datetime] = None):
+        """Blacklist a JWT id until expiry (or indefinitely)"""
+
+    @abstractmethod
+    async def is_jti_revoked(self, jti: str) -> bool:
+        """Check whether a JWT id is blacklisted"""
+
+    # --- Login attempts ---
+
+    @abstractmethod
+    async def add_login_attempt(self, attempt: LoginAttempt, history: timedelta):
+        """Record login attempt, keeping `history` worth of attempts"""
+
+    @abstractmethod
+    async def add_login_failure(
+        self,
+        identifier: str,
+        ip_address: str,
+        timestamp: datetime,
+        user_window: timedelta,
+        ip_window: timedelta
+    ):
+        """Record a failed login for rate limiting by user and by IP"""
+
+    @abstractmethod
+    async def count_recent_failures(self, identifier: str, since: datetime) -> Tuple[int, Optional[datetime]]:
+        """Count failures for identifier after `since`; also returns the latest one"""
+
+    @abstractmethod
+    async def count_recent_ip_attempts(self, ip_address: str, since: datetime) -> int:
+        """Count failed attempts from IP after `since`"""
+
+    @abstractmethod
+    async def reset_failures(self, identifier: str):
+        """Forget failed attempts for identifier"""
+
+    # --- One-time tokens (password reset, email verification) ---
+
+    @abstractmethod
+    async def put_token(self, kind: str, token: str, data: Dict[str, Any], ttl: timedelta):
+        """Store token data for ttl"""
+
+    @abstractmethod
+    async def get_token(self, kind: str, token: str) -> Optional[Dict[str, Any]]:
+        """Get token data"""
+
+    @abstractmethod
+    async def update_token(self, kind: str, token: str, updates: Dict[str, Any]):
+        """Update fields of stored token data, keeping its ttl"""
+
+    @abstractmethod
+    async def delete_token(self, kind: str, token: str):
+        """Delete token"""
+
+
+class InMemoryAuthStore(AuthStore):
+    """Process-local store (single worker / development)"""
+
+    _INITIAL_SLOTS = 1024
+    _SLOT_FREE = np.iinfo(np.int64).max
+
+    def __init__(self):
+        self.active_sessions: Dict[str, UserSession] = {}
+        self.sessions_by_user: Dict[str, Set[str]] = {}
+        self.revoked_jtis: Dict[str, Optional[datetime]] = {}
+        self.login_attempts: deque = deque()  # LoginAttempt, oldest first
+        self.login_attempts_by_ip: Dict[str, deque] = {}
+        self.failed_attempts_by_user: Dict[str, deque] = {}
+        self.tokens: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        # Session expiries as a flat int64 array (epoch seconds) so sweeps are a
+        # single vectorized compare; free slots hold _SLOT_FREE and never match
+        self._expires_epoch = np.full(self._INITIAL_SLOTS, self._SLOT_FREE, dtype=np.int64)
+        self._slot_session_ids = np.empty(self._INITIAL_SLOTS, dtype=object)
+        self._slot_by_session: Dict[str, int] = {}
+        self._free_slots: List[int] = list(range(self._INITIAL_SLOTS - 1, -1, -1))
+
+        # Guards for the stores above; never held across an await
+        self._sessions_lock = asyncio.Lock()
+        self._attempts_lock = asyncio.Lock()
+
+    # --- Sessions ---
+
+    async def put_session(self, session: UserSession, max_sessions: int) -> List[str]:
+        async with self._sessions_lock:
+            evicted = self._cleanup_user_sessions(session.user_id, max_sessions)
+
+            self.active_sessions[session.session_id] = session
+            self.sessions_by_user.setdefault(session.user_id, set()).add(session.session_id)
+            self._assign_slot(session)
+
+        return evicted
+
+    async def get_session(self, session_id: str) -> Optional[UserSession]:
+        return self.active_sessions.get(session_id)
+
+    async def touch_session(self, session_id: str, last_activity: int):
+        session = self.active_sessions.get(session_id)
+        if session:
+            session.last_activity = last_activity
+
+    async def revoke_session(self, session_id: str) -> Optional[UserSession]:
+        async with self._sessions_lock:
+            return self._remove_session(session_id)
+
+    async def get_user_session_ids(self, user_id: str) -> List[str]:
+        return list(self.sessions_by_user.get(user_id, ()))
+
+    async def sweep_expired_sessions(self, now: int) -> List[str]:
+        async with self._sessions_lock:
+            expired_slots = np.flatnonzero(self._expires_epoch < now)
+            expired = [self._slot_session_ids[slot] for slot in expired_slots]
+
+            for session_id in expired:
+                self.active_sessions[session_id].status = SessionStatus.EXPIRED
+                self._remove_session(session_id)
+
+        return expired
+
+    def _assign_slot(self, session: UserSession):
+        """Record session expiry in the slot arrays, growing them if full"""
+
+        if not self._free_slots:
+            size = len(self._expires_epoch)
+            self._expires_epoch = np.concatenate(
+                (self._expires_epoch, np.full(size, self._SLOT_FREE, dtype=np.int64))
+            )
+            self._slot_session_ids = np.concatenate(
+                (self._slot_session_ids, np.empty(size, dtype=object))
+            )
+            self._free_slots.extend(range(2 * size - 1, size - 1, -1))
+
+        slot = self._free_slots.pop()
+        self._expires_epoch[slot] = session.expires_at
+        self._slot_session_ids[slot] = session.session_id
+        self._slot_by_session[session.session_id] = slot
+
+    def _cleanup_user_sessions(self, user_id: str, max_sessions: int) -> List[str]:
+        """Evict oldest sessions for user to stay within limit (caller holds _sessions_lock)"""
+
+        user_sessions = [
+            (session_id, self.active_sessions[session_id])
+            for session_id in self.sessions_by_user.get(user_id, ())
+            if self.active_sessions[session_id].status == SessionStatus.ACTIVE
+        ]
+
+        evicted = []
+
+        if len(user_sessions) >= max_sessions:
+            # Sort by last activity and remove oldest
+            user_sessions.sort(key=lambda x: x[1].last_activity)
+
+            sessions_to_remove = len(user_sessions) - max_sessions + 1
+
+            for i in range(sessions_to_remove):
+                session_id, session = user_sessions[i]
+                session.status = SessionStatus.REVOKED
+                self._remove_session(session_id)
+                evicted.append(session_id)
+
+        return evicted
+
+    def _remove_session(self, session_id: str) -> Optional[UserSession]:
+        """Remove session from active_sessions and the per-user index (caller holds _sessions_lock)"""
+
+        session = self.active_sessions.pop(session_id, None)
+        if not session:
+            return None
+
+        slot = self._slot_by_session.pop(session_id)
+        self._expires_epoch[slot] = self._SLOT_FREE
+        self._slot_session_ids[slot] = None
+        self._free_slots.append(slot)
+
+        user_session_ids = self.sessions_by_user.get(session.user_id)
+        if user_session_ids is not None:
+            user_session_ids.discard(session_id)
+            if not user_session_ids:
+                del self.sessions_by_user[session.user_id]
+
+        return session
+
+    # --- JWT revocation ---
+
+    async def revoke_jti(self, jti: str, expiry: Optional[datetime] = None):
+        self.revoked_jtis[jti] = expiry
+
+    async def is_jti_revoked(self, jti: str) -> bool:
+        if jti not in self.revoked_jtis:
+            return False
+
+        expiry = self.revoked_jtis[jti]
+        if expiry and datetime.utcnow() > expiry:
+            # Token has expired on its own; no need to keep blacklisting it
+            del self.revoked_jtis[jti]
+            return False
+
+        return True
+
+    # --- Login attempts ---
+
+    async def add_login_attempt(self, attempt: LoginAttempt, history: timedelta):
+        async with self._attempts_lock:
+            self.login_attempts.append(attempt)
+
+            # Attempts are appended in time order
+            cutoff = datetime.utcnow() - history
+            while self.login_attempts and self.login_attempts[0].timestamp <= cutoff:
+                self.login_attempts.popleft()
+
+    async def add_login_failure(
+        self,
+        identifier: str,
+        ip_address: str,
+        timestamp: datetime,
+        user_window: timedelta,
+        ip_window: timedelta
+    ):
+        async with self._attempts_lock:
+            # Track by IP
+            if ip_address not in self.login_attempts_by_ip:
+                self.login_attempts_by_ip[ip_address] = deque()
+            ip_attempts = self.login_attempts_by_ip[ip_address]
+            ip_attempts.append(timestamp)
+            self._drop_older_than(ip_attempts, timestamp - ip_window)
+
+            # Track by user
+            if identifier not in self.failed_attempts_by_user:
+                self.failed_attempts_by_user[identifier] = deque()
+            user_failures = self.failed_attempts_by_user[identifier]
+            user_failures.append(timestamp)
+            self._drop_older_than(user_failures, timestamp - user_window)
+
+    async def count_recent_failures(self, identifier: str, since: datetime) -> Tuple[int, Optional[datetime]]:
+        if identifier not in self.failed_attempts_by_user:
+            return 0, None
+
+        # Failures are appended in time order: prune the head, newest is last
+        async with self._attempts_lock:
+            user_failures = self.failed_attempts_by_user.get(identifier, ())
+            if user_failures:
+                self._drop_older_than(user_failures, since)
+
+            if not user_failures:
+                return 0, None
+
+            return len(user_failures), user_failures[-1]
+
+    async def count_recent_ip_attempts(self, ip_address: str, since: datetime) -> int:
+        if ip_address not in self.login_attempts_by_ip:
+            return 0
+
+        async with self._attempts_lock:
+            ip_attempts = self.login_attempts_by_ip.get(ip_address, ())
+            if ip_attempts:
+                self._drop_older_than(ip_attempts, since)
+
+            return len(ip_attempts)
+
+    async def reset_failures(self, identifier: str):
+        async with self._attempts_lock:
+            self.failed_attempts_by_user.pop(identifier, None)
+
+    @staticmethod
+    def _drop_older_than(timestamps: deque, cutoff: datetime):
+        """Pop timestamps at or before cutoff from the head of a time-ordered deque"""
+
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+
+    # --- One-time tokens ---
+
+    async def put_token(self, kind: str, token: str, data: Dict[str, Any], ttl: timedelta):
+        self.tokens.setdefault(kind, {})[token] = data
+
+    async def get_token(self, kind: str, token: str) -> Optional[Dict[str, Any]]:
+        return self.tokens.get(kind, {}).get(token)
+
+    async def update_token(self, kind: str, token: str, updates: Dict[str, Any]):
+        token_data = self.tokens.get(kind, {}).get(token)
+        if token_data is not None:
+            token_data.update(updates)
+
+    async def delete_token(self, kind: str, token: str):
+        self.tokens.get(kind, {}).pop(token, None)
+
+
+# Update a session's last activity only while its hash exists, so a session
+# that expired meanwhile isn't resurrected without a TTL; HSET keeps the TTL.
+# KEYS: session key; ARGV: last activity
+_TOUCH_SESSION_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], 'last_activity', ARGV[1])
+end
+return 0
+"""
+
+
+class RedisAuthStore(AuthStore):
+    """Redis-backed store shared by all workers; expiry is delegated to Redis TTLs"""
+
+    _DATETIME_FIELDS = ("created_at", "expires_at")
+
+    def __init__(self, redis_url: str = "redis://localhost:6379"):
+        self.redis_url = redis_url
+        self._redis_client = None
+        self._touch_session_script = None
+
+    async def get_redis(self) -> redis.Redis:
+        """Get or create Redis connection"""
+        if not self._redis_client:
+            self._redis_client = redis.from_url(
+                self.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_keepalive=True,
+                health_check_interval=30
+            )
+            self._touch_session_script = self._redis_client.register_script(_TOUCH_SESSION_LUA)
+        return self._redis_client
+
+    # --- Sessions ---
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    @staticmethod
+    def _user_sessions_key(user_id: str) -> str:
+        return f"user_sessions:{user_id}"
+
+    @staticmethod
+    def _serialize_session(session: UserSession) -> Dict[str, str]:
+        return {
+            "session_id": session.session_id,
+            "user_id": session.user_id,
+            "ip_address": session.ip_address,
+            "user_agent": session.user_agent,
+            "created_at": str(session.created_at),
+            "last_activity": str(session.last_activity),
+            "expires_at": str(session.expires_at),
+            "status": session.status.value,
+            "remember_me": "1" if session.remember_me else "0",
+            "device_fingerprint": session.device_fingerprint or ""
+        }
+
+    @staticmethod
+    def _deserialize_session(data: Dict[str, str]) -> UserSession:
+        return UserSession(
+            session_id=data["session_id"],
+            user_id=data["user_id"],
+            ip_address=data["ip_address"],
+            user_agent=data["user_agent"],
+            created_at=int(data["created_at"]),
+            last_activity=int(data["last_activity"]),
+            expires_at=int(data["expires_at"]),
+            status=SessionStatus(data["status"]),
+            remember_me=data["remember_me"] == "1",
+            device_fingerprint=data["device_fingerprint"] or None
+        )
+
+    @staticmethod
+    def _ttl_seconds(expires_at: datetime) -> int:
+        return max(1, int((expires_at - datetime.utcnow()).total_seconds()))
+
+    async def put_session(self, session: UserSession, max_sessions: int) -> List[str]:
+        r = await self.get_redis()
+        user_key = self._user_sessions_key(session.user_id)
+
+        # Load the user's current sessions; ids whose hash expired are stale
+        session_ids = list(await r.smembers(user_key))
+        pipe = r.pipeline()
+        for session_id in session_ids:
+            pipe.hget(self._session_key(session_id), "last_activity")
+        pipe.ttl(user_key)
+        *last_activities, index_ttl = await pipe.execute()
+
+        live = [
+            (int(last_activity), session_id)
+            for session_id, last_activity in zip(session_ids, last_activities)
+            if last_activity
+        ]
+        stale = [
+            session_id
+            for session_id, last_activity in zip(session_ids, last_activities)
+            if not last_activity
+        ]
+
+        evicted = []
+        if len(live) >= max_sessions:
+            # Remove least recently active
+            live.sort()
+            evicted = [session_id for _, session_id in live[:len(live) - max_sessions + 1]]
+
+        ttl = max(1, session.expires_at - _now_epoch())
+
+        pipe = r.pipeline()
+        for session_id in evicted:
+            pipe.delete(self._session_key(session_id))
+        if evicted or stale:
+            pipe.srem(user_key, *(evicted + stale))
+        pipe.hset(self._session_key(session.session_id), mapping=self._serialize_session(session))
+        pipe.expire(self._session_key(session.session_id), ttl)
+        pipe.sadd(user_key, session.session_id)
+        # The index lives as long as the longest session it references
+        if ttl > index_ttl:
+            pipe.expire(user_key, ttl)
+        await pipe.execute()
+
+        return evicted
+
+    async def get_session(self, session_id: str) -> Optional[UserSession]:
+        r = await self.get_redis()
+        data = await r.hgetall(self._session_key(session_id))
+        if not data:
+            return None
+        return self._deserialize_session(data)
+
+    async def touch_session(self, session_id: str, last_activity: int):
+        await self.get_redis()
+        await self._touch_session_script(keys=[self._session_key(session_id)], args=[last_activity])
+
+    async def revoke_session(self, session_id: str) -> Optional[UserSession]:
+        session = await self.get_session(session_id)
+        if not session:
+            return None
+
+        r = await self.get_redis()
+        pipe = r.pipeline()
+        pipe.delete(self._session_key(session_id))
+        pipe.srem(self._user_sessions_key(session.user_id), session_id)
+        await pipe.execute()
+
+        return session
+
+    async def get_user_session_ids(self, user_id: str) -> List[str]:
+        r = await self.get_redis()
+        return list(await r.smembers(self._user_sessions_key(user_id)))
+
+    async def sweep_expired_sessions(self, now: int) -> List[str]:
+        # Session hashes carry their own TTL
+        return []
+
+    # --- JWT revocation ---
+
+    async def revoke_jti(self, jti: str, expiry: Optional[datetime] = None):
+        r = await self.get_redis()
+        key = f"jti:{jti}"
+
+        if expiry:
+            await r.setex(key, self._ttl_seconds(expiry), 1)
+        else:
+            await r.set(key, 1)
+
+    async def is_jti_revoked(self, jti: str) -> bool:
+        r = await self.get_redis()
+        return bool(await r.exists(f"jti:{jti}"))
+
+    # --- Login attempts ---
+
+    async def add_login_attempt(self, attempt: LoginAttempt, history: timedelta):
+        r = await self.get_redis()
+        key = "login_attempts"
+        score = _utc_epoch(attempt.timestamp)
+        member = json.dumps({
+            "identifier": attempt.identifier,
+            "ip_address": attempt.ip_address,
+            "user_agent": attempt.user_agent,
+            "success": attempt.success,
+            "timestamp": attempt.timestamp.isoformat(),
+            "failure_reason": attempt.failure_reason,
+            "nonce": secrets.token_hex(4)
+        })
+
+        pipe = r.pipeline()
+        pipe.zadd(key, {member: score})
+        pipe.zremrangebyscore(key, "-inf", score - history.total_seconds())
+        await pipe.execute()
+
+    async def add_login_failure(
+        self,
+        identifier: str,
+        ip_address: str,
+        timestamp: datetime,
+        user_window: timedelta,
+        ip_window: timedelta
+    ):
+        r = await self.get_redis()
+        score = _utc_epoch(timestamp)
+        # Unique member per failure; the score carries the time
+        member = f"{score}:{secrets.token_hex(4)}"
+
+        pipe = r.pipeline()
+        for key, window in (
+            (f"login_failures:ip:{ip_address}", ip_window),
+            (f"login_failures:user:{identifier}", user_window)
+        ):
+            pipe.zadd(key, {member: score})
+            pipe.zremrangebyscore(key, "-inf", score - window.total_seconds())
+            pipe.expire(key, int(window.total_seconds()))
+        await pipe.execute()
+
+    async def count_recent_failures(self, identifier: str, since: datetime) -> Tuple[int, Optional[datetime]]:
+        r = await self.get_redis()
+        key = f"login_failures:user:{identifier}"
+
+        pipe = r.pipeline()
+        pipe.zremrangebyscore(key, "-inf", _utc_epoch(since))
+        pipe.zcard(key)
+        pipe.zrange(key, -1, -1, withscores=True)
+        _, count, latest = await pipe.execute()
+
+        if not count:
+            return 0, None
+
+        return count, _from_utc_epoch(latest[0][1])
+
+    async def count_recent_ip_attempts(self, ip_address: str, since: datetime) -> int:
+        r = await self.get_redis()
+        key = f"login_failures:ip:{ip_address}"
+
+        pipe = r.pipeline()
+        pipe.zremrangebyscore(key, "-inf", _utc_epoch(since))
+        pipe.zcard(key)
+        _, count = await pipe.execute()
+
+        return count
+
+    async def reset_failures(self, identifier: str):
+        r = await self.get_redis()
+        await r.delete(f"login_failures:user:{identifier}")
+
+    # --- One-time tokens ---
+
+    def _encode_token_data(self, data: Dict[str, Any]) -> str:
+        return json.dumps({
+            key: value.isoformat() if key in self._DATETIME_FIELDS else value
+            for key, value in data.items()
+        })
+
+    def _decode_token_data(self, raw: str) -> Dict[str, Any]:
+        data = json.loads(raw)
+        for key in self._DATETIME_FIELDS:
+            if key in data:
+                data[key] = datetime.fromisoformat(data[key])
+        return data
+
+    async def put_token(self, kind: str, token: str, data: Dict[str, Any], ttl: timedelta):
+        r = await self.get_redis()
+        await r.setex(f"auth_token:{kind}:{token}", int(ttl.total_seconds()), self._encode_token_data(data))
+
+    async def get_token(self, kind: str, token: str) -> Optional[Dict[str, Any]]:
+        r = await self.get_redis()
+        raw = await r.get(f"auth_token:{kind}:{token}")
+        if not raw:
+            return None
+        return self._decode_token_data(raw)
+
+    async def update_token(self, kind: str, token: str, updates: Dict[str, Any]):
+        token_data = await self.get_token(kind, token)
+        if token_data is None:
+            return
+
+        token_data.update(updates)
+        r = await self.get_redis()
+        await r.set(f"auth_token:{kind}:{token}", self._encode_token_data(token_data), keepttl=True)
+
+    async def delete_token(self, kind: str, token: str):
+        r = await self.get_redis()
+        await r.delete(f"auth_token:{kind}:{token}")
+
 class AuthManager:
-    def __init__(self, config: AuthConfig = None):
+    def __init__(self, config: AuthConfig = None, store: Optional[AuthStore] = None):
         self.config = config or AuthConfig()
+        # bcrypt_sha256 pre-hashes with SHA-256, lifting bcrypt's 72-byte input cap;
+        # plain bcrypt hashes still verify and are flagged for rehash
         self.pwd_context = CryptContext(
-            schemes=["bcrypt"],
-            deprecated="auto",
-            bcrypt__rounds=12
+            schemes=["bcrypt_sha256", "bcrypt"],
+            deprecated=["bcrypt"],
+            bcrypt_sha256__rounds=self.config.bcrypt_rounds
+        )
+
+        # bcrypt is CPU-bound; async callers offload it to a bounded pool
+        self._bcrypt_pool = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            thread_name_prefix="bcrypt"
         )
 
+        # Extended leaked-password corpus (the built-in list is always checked)
+        self.common_passwords_bloom: Optional[PasswordBloomFilter] = None
+        if self.config.common_passwords_bloom_path:
+            self.common_passwords_bloom = PasswordBloomFilter.load(self.config.common_passwords_bloom_path)
+
+        # Background sweep of expired sessions; started here when a loop is
+        # running, otherwise on the first create_session
+        self._session_gc_task: Optional[asyncio.Task] = None
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self.start_session_gc()
+
+        # Decoded JWT payloads; a request's dependencies often verify the same token
+        self._decode_token_cached = functools.lru_cache(maxsize=4096)(self._decode_token)
+
+        # Verified API keys: sha256 digest -> (monotonic expiry, key info), LRU order
+        self._api_key_cache: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
         # Security components
         self.security = HTTPBearer()
         self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-        # In-memory stores (in production, use Redis)
-        self.active_sessions: Dict[str, UserSession] = {}
-        self.login_attempts: List[LoginAttempt] = []
-        self.password_reset_tokens: Dict[str, Dict] = {}
-        self.email_verification_tokens: Dict[str, Dict] = {}
-
-        # Rate limiting for auth endpoints
-        self.login_attempts_by_ip: Dict[str, List[datetime]] = {}
-        self.failed_attempts_by_user: Dict[str, List[datetime]] = {}
+        # Sessions, login attempts, one-time tokens and JWT blacklist
+        if store is not None:
+            self.store = store
+        elif self.config.redis_url:
+            self.store = RedisAuthStore(self.config.redis_url)
+        else:
+            self.store = InMemoryAuthStore()
 
     # === Password Management ===
 
     def hash_password(self, password: str) -> str:
-        """Hash password using bcrypt"""
+        """Hash password using bcrypt_sha256"""
         return self.pwd_context.hash(password)
 
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify password against hash"""
         return self.pwd_context.verify(plain_password, hashed_password)
 
+    async def hash_password_async(self, password: str) -> str:
+        """Hash password without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._bcrypt_pool, self.pwd_context.hash, password
+        )
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password without blocking the event loop"""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._bcrypt_pool, self.pwd_context.verify, plain_password, hashed_password
+        )
+
+    async def warmup(self):
+        """Load the hashing backend at app startup rather than on the first login"""
+        try:
+            await self.hash_password_async("warmup")
+        except Exception as e:
+            logger.warning(f"Password hashing warmup failed: {e}")
+
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Check if hash uses a deprecated scheme or outdated rounds"""
+        return self.pwd_context.needs_update(hashed_password)
+
     def validate_password_strength(self, password: str, user_email: str = "") -> Tuple[bool, List[str]]:
         """Validate password strength and return issues"""
 
@@ -135,25 +952,23 @@ class AuthManager:
             issues.append(f"Password must be at least {self.config.min_password_length} characters long")
 
         # Character requirements
-        if self.config.require_uppercase and not re.search(r'[A-Z]', password):
+        if self.config.require_uppercase and not _UPPER_RE.search(password):
             issues.append("Password must contain at least one uppercase letter")
 
-        if self.config.require_lowercase and not re.search(r'[a-z]', password):
+        if self.config.require_lowercase and not _LOWER_RE.search(password):
             issues.append("Password must contain at least one lowercase letter")
 
-        if self.config.require_numbers and not re.search(r'\d', password):
+        if self.config.require_numbers and not _DIGIT_RE.search(password):
             issues.append("Password must contain at least one number")
 
-        if self.config.require_special_chars and not re.search(r'[!@#$%^&*()_+\-=\[\]{}|;:,.<>?]', password):
+        if self.config.require_special_chars and not _SPECIAL_RE.search(password):
             issues.append("Password must contain at least one special character")
 
         # Common password checks
-        common_passwords = [
-            "password", "123456", "123456789", "qwerty", "abc123",
-            "password123", "admin", "letmein", "welcome", "monkey"
-        ]
-
-        if password.lower() in common_passwords:
+        lowered = password.lower()
+        if lowered in _COMMON_PASSWORDS or (
+            self.common_passwords_bloom is not None and lowered in self.common_passwords_bloom
+        ):
             issues.append("Password is too common, please choose a more unique password")
 
         # Personal information check
@@ -164,17 +979,16 @@ class AuthManager:
                     issues.append("Password should not contain parts of your email address")
 
         # Pattern checks
-        if re.search(r'(.)\1{3,}', password):  # 4+ repeated characters
+        if _REPEAT_RE.search(password):
             issues.append("Password should not contain 4 or more repeated characters")
 
-        if re.search(r'(012|123|234|345|456|567|678|789|890|abc|bcd|cde|def)', password.lower()):
+        if _SEQUENCE_RE.search(password.lower()):
             issues.append("Password should not contain common sequences")
 
         return len(issues) == 0, issues
 
     def generate_secure_password(self, length: int = 12) -> str:
         """Generate a secure password"""
-        import string
 
         # Ensure we have at least one of each required character type
         chars = []
@@ -186,15 +1000,21 @@ class AuthManager:
         if self.config.require_numbers:
             chars.append(secrets.choice(string.digits))
         if self.config.require_special_chars:
-            chars.append(secrets.choice("!@#$%^&*()_+-=[]{}|;:,.<>?"))
-
-        # Fill the rest randomly
-        all_chars = string.ascii_letters + string.digits + "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        while len(chars) < length:
-            chars.append(secrets.choice(all_chars))
+            chars.append(secrets.choice(_PASSWORD_SPECIAL_CHARS))
+
+        # Fill the rest randomly from one CSPRNG read per round; bytes at or
+        # above _PASSWORD_BYTE_LIMIT are rejected so the modulo stays unbiased
+        if len(chars) < length:
+            while len(chars) < length:
+                chars.extend(
+                    _PASSWORD_ALPHABET[b % len(_PASSWORD_ALPHABET)]
+                    for b in secrets.token_bytes(2 * (length - len(chars)))
+                    if b < _PASSWORD_BYTE_LIMIT
+                )
+            del chars[length:]
 
         # Shuffle to avoid predictable patterns
-        secrets.SystemRandom().shuffle(chars)
+        _SYSRAND.shuffle(chars)
 
         return ''.join(chars)
 
@@ -209,16 +1029,18 @@ class AuthManager:
 
         to_encode = data.copy()
 
+        now = _now_epoch()
+
         if expires_delta:
-            expire = datetime.utcnow() + expires_delta
+            expire = now + int(expires_delta.total_seconds())
         else:
-            expire = datetime.utcnow() + timedelta(minutes=self.config.access_token_expire_minutes)
+            expire = now + self.config.access_token_expire_minutes * 60
 
         to_encode.update({
             "exp": expire,
-            "iat": datetime.utcnow(),
+            "iat": now,
             "type": "access",
-            "jti": secrets.token_urlsafe(16)  # JWT ID for revocation
+            "jti": secrets.token_hex(8)  # JWT ID for revocation
         })
 
         encoded_jwt = jwt.encode(
@@ -233,13 +1055,14 @@ class AuthManager:
         """Create JWT refresh token"""
 
         to_encode = data.copy()
-        expire = datetime.utcnow() + timedelta(days=self.config.refresh_token_expire_days)
+        now = _now_epoch()
+        expire = now + self.config.refresh_token_expire_days * 86400
 
         to_encode.update({
             "exp": expire,
-            "iat": datetime.utcnow(),
+            "iat": now,
             "type": "refresh",
-            "jti": secrets.token_urlsafe(16)
+            "jti": secrets.token_hex(8)
         })
 
         encoded_jwt = jwt.encode(
@@ -260,35 +1083,47 @@ class AuthManager:
         )
 
         try:
-            payload = jwt.decode(
-                token,
-                self.config.secret_key,
-                algorithms=[self.config.algorithm]
-            )
+            payload = self._decode_token_cached(token)
+
+            # Cached payloads skip jwt.decode's own expiry check
+            if payload["exp"] <= time.time():
+                raise JWTError("Signature has expired.")
 
             if payload.get("type") != token_type:
                 raise credentials_exception
 
-            # Check if token is revoked (in production, check against Redis)
+            # Check if token is revoked
             jti = payload.get("jti")
             if jti and await self._is_token_revoked(jti):
                 raise credentials_exception
 
-            return payload
+            return dict(payload)
 
         except JWTError as e:
             logger.warning(f"JWT verification failed: {e}")
             raise credentials_exception
 
+    def _decode_token(self, token: str) -> Dict[str, Any]:
+        """Check signature and decode JWT (memoized; invalid tokens raise and are not cached)"""
+
+        payload = jwt.decode(
+            token,
+            self.config.secret_key,
+            algorithms=[self.config.algorithm]
+        )
+
+        if "exp" not in payload:
+            raise JWTError("Token has no expiry")
+
+        return payload
+
     async def _is_token_revoked(self, jti: str) -> bool:
-        """Check if token is revoked (implement with Redis in production)"""
-        # Placeholder - implement with Redis blacklist
-        return False
+        """Check if token is revoked"""
+        return await self.store.is_jti_revoked(jti)
 
     async def revoke_token(self, jti: str, expiry: Optional[datetime] = None):
         """Revoke token by adding to blacklist"""
-        # Implement with Redis in production
-        pass
+        await self.store.revoke_jti(jti, expiry)
 
     # === Two-Factor Authentication ===
 
@@ -313,33 +1148,41 @@ class AuthManager:
         qr.add_data(totp_uri)
         qr.make(fit=True)
 
-        img = qr.make_image(fill_color="black", back_color="white")
+        # SVG path output avoids PIL and PNG encoding entirely
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
 
         # Convert to base64
         buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+        img.save(buffer)
 
         img_base64 = base64.b64encode(buffer.getvalue()).decode()
 
-        return f"data:image/png;base64,{img_base64}"
+        return f"data:image/svg+xml;base64,{img_base64}"
 
     def verify_2fa_token(self, secret: str, token: str) -> bool:
         """Verify 2FA TOTP token"""
 
+        # Built per call so TOTP secrets aren't kept in a process-wide cache
         totp = pyotp.TOTP(secret)
 
         # Allow for clock skew
-        return totp.verify(token, valid_window=self.config.totp_window)
+        return totp.verify(
+            token,
+            for_time=int(time.time()),
+            valid_window=self.config.totp_window
+        )
 
     def generate_backup_codes(self) -> List[str]:
         """Generate backup codes for 2FA"""
 
+        # One CSPRNG read: 5 bytes (40 bits) per code; modulo bias vs 10^8 is ~1e-4
+        raw = secrets.token_bytes(self.config.backup_codes_count * 5)
+
         codes = []
-        for _ in range(self.config.backup_codes_count):
+        for offset in range(0, len(raw), 5):
+            n = int.from_bytes(raw[offset:offset + 5], "big") % 100_000_000
             # Format: XXXX-XXXX
-            code = f"{secrets.randbelow(10000):04d}-{secrets.randbelow(10000):04d}"
-            codes.append(code)
+            codes.append(f"{n // 10000:04d}-{n % 10000:04d}")
 
         return codes
 
@@ -367,29 +1210,33 @@ class AuthManager:
         session_id = secrets.token_urlsafe(32)
 
         # Calculate expiry
+        now = _now_epoch()
+
         if remember_me:
-            expires_at = datetime.utcnow() + timedelta(days=self.config.remember_me_days)
+            expires_at = now + self.config.remember_me_days * 86400
         else:
-            expires_at = datetime.utcnow() + timedelta(hours=self.config.session_timeout_hours)
+            expires_at = now + self.config.session_timeout_hours * 3600
 
         session = UserSession(
             session_id=session_id,
             user_id=user_id,
             ip_address=ip_address,
             user_agent=user_agent,
-            created_at=datetime.utcnow(),
-            last_activity=datetime.utcnow(),
+            created_at=now,
+            last_activity=now,
             expires_at=expires_at,
             status=SessionStatus.ACTIVE,
             remember_me=remember_me,
             device_fingerprint=device_fingerprint
         )
 
-        # Limit sessions per user
-        await self._cleanup_user_sessions(user_id)
+        self.start_session_gc()
 
-        self.active_sessions[session_id] = session
+        # Limit sessions per user
+        evicted = await self.store.put_session(session, self.config.max_sessions_per_user)
 
+        for evicted_id in evicted:
+            logger.info(f"Revoked session {evicted_id}: session_limit_exceeded")
         logger.info(f"Created session {session_id} for user {user_id}")
 
         return session_id
@@ -397,15 +1244,16 @@ class AuthManager:
     async def verify_session(self, session_id: str) -> Optional[UserSession]:
         """Verify and update session"""
 
-        session = self.active_sessions.get(session_id)
+        session = await self.store.get_session(session_id)
 
         if not session:
             return None
 
         # Check expiry
-        if datetime.utcnow() > session.expires_at:
+        now = _now_epoch()
+        if now > session.expires_at:
             session.status = SessionStatus.EXPIRED
-            del self.active_sessions[session_id]
+            await self.store.revoke_session(session_id)
             return None
 
         # Check status
@@ -413,57 +1261,66 @@ class AuthManager:
             return None
 
         # Update last activity
-        session.last_activity = datetime.utcnow()
+        session.last_activity = now
+        await self.store.touch_session(session_id, session.last_activity)
 
         return session
 
     async def revoke_session(self, session_id: str, reason: str = "user_logout"):
         """Revoke session"""
 
-        if session_id in self.active_sessions:
-            session = self.active_sessions[session_id]
-            session.status = SessionStatus.REVOKED
-            del self.active_sessions[session_id]
+        session = await self.store.revoke_session(session_id)
 
+        if session:
+            session.status = SessionStatus.REVOKED
             logger.info(f"Revoked session {session_id}: {reason}")
 
-    async def revoke_all_user_sessions(self, user_id: str, except_session: Optional[str] = None):
-        """Revoke all sessions for a user"""
+    def start_session_gc(self):
+        """Start background task sweeping expired sessions"""
+        if not self._session_gc_task or self._session_gc_task.done():
+            self._session_gc_task = asyncio.create_task(self._session_gc_loop())
 
-        sessions_to_revoke = []
+    def stop_session_gc(self):
+        """Stop background session sweep"""
+        if self._session_gc_task:
+            self._session_gc_task.cancel()
+            self._session_gc_task = None
 
-        for session_id, session in self.active_sessions.items():
-            if session.user_id == user_id and session_id != except_session:
-                sessions_to_revoke.append(session_id)
+    async def _session_gc_loop(self):
+        """Background task to remove expired sessions"""
+        while True:
+            try:
+                await asyncio.sleep(self.config.session_gc_interval_seconds)
 
-        for session_id in sessions_to_revoke:
-            await self.revoke_session(session_id, "admin_revoke_all")
+                expired = await self.store.sweep_expired_sessions(_now_epoch())
+                if expired:
+                    logger.debug(f"Removed {len(expired)} expired sessions")
 
-        logger.info(f"Revoked {len(sessions_to_revoke)} sessions for user {user_id}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error sweeping expired sessions: {e}")
 
-    async def _cleanup_user_sessions(self, user_id: str):
-        """Clean up old sessions for user to stay within limit"""
+    async def revoke_all_user_sessions(self, user_id: str, except_session: Optional[str] = None):
+        """Revoke all sessions for a user"""
 
-        user_sessions = [
-            (session_id, session)
-            for session_id, session in self.active_sessions.items()
-            if session.user_id == user_id and session.status == SessionStatus.ACTIVE
+        sessions_to_revoke = [
+            session_id
+            for session_id in await self.store.get_user_session_ids(user_id)
+            if session_id != except_session
         ]
 
-        if len(user_sessions) >= self.config.max_sessions_per_user:
-            # Sort by last activity and remove oldest
-            user_sessions.sort(key=lambda x: x[1].last_activity)
-
-            sessions_to_remove = len(user_sessions) - self.config.max_sessions_per_user + 1
+        for session_id in sessions_to_revoke:
+            session = await self.store.revoke_session(session_id)
+            if session:
+                session.status = SessionStatus.REVOKED
 
-            for i in range(sessions_to_remove):
-                session_id, _ = user_sessions[i]
-                await self.revoke_session(session_id, "session_limit_exceeded")
+        logger.info(f"Revoked {len(sessions_to_revoke)} sessions for user {user_id}")
 
     # === API Key Management ===
 
-    def generate_api_key(self, prefix: str = "aos") -> Tuple[str, str]:
-        """Generate API key and return (key, hash)"""
+    def generate_api_key(self, prefix: str = "aos") -> Tuple[str, bytes]:
+        """Generate API key and return (key, hash); store the raw 32-byte hash"""
 
         # Format: prefix_environment_random
         # Example: aos_prod_k7h3j5k2l9m4n6p8q1r2s3t4
@@ -473,20 +1330,34 @@ class AuthManager:
 
         api_key = f"{prefix}_{environment}_{random_part}"
 
-        # Hash for storage
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        return api_key, self.hash_api_key(api_key)
+
+    @staticmethod
+    def hash_api_key(api_key: str) -> bytes:
+        """Hash API key for storage and lookup"""
+        return hashlib.sha256(api_key.encode()).digest()
 
-        return api_key, key_hash
+    def verify_api_key_hash(self, api_key: str, stored_hash: bytes) -> bool:
+        """Constant-time comparison of API key against stored hash"""
+        return hmac.compare_digest(self.hash_api_key(api_key), stored_hash)
 
     async def verify_api_key(self, api_key: str) -> Optional[Dict[str, Any]]:
         """Verify API key and return key info"""
 
-        # Hash the provided key
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        # Hash the provided key; the cache is keyed by hash so plaintext keys aren't retained
+        key_hash = self.hash_api_key(api_key)
 
-        # In production, lookup in database
+        cached = self._api_key_cache.get(key_hash)
+        if cached is not None:
+            expires, key_info = cached
+            if expires > time.monotonic():
+                self._api_key_cache.move_to_end(key_hash)
+                return key_info
+            del self._api_key_cache[key_hash]
+
+        # In production, lookup in database by key_hash
         # For now, return mock data
-        return {
+        key_info = {
             "key_id": "mock_key_id",
             "user_id": "mock_user_id",
             "name": "Mock API Key",
@@ -496,6 +1367,16 @@ class AuthManager:
             "expires_at": datetime.utcnow() + timedelta(days=365)
         }
 
+        self._api_key_cache[key_hash] = (time.monotonic() + self.config.api_key_cache_ttl_seconds, key_info)
+        if len(self._api_key_cache) > self.config.api_key_cache_size:
+            self._api_key_cache.popitem(last=False)
+
+        return key_info
+
+    def invalidate_api_key(self, api_key: str):
+        """Drop cached info for API key (e.g. after revocation)"""
+        self._api_key_cache.pop(self.hash_api_key(api_key), None)
+
     # === Role-Based Access Control (RBAC) ===
 
     def check_permission(
@@ -508,89 +1389,28 @@ class AuthManager:
     ) -> bool:
         """Check if user has permission for action on resource"""
 
-        # Define permissions matrix
-        permissions = {
-            UserRole.ADMIN: {
-                "*": ["*"]  # Admin has access to everything
-            },
-            UserRole.USER: {
-                "agents": ["read", "create", "update", "delete"],
-                "workflows": ["read", "create", "update", "delete"],
-                "executions": ["read", "create"],
-                "marketplace": ["read", "publish"],
-                "billing": ["read"],
-                "profile": ["read", "update"],
-                "api_keys": ["read", "create", "delete"],
-                "sessions": ["read", "delete"]
-            },
-            UserRole.VIEWER: {
-                "agents": ["read"],
-                "workflows": ["read"],
-                "executions": ["read"],
-                "marketplace": ["read"],
-                "profile": ["read"],
-                "billing": ["read"]
-            },
-            UserRole.API_USER: {
-                "agents": ["read", "create", "update", "delete"],
-                "workflows": ["read", "create", "update", "delete"],
-                "executions": ["read", "create"],
-                "marketplace": ["read"]
-            }
-        }
-
-        user_permissions = permissions.get(user_role, {})
-
-        # Check wildcard permission (admin)
-        if "*" in user_permissions and "*" in user_permissions["*"]:
+        # Admin has access to everything, including other users' resources
+        if user_role is UserRole.ADMIN:
             return True
 
-        # Check specific resource permission
-        if resource in user_permissions:
-            allowed_actions = user_permissions[resource]
+        user_permissions = _PERMISSIONS.get(user_role, _NO_PERMISSIONS)
 
-            if "*" in allowed_actions or action in allowed_actions:
-                # Additional check for resource ownership
-                if resource_owner_id and user_id and resource_owner_id != user_id:
-                    # Only admins can access other users' resources
-                    return user_role == UserRole.ADMIN
+        # Check specific resource permission
+        allowed_actions = user_permissions.get(resource)
+        if allowed_actions is not None and ("*" in allowed_actions or action in allowed_actions):
+            # Additional check for resource ownership
+            if resource_owner_id and user_id and resource_owner_id != user_id:
+                # Only admins can access other users' resources
+                return False
 
-                return True
+            return True
 
         return False
 
-    def get_user_permissions(self, user_role: UserRole) -> Dict[str, List[str]]:
-        """Get all permissions for a user role"""
-
-        permissions = {
-            UserRole.ADMIN: {"*": ["*"]},
-            UserRole.USER: {
-                "agents": ["read", "create", "update", "delete"],
-                "workflows": ["read", "create", "update", "delete"],
-                "executions": ["read", "create"],
-                "marketplace": ["read", "publish"],
-                "billing": ["read"],
-                "profile": ["read", "update"],
-                "api_keys": ["read", "create", "delete"],
-                "sessions": ["read", "delete"]
-            },
-            UserRole.VIEWER: {
-                "agents": ["read"],
-                "workflows": ["read"],
-                "executions": ["read"],
-                "marketplace": ["read"],
-                "profile": ["read"],
-                "billing": ["read"]
-            },
-            UserRole.API_USER: {
-                "agents": ["read", "create", "update", "delete"],
-                "workflows": ["read", "create", "update", "delete"],
-                "executions": ["read", "create"],
-                "marketplace": ["read"]
-            }
-        }
+    def get_user_permissions(self, user_role: UserRole) -> Mapping[str, FrozenSet[str]]:
+        """Get all permissions for a user role (read-only mapping)"""
 
-        return permissions.get(user_role, {})
+        return _PERMISSIONS.get(user_role, _NO_PERMISSIONS)
 
     # === Login Attempt Tracking ===
 
@@ -613,43 +1433,28 @@ class AuthManager:
             failure_reason=failure_reason
         )
 
-        self.login_attempts.append(attempt)
-
         # Keep only recent attempts (last 24 hours)
-        cutoff = datetime.utcnow() - timedelta(hours=24)
-        self.login_attempts = [
-            attempt for attempt in self.login_attempts
-            if attempt.timestamp > cutoff
-        ]
+        await self.store.add_login_attempt(attempt, timedelta(hours=24))
 
         # Track by IP and user for rate limiting
         if not success:
-            # Track by IP
-            if ip_address not in self.login_attempts_by_ip:
-                self.login_attempts_by_ip[ip_address] = []
-            self.login_attempts_by_ip[ip_address].append(datetime.utcnow())
-
-            # Track by user
-            if identifier not in self.failed_attempts_by_user:
-                self.failed_attempts_by_user[identifier] = []
-            self.failed_attempts_by_user[identifier].append(datetime.utcnow())
+            await self.store.add_login_failure(
+                identifier,
+                ip_address,
+                attempt.timestamp,
+                user_window=timedelta(minutes=self.config.lockout_duration_minutes),
+                ip_window=timedelta(hours=1)
+            )
 
     async def is_account_locked(self, identifier: str) -> Tuple[bool, Optional[datetime]]:
         """Check if account is locked due to failed attempts"""
 
-        if identifier not in self.failed_attempts_by_user:
-            return False, None
-
         # Check recent failed attempts
         cutoff = datetime.utcnow() - timedelta(minutes=self.config.lockout_duration_minutes)
-        recent_failures = [
-            attempt for attempt in self.failed_attempts_by_user[identifier]
-            if attempt > cutoff
-        ]
+        failure_count, latest_failure = await self.store.count_recent_failures(identifier, cutoff)
 
-        if len(recent_failures) >= self.config.max_login_attempts:
+        if failure_count >= self.config.max_login_attempts:
             # Account is locked, calculate unlock time
-            latest_failure = max(recent_failures)
             unlock_time = latest_failure + timedelta(minutes=self.config.lockout_duration_minutes)
             return True, unlock_time
 
@@ -658,45 +1463,41 @@ class AuthManager:
     async def is_ip_rate_limited(self, ip_address: str) -> bool:
         """Check if IP is rate limited"""
 
-        if ip_address not in self.login_attempts_by_ip:
-            return False
-
         # Allow max 20 attempts per hour from same IP
         cutoff = datetime.utcnow() - timedelta(hours=1)
-        recent_attempts = [
-            attempt for attempt in self.login_attempts_by_ip[ip_address]
-            if attempt > cutoff
-        ]
-
-        return len(recent_attempts) >= 20
+        return await self.store.count_recent_ip_attempts(ip_address, cutoff) >= 20
 
     async def reset_failed_attempts(self, identifier: str):
         """Reset failed login attempts for user"""
 
-        if identifier in self.failed_attempts_by_user:
-            del self.failed_attempts_by_user[identifier]
+        await self.store.reset_failures(identifier)
 
     # === Password Reset ===
 
-    def generate_password_reset_token(self, user_id: str, email: str) -> str:
-        """Generate password reset token"""
+    async def generate_password_reset_token(self, user_id: str, email: str) -> str:
+        """Generate password reset token
+
+        A coroutine (it used to be a plain method): the token is written to
+        the auth store shared by all workers, so callers must await it.
+        """
 
         token = secrets.token_urlsafe(32)
+        ttl = timedelta(hours=1)
 
-        self.password_reset_tokens[token] = {
+        await self.store.put_token("password_reset", token, {
             "user_id": user_id,
             "email": email,
             "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(hours=1),
+            "expires_at": datetime.utcnow() + ttl,
             "used": False
-        }
+        }, ttl)
 
         return token
 
     async def verify_password_reset_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify password reset token"""
 
-        token_data = self.password_reset_tokens.get(token)
+        token_data = await self.store.get_token("password_reset", token)
 
         if not token_data:
             return None
@@ -705,7 +1506,7 @@ class AuthManager:
             return None
 
         if datetime.utcnow() > token_data["expires_at"]:
-            del self.password_reset_tokens[token]
+            await self.store.delete_token("password_reset", token)
             return None
 
         return token_data
@@ -713,30 +1514,34 @@ class AuthManager:
     async def use_password_reset_token(self, token: str):
         """Mark password reset token as used"""
 
-        if token in self.password_reset_tokens:
-            self.password_reset_tokens[token]["used"] = True
+        await self.store.update_token("password_reset", token, {"used": True})
 
     # === Email Verification ===
 
-    def generate_email_verification_token(self, user_id: str, email: str) -> str:
-        """Generate email verification token"""
+    async def generate_email_verification_token(self, user_id: str, email: str) -> str:
+        """Generate email verification token
+
+        A coroutine (it used to be a plain method): the token is written to
+        the auth store shared by all workers, so callers must await it.
+        """
 
         token = secrets.token_urlsafe(32)
+        ttl = timedelta(hours=24)
 
-        self.email_verification_tokens[token] = {
+        await self.store.put_token("email_verification", token, {
             "user_id": user_id,
             "email": email,
             "created_at": datetime.utcnow(),
-            "expires_at": datetime.utcnow() + timedelta(hours=24),
+            "expires_at": datetime.utcnow() + ttl,
             "verified": False
-        }
+        }, ttl)
 
         return token
 
     async def verify_email_token(self, token: str) -> Optional[Dict[str, Any]]:
         """Verify email verification token"""
 
-        token_data = self.email_verification_tokens.get(token)
+        token_data = await self.store.get_token("email_verification", token)
 
         if not token_data:
             return None
@@ -745,11 +1550,12 @@ class AuthManager:
             return None
 
         if datetime.utcnow() > token_data["expires_at"]:
-            del self.email_verification_tokens[token]
+            await self.store.delete_token("email_verification", token)
             return None
 
         # Mark as verified
         token_data["verified"] = True
+        await self.store.update_token("email_verification", token, {"verified": True})
 
         return token_data
 
@@ -774,21 +1580,19 @@ class AuthManager:
         """Generate device fingerprint for session tracking"""
 
         # Combine user agent, accept headers, and other characteristics
-        fingerprint_data = [
-            request.headers.get("user-agent", ""),
-            request.headers.get("accept", ""),
-            request.headers.get("accept-language", ""),
-            request.headers.get("accept-encoding", ""),
-            str(request.client.host if request.client else "")
-        ]
+        h = hashlib.blake2b(digest_size=8)
+        for header in _FINGERPRINT_HEADERS:
+            h.update(request.headers.get(header, "").encode())
+            h.update(b"\x1f")
+        if request.client:
+            h.update(request.client.host.encode())
 
-        fingerprint_string = "|".join(fingerprint_data)
-        return hashlib.sha256(fingerprint_string.encode()).hexdigest()[:16]
+        return h.hexdigest()
 
     async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get detailed session information"""
 
-        session = self.active_sessions.get(session_id)
+        session = await self.store.get_session(session_id)
 
         if not session:
             return None
@@ -798,9 +1602,9 @@ class AuthManager:
             "user_id": session.user_id,
             "ip_address": session.ip_address,
             "user_agent": session.user_agent,
-            "created_at": session.created_at.isoformat(),
-            "last_activity": session.last_activity.isoformat(),
-            "expires_at": session.expires_at.isoformat(),
+            "created_at": _epoch_isoformat(session.created_at),
+            "last_activity": _epoch_isoformat(session.last_activity),
+            "expires_at": _epoch_isoformat(session.expires_at),
             "status": session.status.value,
             "remember_me": session.remember_me,
             "device_fingerprint": session.device_fingerprint
@@ -811,11 +1615,10 @@ class AuthManager:
 
         user_sessions = []
 
-        for session_id, session in self.active_sessions.items():
-            if session.user_id == user_id and session.status == SessionStatus.ACTIVE:
-                session_info = await self.get_session_info(session_id)
-                if session_info:
-                    user_sessions.append(session_info)
+        for session_id in await self.store.get_user_session_ids(user_id):
+            session_info = await self.get_session_info(session_id)
+            if session_info and session_info["status"] == SessionStatus.ACTIVE.value:
+                user_sessions.append(session_info)
 
         return user_sessions
 
@@ -3,15 +3,21 @@ Data Encryption Manager for AgentOS
 Advanced encryption for sensitive data with field-level encryption and key management
 """
 
-from cryptography.fernet import Fernet, MultiFernet
+from app.security._fernet_backend import Fernet, MultiFernet, InvalidToken
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives import padding as symmetric_padding
 from cryptography.hazmat.backends import default_backend
 import base64
 import os
 import json
+import tempfile
+import orjson
 import hashlib
 import hmac
 import secrets
@@ -20,7 +26,55 @@ from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
+import threading
 import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # SIMD base64 codec; same API as the stdlib functions it replaces
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+_b64enc = _b64.urlsafe_b64encode
+_b64dec = _b64.urlsafe_b64decode
+
+_FERNET_VERSION = 0x80
+_GCM_NONCE_SIZE = 12
+_HYBRID_VERSION = 0x01
+
+# Key used by encrypt()/encrypt_dict() when none is given
+DEFAULT_KEY_ID = "default_aes_gcm"
+
+# Streaming file encryption
+_FILE_FORMAT_CTR = "aes_ctr_hmac_sha256"
+_FILE_CHUNK_SIZE = 1 << 20
+_FILE_TAG_SIZE = 32
+
+# EncryptionKey._flags bits
+_KEY_ACTIVE = 0b001
+_KEY_EXPIRING = 0b010
+_KEY_USAGE_LIMITED = 0b100
+
+# EncryptionKey fields that _flags is derived from
+_KEY_STATE_FIELDS = frozenset({"is_active", "expires_at", "expires_at_ts", "max_usage"})
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _dumps(value: Any) -> bytes:
+    """JSON-encode to bytes (non-serializable values via str, like json default=str)"""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+_loads = orjson.loads
+
+def _datetime_to_ts(dt: datetime) -> float:
+    """Naive UTC datetime to epoch seconds"""
+    return (dt - _EPOCH).total_seconds()
+
+def _ts_isoformat(ts: float) -> str:
+    """Epoch seconds to naive UTC ISO 8601"""
+    return (_EPOCH + timedelta(seconds=ts)).isoformat()
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +83,13 @@ class EncryptionAlgorithm(Enum):
     MULTI_FERNET = "multi_fernet"
     RSA = "rsa"
     HYBRID = "hybrid"
+    AES_GCM = "aes_gcm"
 
 class KeyDerivationFunction(Enum):
     PBKDF2 = "pbkdf2"
     SCRYPT = "scrypt"
 
-@dataclass
+@dataclass(slots=True)
 class EncryptionKey:
     key_id: str
     algorithm: EncryptionAlgorithm
@@ -44,17 +99,62 @@ class EncryptionKey:
     is_active: bool = True
     usage_count: int = 0
     max_usage: Optional[int] = None
+    # expires_at as epoch seconds (0.0 = never), checked on every encrypt
+    expires_at_ts: float = 0.0
+    # Parsed key object for RSA keys (PEM/ASN.1 decode done once)
+    _loaded: Any = field(default=None, repr=False, compare=False)
+    # Constructed Fernet/MultiFernet/AESGCM for symmetric keys
+    _cipher: Any = field(default=None, repr=False, compare=False)
+    # _KEY_* bits, kept in sync with is_active/expiry/max_usage by __setattr__
+    _flags: int = field(default=0, repr=False, compare=False)
+    # Called with the key after a state field changes (owning manager's slot arrays)
+    _on_change: Any = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.expires_at and not self.expires_at_ts:
+            self.expires_at_ts = _datetime_to_ts(self.expires_at)
+        self._refresh_flags()
+
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if name in _KEY_STATE_FIELDS:
+            self._state_changed(name)
+
+    def _state_changed(self, name: str):
+        """Re-derive expires_at_ts and _flags after a state field changes"""
+        try:
+            if name == "expires_at":
+                object.__setattr__(
+                    self, "expires_at_ts", _datetime_to_ts(self.expires_at) if self.expires_at else 0.0
+                )
+            self._refresh_flags()
+            on_change = self._on_change
+        except AttributeError:
+            # Fields still being set by __init__; __post_init__ refreshes
+            return
+
+        if on_change is not None:
+            on_change(self)
+
+    def _refresh_flags(self):
+        self._flags = (
+            (_KEY_ACTIVE if self.is_active else 0)
+            | (_KEY_EXPIRING if self.expires_at_ts else 0)
+            | (_KEY_USAGE_LIMITED if self.max_usage else 0)
+        )
 
-@dataclass
+@dataclass(slots=True)
 class EncryptedData:
     data: str  # Base64 encoded encrypted data
     key_id: str
     algorithm: EncryptionAlgorithm
     iv: Optional[str] = None  # Initialization vector if applicable
-    timestamp: datetime = field(default_factory=datetime.utcnow)
+    timestamp: float = field(default_factory=time.time)  # Epoch seconds
     metadata: Dict[str, Any] = field(default_factory=dict)
 
 class EncryptionManager:
+    _INITIAL_KEY_SLOTS = 256
+
     def __init__(self, master_key: Optional[str] = None, key_rotation_days: int = 30):
         """
         Initialize encryption manager with optional master key
@@ -69,7 +169,7 @@ class EncryptionManager:
 
         # Master key for key encryption
         if master_key:
-            self.master_key = base64.urlsafe_b64decode(master_key.encode())
+            self.master_key = _b64dec(master_key.encode())
         else:
             self.master_key = Fernet.generate_key()
 
@@ -79,8 +179,22 @@ class EncryptionManager:
         self.keys: Dict[str, EncryptionKey] = {}
         self.field_keys: Dict[str, str] = {}  # field_name -> key_id mapping
 
-        # Initialize default keys
-        self._initialize_default_keys()
+        # Derived field keys by (field_name, user_id)
+        self._field_key_memo: Dict[Tuple[str, str], EncryptionKey] = {}
+
+        # PBKDF2-derived Fernet keys for field data written before the switch to AES-GCM
+        self._legacy_field_fernets: Dict[Tuple[str, str], Fernet] = {}
+
+        # Expiring keys as parallel arrays so cleanup is one vectorized scan;
+        # free slots hold expiry 0 and never match
+        self._key_exp = np.zeros(self._INITIAL_KEY_SLOTS, dtype=np.int64)
+        self._key_active = np.zeros(self._INITIAL_KEY_SLOTS, dtype=bool)
+        self._key_ids: List[Optional[str]] = [None] * self._INITIAL_KEY_SLOTS
+        self._slot_by_key: Dict[str, int] = {}
+        self._free_key_slots: List[int] = list(range(self._INITIAL_KEY_SLOTS - 1, -1, -1))
+
+        # Guards counters updated from worker threads (batch file encryption)
+        self._stats_lock = threading.Lock()
 
         # Encryption statistics
         self.stats = {
@@ -91,10 +205,31 @@ class EncryptionManager:
             "errors": 0
         }
 
+        # Symmetric encrypt/decrypt by algorithm; RSA goes through hybrid
+        self._encrypt_dispatch = {
+            EncryptionAlgorithm.AES_GCM: self._encrypt_aes_gcm,
+            EncryptionAlgorithm.FERNET: self._encrypt_fernet,
+            EncryptionAlgorithm.MULTI_FERNET: self._encrypt_fernet,
+        }
+        self._decrypt_dispatch = {
+            EncryptionAlgorithm.AES_GCM: self._decrypt_aes_gcm,
+            EncryptionAlgorithm.FERNET: self._decrypt_fernet,
+            EncryptionAlgorithm.MULTI_FERNET: self._decrypt_fernet,
+        }
+
+        # Initialize default keys
+        self._initialize_default_keys()
+
     def _initialize_default_keys(self):
         """Initialize default encryption keys"""
 
-        # Create default Fernet key
+        # Create default AES-GCM key for new ciphertext
+        self._generate_encryption_key(
+            key_id=DEFAULT_KEY_ID,
+            algorithm=EncryptionAlgorithm.AES_GCM
+        )
+
+        # Create default Fernet key (file encryption, existing ciphertext)
         default_key = self._generate_encryption_key(
             key_id="default_fernet",
             algorithm=EncryptionAlgorithm.FERNET
@@ -116,7 +251,7 @@ class EncryptionManager:
             key_data=b"|".join(multi_keys),  # Store as concatenated keys
             created_at=datetime.utcnow()
         )
-        self.keys[multi_fernet_key.key_id] = multi_fernet_key
+        self._register_key(multi_fernet_key)
 
         # Generate RSA key pair for asymmetric encryption
         self._generate_rsa_key_pair("default_rsa")
@@ -131,6 +266,8 @@ class EncryptionManager:
 
         if algorithm == EncryptionAlgorithm.FERNET:
             key_data = Fernet.generate_key()
+        elif algorithm == EncryptionAlgorithm.AES_GCM:
+            key_data = AESGCM.generate_key(bit_length=256)
         else:
             raise ValueError(f"Unsupported algorithm for key generation: {algorithm}")
 
@@ -146,7 +283,7 @@ class EncryptionManager:
             expires_at=expires_at
         )
 
-        self.keys[key_id] = key
+        self._register_key(key)
         self.stats["key_generations"] += 1
 
         logger.info(f"Generated new {algorithm.value} key: {key_id}")
@@ -183,18 +320,20 @@ class EncryptionManager:
             key_id=f"{key_id}_private",
             algorithm=EncryptionAlgorithm.RSA,
             key_data=private_pem,
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            _loaded=private_key
         )
 
         public_key_obj = EncryptionKey(
             key_id=f"{key_id}_public",
             algorithm=EncryptionAlgorithm.RSA,
             key_data=public_pem,
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            _loaded=public_key
         )
 
-        self.keys[private_key_obj.key_id] = private_key_obj
-        self.keys[public_key_obj.key_id] = public_key_obj
+        self._register_key(private_key_obj)
+        self._register_key(public_key_obj)
 
         self.stats["key_generations"] += 2
 
@@ -204,7 +343,7 @@ class EncryptionManager:
 
     def get_master_key_string(self) -> str:
         """Get base64 encoded master key for storage"""
-        return base64.urlsafe_b64encode(self.master_key).decode()
+        return _b64enc(self.master_key).decode()
 
     def derive_key_from_password(
         self,
@@ -212,10 +351,15 @@ class EncryptionManager:
         salt: Optional[bytes] = None,
         kdf: KeyDerivationFunction = KeyDerivationFunction.PBKDF2
     ) -> Tuple[bytes, bytes]:
-        """Derive encryption key from password"""
+        """Derive encryption key from password (urlsafe base64, Fernet-ready)"""
 
         if salt is None:
-            salt = os.urandom(16)
+            salt = secrets.token_bytes(16)
+
+        return _b64enc(self._derive_raw_key(password, salt, kdf)), salt
+
+    def _derive_raw_key(self, password: str, salt: bytes, kdf: KeyDerivationFunction) -> bytes:
+        """Derive raw 32-byte key from password"""
 
         if kdf == KeyDerivationFunction.PBKDF2:
             kdf_instance = PBKDF2HMAC(
@@ -227,7 +371,6 @@ class EncryptionManager:
             )
         elif kdf == KeyDerivationFunction.SCRYPT:
             kdf_instance = Scrypt(
-                algorithm=hashes.SHA256(),
                 length=32,
                 salt=salt,
                 n=2**14,
@@ -238,18 +381,78 @@ class EncryptionManager:
         else:
             raise ValueError(f"Unsupported KDF: {kdf}")
 
-        key = kdf_instance.derive(password.encode())
-        return base64.urlsafe_b64encode(key), salt
+        return kdf_instance.derive(password.encode())
+
+    def _register_key(self, key: EncryptionKey):
+        """Add key to the key store and keep its slot in step with its state"""
+
+        self.keys[key.key_id] = key
+        key._on_change = self._key_state_changed
+        self._assign_key_slot(key)
+
+    def _key_state_changed(self, key: EncryptionKey):
+        """Mirror a key's changed activity or expiry into the slot arrays"""
+
+        if self.keys.get(key.key_id) is not key:
+            return
+
+        if key.expires_at_ts:
+            self._assign_key_slot(key)
+        else:
+            self._release_key_slot(key.key_id)
+
+    def _assign_key_slot(self, key: EncryptionKey):
+        """Record an expiring key in the slot arrays, growing them if full"""
+
+        if not key.expires_at_ts:
+            return
+
+        slot = self._slot_by_key.get(key.key_id)
+
+        if slot is None:
+            if not self._free_key_slots:
+                size = len(self._key_exp)
+                self._key_exp = np.concatenate((self._key_exp, np.zeros(size, dtype=np.int64)))
+                self._key_active = np.concatenate((self._key_active, np.zeros(size, dtype=bool)))
+                self._key_ids.extend([None] * size)
+                self._free_key_slots.extend(range(2 * size - 1, size - 1, -1))
+
+            slot = self._free_key_slots.pop()
+            self._slot_by_key[key.key_id] = slot
+            self._key_ids[slot] = key.key_id
+
+        # Round up so the vectorized compare never expires a key early
+        self._key_exp[slot] = int(key.expires_at_ts) + 1
+        self._key_active[slot] = key.is_active
+
+    def _release_key_slot(self, key_id: str):
+        """Free the slot of a removed key"""
+
+        slot = self._slot_by_key.pop(key_id, None)
+        if slot is not None:
+            self._key_exp[slot] = 0
+            self._key_active[slot] = False
+            self._key_ids[slot] = None
+            self._free_key_slots.append(slot)
 
     # === Basic Encryption/Decryption ===
 
     def encrypt(
         self,
         data: str,
-        key_id: str = "default_fernet",
+        key_id: str = DEFAULT_KEY_ID,
         algorithm: Optional[EncryptionAlgorithm] = None
     ) -> EncryptedData:
         """Encrypt string data"""
+        return self.encrypt_bytes(data.encode() if data else b"", key_id, algorithm)
+
+    def encrypt_bytes(
+        self,
+        data: bytes,
+        key_id: str = DEFAULT_KEY_ID,
+        algorithm: Optional[EncryptionAlgorithm] = None
+    ) -> EncryptedData:
+        """Encrypt already-encoded data"""
 
         if not data:
             return EncryptedData(
@@ -259,45 +462,31 @@ class EncryptionManager:
             )
 
         key = self.keys.get(key_id)
-        if not key or not key.is_active:
-            raise ValueError(f"Key not found or inactive: {key_id}")
 
-        # Check key expiration
-        if key.expires_at and datetime.utcnow() > key.expires_at:
-            raise ValueError(f"Key expired: {key_id}")
-
-        # Check usage limits
-        if key.max_usage and key.usage_count >= key.max_usage:
-            raise ValueError(f"Key usage limit exceeded: {key_id}")
+        # Active keys without expiry or usage limit skip the individual checks
+        if key is None or key._flags != _KEY_ACTIVE:
+            self._check_key_usable(key, key_id)
 
         try:
-            if key.algorithm == EncryptionAlgorithm.FERNET:
-                fernet = Fernet(key.key_data)
-                encrypted = fernet.encrypt(data.encode())
-
-            elif key.algorithm == EncryptionAlgorithm.MULTI_FERNET:
-                # Split the concatenated keys
-                key_parts = key.key_data.split(b"|")
-                fernets = [Fernet(k) for k in key_parts]
-                multi_fernet = MultiFernet(fernets)
-                encrypted = multi_fernet.encrypt(data.encode())
+            encrypt_fn = self._encrypt_dispatch.get(key.algorithm)
 
-            elif key.algorithm == EncryptionAlgorithm.RSA:
-                # For RSA, use hybrid encryption for large data
-                return self._encrypt_hybrid(data, key_id)
+            if encrypt_fn is None:
+                if key.algorithm == EncryptionAlgorithm.RSA:
+                    # For RSA, use hybrid encryption for large data
+                    return self._encrypt_hybrid(data.decode(), key_id)
 
-            else:
                 raise ValueError(f"Unsupported algorithm: {key.algorithm}")
 
+            encrypted = encrypt_fn(key, data)
+
             # Update usage count
             key.usage_count += 1
             self.stats["encryptions"] += 1
 
             return EncryptedData(
-                data=base64.urlsafe_b64encode(encrypted).decode(),
+                data=_b64enc(encrypted).decode(),
                 key_id=key_id,
-                algorithm=key.algorithm,
-                timestamp=datetime.utcnow()
+                algorithm=key.algorithm
             )
 
         except Exception as e:
@@ -305,44 +494,106 @@ class EncryptionManager:
             logger.error(f"Encryption failed for key {key_id}: {e}")
             raise
 
+    def _check_key_usable(self, key: Optional[EncryptionKey], key_id: str):
+        """Raise if key is missing, inactive, expired or used up"""
+
+        if not key or not key.is_active:
+            raise ValueError(f"Key not found or inactive: {key_id}")
+
+        # Check key expiration
+        if key.expires_at_ts and time.time() > key.expires_at_ts:
+            raise ValueError(f"Key expired: {key_id}")
+
+        # Check usage limits
+        if key.max_usage and key.usage_count >= key.max_usage:
+            raise ValueError(f"Key usage limit exceeded: {key_id}")
+
     def decrypt(self, encrypted_data: EncryptedData) -> str:
         """Decrypt data"""
+        return self.decrypt_bytes(encrypted_data).decode()
+
+    def decrypt_bytes(self, encrypted_data: EncryptedData) -> bytes:
+        """Decrypt data without decoding it"""
 
         if not encrypted_data.data:
-            return ""
+            return b""
 
         key = self.keys.get(encrypted_data.key_id)
         if not key:
             raise ValueError(f"Key not found: {encrypted_data.key_id}")
 
         try:
-            encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.data)
+            decrypt_fn = self._decrypt_dispatch.get(key.algorithm)
 
-            if key.algorithm == EncryptionAlgorithm.FERNET:
-                fernet = Fernet(key.key_data)
-                decrypted = fernet.decrypt(encrypted_bytes)
+            if decrypt_fn is None:
+                if key.algorithm == EncryptionAlgorithm.RSA:
+                    return self._decrypt_hybrid(encrypted_data).encode()
 
-            elif key.algorithm == EncryptionAlgorithm.MULTI_FERNET:
-                key_parts = key.key_data.split(b"|")
-                fernets = [Fernet(k) for k in key_parts]
-                multi_fernet = MultiFernet(fernets)
-                decrypted = multi_fernet.decrypt(encrypted_bytes)
-
-            elif key.algorithm == EncryptionAlgorithm.RSA:
-                return self._decrypt_hybrid(encrypted_data)
-
-            else:
                 raise ValueError(f"Unsupported algorithm: {key.algorithm}")
 
+            decrypted = decrypt_fn(key, _b64dec(encrypted_data.data))
+
             self.stats["decryptions"] += 1
 
-            return decrypted.decode()
+            return decrypted
 
         except Exception as e:
             self.stats["errors"] += 1
             logger.error(f"Decryption failed for key {encrypted_data.key_id}: {e}")
             raise
 
+    def _encrypt_aes_gcm(self, key: EncryptionKey, data: bytes) -> bytes:
+        # Nonce is stored inline ahead of ciphertext+tag
+        nonce = os.urandom(_GCM_NONCE_SIZE)
+        return nonce + self._get_cipher(key).encrypt(nonce, data, None)
+
+    def _decrypt_aes_gcm(self, key: EncryptionKey, encrypted: bytes) -> bytes:
+        return self._get_cipher(key).decrypt(
+            encrypted[:_GCM_NONCE_SIZE], encrypted[_GCM_NONCE_SIZE:], None
+        )
+
+    def _encrypt_fernet(self, key: EncryptionKey, data: bytes) -> bytes:
+        return self._get_cipher(key).encrypt(data)
+
+    def _decrypt_fernet(self, key: EncryptionKey, encrypted: bytes) -> bytes:
+        return self._get_cipher(key).decrypt(encrypted)
+
+    def _get_cipher(self, key: EncryptionKey) -> Union[Fernet, MultiFernet, AESGCM]:
+        """Get cipher object stored on key, constructing it on first use"""
+
+        cipher = key._cipher
+
+        if cipher is None:
+            if key.algorithm == EncryptionAlgorithm.AES_GCM:
+                cipher = AESGCM(key.key_data)
+            elif key.algorithm == EncryptionAlgorithm.MULTI_FERNET:
+                # Split the concatenated keys
+                cipher = MultiFernet([Fernet(k) for k in key.key_data.split(b"|")])
+            else:
+                cipher = Fernet(key.key_data)
+
+            key._cipher = cipher
+
+        return cipher
+
+    def _load_rsa_public_key(self, key: EncryptionKey) -> rsa.RSAPublicKey:
+        """Parsed public key, loading the PEM on first use"""
+
+        if key._loaded is None:
+            key._loaded = serialization.load_pem_public_key(key.key_data, backend=self.backend)
+        return key._loaded
+
+    def _load_rsa_private_key(self, key: EncryptionKey) -> rsa.RSAPrivateKey:
+        """Parsed private key, loading the PEM on first use"""
+
+        if key._loaded is None:
+            key._loaded = serialization.load_pem_private_key(
+                key.key_data,
+                password=None,
+                backend=self.backend
+            )
+        return key._loaded
+
     def _encrypt_hybrid(self, data: str, key_id: str) -> EncryptedData:
         """Hybrid encryption using RSA + Fernet for large data"""
 
@@ -358,10 +609,7 @@ class EncryptionManager:
         if not public_key_obj:
             raise ValueError(f"Public key not found for: {key_id}")
 
-        public_key = serialization.load_pem_public_key(
-            public_key_obj.key_data,
-            backend=self.backend
-        )
+        public_key = self._load_rsa_public_key(public_key_obj)
 
         encrypted_key = public_key.encrypt(
             temp_key,
@@ -372,38 +620,43 @@ class EncryptionManager:
             )
         )
 
-        # Combine encrypted key and data
-        combined = encrypted_key + b"|" + encrypted_data
+        # Combine version, key length, encrypted key and data
+        combined = (
+            bytes((_HYBRID_VERSION,))
+            + len(encrypted_key).to_bytes(2, "big")
+            + encrypted_key
+            + encrypted_data
+        )
 
         return EncryptedData(
-            data=base64.urlsafe_b64encode(combined).decode(),
+            data=_b64enc(combined).decode(),
             key_id=key_id,
-            algorithm=EncryptionAlgorithm.HYBRID,
-            timestamp=datetime.utcnow()
+            algorithm=EncryptionAlgorithm.HYBRID
         )
 
     def _decrypt_hybrid(self, encrypted_data: EncryptedData) -> str:
         """Decrypt hybrid encrypted data"""
 
-        combined = base64.urlsafe_b64decode(encrypted_data.data)
-
-        # Split encrypted key and data
-        parts = combined.split(b"|", 1)
-        if len(parts) != 2:
-            raise ValueError("Invalid hybrid encrypted data format")
-
-        encrypted_key, encrypted_content = parts
+        combined = _b64dec(encrypted_data.data)
 
         # Decrypt Fernet key with RSA private key
         private_key_obj = self.keys.get(encrypted_data.key_id)
         if not private_key_obj:
             raise ValueError(f"Private key not found: {encrypted_data.key_id}")
 
-        private_key = serialization.load_pem_private_key(
-            private_key_obj.key_data,
-            password=None,
-            backend=self.backend
-        )
+        private_key = self._load_rsa_private_key(private_key_obj)
+        key_length = private_key.key_size // 8
+
+        if combined[0] == _HYBRID_VERSION and int.from_bytes(combined[1:3], "big") == key_length:
+            encrypted_key = combined[3:3 + key_length]
+            encrypted_content = combined[3 + key_length:]
+        else:
+            # Legacy "<key>|<data>" framing
+            parts = combined.split(b"|", 1)
+            if len(parts) != 2:
+                raise ValueError("Invalid hybrid encrypted data format")
+
+            encrypted_key, encrypted_content = parts
 
         temp_key = private_key.decrypt(
             encrypted_key,
@@ -431,18 +684,23 @@ class EncryptionManager:
     ) -> EncryptedData:
         """Encrypt specific field with user-specific key"""
 
-        # Generate field-specific key ID
-        key_id = self._get_field_key_id(field_name, user_id)
+        key = self._field_key_memo.get((field_name, user_id))
 
-        # Generate key if it doesn't exist
-        if key_id not in self.keys:
-            self._generate_field_key(field_name, user_id)
+        if key is None:
+            # Generate field-specific key ID
+            key_id = self._get_field_key_id(field_name, user_id)
 
-        # Convert value to string
-        if not isinstance(value, str):
-            value = json.dumps(value, default=str)
+            # Generate key if it doesn't exist
+            key = self.keys.get(key_id) or self._generate_field_key(field_name, user_id)
+            self._field_key_memo[(field_name, user_id)] = key
 
-        encrypted = self.encrypt(value, key_id)
+        key_id = key.key_id
+
+        # Strings are stored as-is, everything else as JSON
+        if isinstance(value, str):
+            encrypted = self.encrypt(value, key_id)
+        else:
+            encrypted = self.encrypt_bytes(_dumps(value), key_id)
 
         # Add field-specific metadata
         encrypted.metadata.update({
@@ -468,57 +726,120 @@ class EncryptionManager:
         if encrypted_data.metadata.get("field_name") != field_name:
             raise ValueError("Field access denied: field name mismatch")
 
-        decrypted = self.decrypt(encrypted_data)
+        key = self.keys.get(encrypted_data.key_id)
+        if encrypted_data.algorithm == EncryptionAlgorithm.FERNET and (
+            key is None or key.algorithm != EncryptionAlgorithm.FERNET
+        ):
+            # Written before field keys moved to AES-GCM
+            decrypted = self._legacy_field_fernet(field_name, user_id).decrypt(_b64dec(encrypted_data.data))
+        else:
+            decrypted = self.decrypt_bytes(encrypted_data)
 
         # Try to parse as JSON
         try:
-            return json.loads(decrypted)
-        except (json.JSONDecodeError, TypeError):
-            return decrypted
+            return _loads(decrypted)
+        except orjson.JSONDecodeError:
+            return decrypted.decode()
 
     def _get_field_key_id(self, field_name: str, user_id: str) -> str:
         """Get field-specific key ID"""
         return f"field_{field_name}_{user_id}"
 
-    def _generate_field_key(self, field_name: str, user_id: str) -> EncryptionKey:
-        """Generate field-specific encryption key"""
-
-        key_id = self._get_field_key_id(field_name, user_id)
+    def _derive_field_key_data(self, field_name: str, user_id: str) -> bytes:
+        """Derive AES-256-GCM key for field from master key + field info"""
 
-        # Use KDF to derive key from master key + field info
-        salt_data = f"{field_name}:{user_id}".encode()
-        salt = hashlib.sha256(salt_data).digest()[:16]
-
-        kdf = PBKDF2HMAC(
+        # The master key is already uniformly random, so a single HKDF expand
+        # suffices; iterated KDFs (PBKDF2) are only for low-entropy passwords
+        kdf = HKDF(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=salt,
-            iterations=100000,
+            salt=None,
+            info=f"{field_name}:{user_id}".encode(),
             backend=self.backend
         )
 
-        derived_key = kdf.derive(self.master_key)
-        fernet_key = base64.urlsafe_b64encode(derived_key)
+        return kdf.derive(self.master_key)
+
+    def _legacy_field_fernet(self, field_name: str, user_id: str) -> Fernet:
+        """Get Fernet for field data encrypted with the old PBKDF2 field key"""
+
+        fernet = self._legacy_field_fernets.get((field_name, user_id))
+
+        if fernet is None:
+            salt = hashlib.sha256(f"{field_name}:{user_id}".encode()).digest()[:16]
+            kdf = PBKDF2HMAC(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=salt,
+                iterations=100000,
+                backend=self.backend
+            )
+            fernet = Fernet(base64.urlsafe_b64encode(kdf.derive(self.master_key)))
+            self._legacy_field_fernets[(field_name, user_id)] = fernet
+
+        return fernet
+
+    def _generate_field_key(
+        self,
+        field_name: str,
+        user_id: str,
+        key_data: Optional[bytes] = None
+    ) -> EncryptionKey:
+        """Generate field-specific encryption key"""
+
+        key_id = self._get_field_key_id(field_name, user_id)
+
+        # Use KDF to derive key from master key + field info
+        if key_data is None:
+            key_data = self._derive_field_key_data(field_name, user_id)
 
         key = EncryptionKey(
             key_id=key_id,
-            algorithm=EncryptionAlgorithm.FERNET,
-            key_data=fernet_key,
+            algorithm=EncryptionAlgorithm.AES_GCM,
+            key_data=key_data,
             created_at=datetime.utcnow(),
             expires_at=datetime.utcnow() + timedelta(days=self.key_rotation_days)
         )
 
-        self.keys[key_id] = key
+        self._register_key(key)
         self.field_keys[f"{field_name}:{user_id}"] = key_id
+        self._field_key_memo[(field_name, user_id)] = key
 
         return key
 
+    def warm_field_keys(self, pairs: List[Tuple[str, str]], max_workers: Optional[int] = None) -> int:
+        """Pre-derive field keys for (field_name, user_id) pairs in parallel
+
+        The KDF runs in cryptography's C code with the GIL released, so
+        derivations proceed concurrently across cores. Returns the number of
+        keys generated.
+        """
+
+        missing = [
+            (field_name, user_id)
+            for field_name, user_id in dict.fromkeys(pairs)
+            if (field_name, user_id) not in self._field_key_memo
+            and self._get_field_key_id(field_name, user_id) not in self.keys
+        ]
+
+        if not missing:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            derived = list(pool.map(lambda pair: self._derive_field_key_data(*pair), missing))
+
+        # Register sequentially so key stores are only mutated from this thread
+        for (field_name, user_id), key_data in zip(missing, derived):
+            self._generate_field_key(field_name, user_id, key_data)
+
+        return len(missing)
+
     # === Dictionary Encryption ===
 
     def encrypt_dict(
         self,
         data: Dict[str, Any],
-        key_id: str = "default_fernet",
+        key_id: str = DEFAULT_KEY_ID,
         selective_fields: Optional[List[str]] = None
     ) -> EncryptedData:
         """Encrypt dictionary as JSON with optional selective field encryption"""
@@ -541,22 +862,22 @@ class EncryptionManager:
                         "_algorithm": field_data.algorithm.value
                     }
 
-            json_str = json.dumps(encrypted_dict, default=str)
+            json_bytes = _dumps(encrypted_dict)
         else:
             # Encrypt entire dictionary
-            json_str = json.dumps(data, default=str)
+            json_bytes = _dumps(data)
 
-        return self.encrypt(json_str, key_id)
+        return self.encrypt_bytes(json_bytes, key_id)
 
     def decrypt_dict(self, encrypted_data: EncryptedData) -> Dict[str, Any]:
         """Decrypt JSON to dictionary with selective field decryption"""
 
-        decrypted = self.decrypt(encrypted_data)
+        decrypted = self.decrypt_bytes(encrypted_data)
 
         if not decrypted:
             return {}
 
-        data = json.loads(decrypted)
+        data = _loads(decrypted)
 
         # Check for selectively encrypted fields
         for key, value in data.items():
@@ -578,46 +899,106 @@ class EncryptionManager:
         output_path: Optional[str] = None,
         key_id: str = "default_fernet"
     ) -> str:
-        """Encrypt file"""
+        """Encrypt file
+
+        Streams 1 MiB chunks through AES-CTR with a running HMAC-SHA256
+        (encrypt-then-MAC over header and ciphertext, tag at the end), so
+        memory use is independent of file size.
+        """
 
         if output_path is None:
             output_path = f"{file_path}.encrypted"
 
+        key = self._get_file_key(key_id)
+
+        self._encrypt_file_stream(file_path, output_path, key)
+
+        with self._stats_lock:
+            key.usage_count += 1
+            self.stats["encryptions"] += 1
+
+        logger.info(f"Encrypted file: {file_path} -> {output_path}")
+
+        return output_path
+
+    def encrypt_files_batch(
+        self,
+        paths: List[str],
+        key_id: str = "default_fernet",
+        max_workers: Optional[int] = None
+    ) -> List[str]:
+        """Encrypt several files concurrently, returning the output paths
+
+        AES-CTR and SHA-256 release the GIL on large buffers, so per-file
+        streams run in parallel across cores. Outputs go to "<path>.encrypted".
+        """
+
+        if not paths:
+            return []
+
+        key = self._get_file_key(key_id)
+        output_paths = [f"{path}.encrypted" for path in paths]
+
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            list(pool.map(
+                lambda pair: self._encrypt_file_stream(pair[0], pair[1], key),
+                zip(paths, output_paths)
+            ))
+
+        with self._stats_lock:
+            key.usage_count += len(paths)
+            self.stats["encryptions"] += len(paths)
+
+        logger.info(f"Encrypted {len(paths)} files with key {key_id}")
+
+        return output_paths
+
+    def _get_file_key(self, key_id: str) -> EncryptionKey:
+        """Active Fernet key for file encryption"""
+
         key = self.keys.get(key_id)
         if not key or not key.is_active:
             raise ValueError(f"Key not found or inactive: {key_id}")
 
-        fernet = Fernet(key.key_data)
+        if key.algorithm not in (EncryptionAlgorithm.FERNET, EncryptionAlgorithm.MULTI_FERNET):
+            raise ValueError(f"File encryption requires a Fernet key: {key_id}")
 
-        with open(file_path, 'rb') as f:
-            file_data = f.read()
+        return key
+
+    def _encrypt_file_stream(self, file_path: str, output_path: str, key: EncryptionKey):
+        """Write header, AES-CTR ciphertext and HMAC tag for one file"""
+
+        # First key for MULTI_FERNET, as MultiFernet does
+        signing_key, encryption_key = self._split_fernet_key(key.key_data.split(b"|")[0])
+        nonce = os.urandom(16)
 
         # Add metadata header
         metadata = {
             "original_filename": os.path.basename(file_path),
             "encrypted_at": datetime.utcnow().isoformat(),
-            "key_id": key_id,
-            "algorithm": key.algorithm.value
+            "key_id": key.key_id,
+            "algorithm": key.algorithm.value,
+            "format": _FILE_FORMAT_CTR,
+            "nonce": nonce.hex()
         }
 
         metadata_json = json.dumps(metadata).encode()
         metadata_length = len(metadata_json).to_bytes(4, byteorder='big')
 
-        # Encrypt file data
-        encrypted_data = fernet.encrypt(file_data)
+        encryptor = Cipher(algorithms.AES(encryption_key), modes.CTR(nonce), backend=self.backend).encryptor()
+        mac = hmac.new(signing_key, metadata_length + metadata_json, hashlib.sha256)
 
-        # Write metadata + encrypted data
-        with open(output_path, 'wb') as f:
+        # Write metadata + encrypted data + tag
+        with open(file_path, 'rb') as src, open(output_path, 'wb') as f:
             f.write(metadata_length)
             f.write(metadata_json)
-            f.write(encrypted_data)
 
-        key.usage_count += 1
-        self.stats["encryptions"] += 1
+            while chunk := src.read(_FILE_CHUNK_SIZE):
+                encrypted_chunk = encryptor.update(chunk)
+                mac.update(encrypted_chunk)
+                f.write(encrypted_chunk)
 
-        logger.info(f"Encrypted file: {file_path} -> {output_path}")
-
-        return output_path
+            f.write(mac.digest())
 
     def decrypt_file(
         self,
@@ -635,23 +1016,25 @@ class EncryptionManager:
             metadata_json = f.read(metadata_length)
             metadata = json.loads(metadata_json.decode())
 
-            # Read encrypted data
-            encrypted_data = f.read()
+            # Get key
+            key_id = metadata["key_id"]
+            key = self.keys.get(key_id)
+            if not key:
+                raise ValueError(f"Key not found: {key_id}")
 
-        # Get key
-        key_id = metadata["key_id"]
-        key = self.keys.get(key_id)
-        if not key:
-            raise ValueError(f"Key not found: {key_id}")
+            if output_path is None:
+                output_path = metadata.get("original_filename", encrypted_path.replace('.encrypted', ''))
 
-        fernet = Fernet(key.key_data)
-        decrypted_data = fernet.decrypt(encrypted_data)
-
-        if output_path is None:
-            output_path = metadata.get("original_filename", encrypted_path.replace('.encrypted', ''))
+            if metadata.get("format") == _FILE_FORMAT_CTR:
+                self._decrypt_file_stream(
+                    f, output_path, key, metadata_length_bytes + metadata_json, bytes.fromhex(metadata["nonce"])
+                )
+            else:
+                # Files written before streaming support hold a single Fernet token
+                decrypted_data = self._fernet_decrypt_raw(key.key_data.split(b"|"), f.read())
 
-        with open(output_path, 'wb') as f:
-            f.write(decrypted_data)
+                with open(output_path, 'wb') as out:
+                    out.write(decrypted_data)
 
         self.stats["decryptions"] += 1
 
@@ -659,6 +1042,99 @@ class EncryptionManager:
 
         return output_path
 
+    def _decrypt_file_stream(self, f, output_path: str, key: EncryptionKey, header: bytes, nonce: bytes):
+        """Decrypt AES-CTR body of f into output_path once its tag verifies, leaving output_path untouched otherwise"""
+
+        body_end = os.fstat(f.fileno()).st_size - _FILE_TAG_SIZE
+        if body_end < f.tell():
+            raise InvalidToken
+
+        f.seek(body_end)
+        tag = f.read(_FILE_TAG_SIZE)
+
+        # First pass: MAC the body under every MultiFernet key at once, without writing anything
+        candidates = [self._split_fernet_key(fernet_key) for fernet_key in key.key_data.split(b"|")]
+        macs = [hmac.new(signing_key, header, hashlib.sha256) for signing_key, _ in candidates]
+        for chunk in self._read_file_body(f, len(header), body_end):
+            for mac in macs:
+                mac.update(chunk)
+
+        for (signing_key, encryption_key), mac in zip(candidates, macs):
+            if hmac.compare_digest(mac.digest(), tag):
+                break
+        else:
+            raise InvalidToken
+
+        # Second pass: decrypt next to the target and swap it in only if the body still verifies
+        decryptor = Cipher(algorithms.AES(encryption_key), modes.CTR(nonce), backend=self.backend).decryptor()
+        mac = hmac.new(signing_key, header, hashlib.sha256)
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix=".partial")
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in self._read_file_body(f, len(header), body_end):
+                    mac.update(chunk)
+                    out.write(decryptor.update(chunk))
+
+            if not hmac.compare_digest(mac.digest(), tag):
+                raise InvalidToken
+
+            os.replace(temp_path, output_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _read_file_body(f, start: int, end: int):
+        """Yield the bytes of f between start and end in _FILE_CHUNK_SIZE chunks"""
+
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(_FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise InvalidToken
+            remaining -= len(chunk)
+            yield chunk
+
+    @staticmethod
+    def _split_fernet_key(fernet_key: bytes) -> Tuple[bytes, bytes]:
+        """Split Fernet key into (signing_key, encryption_key)"""
+
+        raw_key = _b64dec(fernet_key)
+        return raw_key[:16], raw_key[16:]
+
+    def _fernet_decrypt_raw(self, fernet_keys: List[bytes], token: bytes) -> bytes:
+        """Decrypt a Fernet token with the first matching key (no TTL check)"""
+
+        try:
+            data = _b64dec(token)
+        except (TypeError, ValueError) as e:
+            raise InvalidToken from e
+
+        if len(data) < 57 or data[0] != _FERNET_VERSION:
+            raise InvalidToken
+
+        basic_parts, tag = data[:-32], data[-32:]
+        iv, ciphertext = data[9:25], data[25:-32]
+
+        for fernet_key in fernet_keys:
+            signing_key, encryption_key = self._split_fernet_key(fernet_key)
+
+            if not hmac.compare_digest(hmac.new(signing_key, basic_parts, hashlib.sha256).digest(), tag):
+                continue
+
+            decryptor = Cipher(algorithms.AES(encryption_key), modes.CBC(iv), backend=self.backend).decryptor()
+            padded = decryptor.update(ciphertext) + decryptor.finalize()
+
+            unpadder = symmetric_padding.PKCS7(algorithms.AES.block_size).unpadder()
+            try:
+                return unpadder.update(padded) + unpadder.finalize()
+            except ValueError as e:
+                raise InvalidToken from e
+
+        raise InvalidToken
+
     # === Key Management ===
 
     def rotate_key(self, key_id: str) -> str:
@@ -719,15 +1195,21 @@ class EncryptionManager:
     def cleanup_expired_keys(self) -> int:
         """Remove expired keys"""
 
-        now = datetime.utcnow()
-        expired_keys = []
-
-        for key_id, key in self.keys.items():
-            if key.expires_at and now > key.expires_at and not key.is_active:
-                expired_keys.append(key_id)
+        now = int(time.time())
+        expired_slots = np.flatnonzero(
+            (self._key_exp > 0) & (self._key_exp < now) & ~self._key_active
+        )
+        expired_keys = [self._key_ids[slot] for slot in expired_slots]
 
         for key_id in expired_keys:
-            del self.keys[key_id]
+            self.keys.pop(key_id)._on_change = None
+            self._release_key_slot(key_id)
+
+        if expired_keys:
+            self._field_key_memo = {
+                pair: key for pair, key in self._field_key_memo.items()
+                if key.key_id in self.keys
+            }
 
         logger.info(f"Cleaned up {len(expired_keys)} expired keys")
 
@@ -737,11 +1219,16 @@ class EncryptionManager:
 
     def generate_salt(self, length: int = 16) -> bytes:
         """Generate random salt"""
-        return os.urandom(length)
+        return secrets.token_bytes(length)
 
-    def secure_compare(self, a: str, b: str) -> bool:
+    def secure_compare(self, a: Union[str, bytes], b: Union[str, bytes]) -> bool:
         """Secure string comparison to prevent timing attacks"""
-        return hmac.compare_digest(a.encode(), b.encode())
+        # compare_digest is constant-time for unequal lengths too
+        if isinstance(a, str):
+            a = a.encode()
+        if isinstance(b, str):
+            b = b.encode()
+        return hmac.compare_digest(a, b)
 
     def get_encryption_stats(self) -> Dict[str, Any]:
         """Get encryption statistics"""
@@ -759,44 +1246,46 @@ class EncryptionManager:
     def create_encrypted_backup(self, data: Dict[str, Any], password: str) -> str:
         """Create password-encrypted backup of sensitive data"""
 
-        # Derive key from password
+        # Derive raw key from password, used directly with AES-GCM
         salt = self.generate_salt()
-        key, _ = self.derive_key_from_password(password, salt, KeyDerivationFunction.SCRYPT)
+        key = self._derive_raw_key(password, salt, KeyDerivationFunction.SCRYPT)
 
-        # Create temporary Fernet key
-        temp_fernet = Fernet(key)
-
-        # Encrypt data
-        json_data = json.dumps(data, default=str)
-        encrypted_data = temp_fernet.encrypt(json_data.encode())
+        # Encrypt data (nonce stored inline)
+        nonce = secrets.token_bytes(_GCM_NONCE_SIZE)
+        encrypted_data = nonce + AESGCM(key).encrypt(nonce, _dumps(data), None)
 
         # Combine salt and encrypted data
         backup_data = {
-            "salt": base64.b64encode(salt).decode(),
-            "data": base64.b64encode(encrypted_data).decode(),
+            "salt": _b64.b64encode(salt).decode(),
+            "data": _b64.b64encode(encrypted_data).decode(),
             "created_at": datetime.utcnow().isoformat(),
-            "kdf": "scrypt"
+            "kdf": "scrypt",
+            "cipher": EncryptionAlgorithm.AES_GCM.value
         }
 
-        return json.dumps(backup_data)
+        return _dumps(backup_data).decode()
 
     def restore_from_backup(self, backup_str: str, password: str) -> Dict[str, Any]:
         """Restore data from password-encrypted backup"""
 
-        backup_data = json.loads(backup_str)
+        backup_data = _loads(backup_str)
 
         # Extract components
-        salt = base64.b64decode(backup_data["salt"])
-        encrypted_data = base64.b64decode(backup_data["data"])
+        salt = _b64.b64decode(backup_data["salt"])
+        encrypted_data = _b64.b64decode(backup_data["data"])
 
         # Derive key from password
-        key, _ = self.derive_key_from_password(password, salt, KeyDerivationFunction.SCRYPT)
+        key = self._derive_raw_key(password, salt, KeyDerivationFunction.SCRYPT)
 
-        # Decrypt data
-        fernet = Fernet(key)
-        decrypted_json = fernet.decrypt(encrypted_data).decode()
+        # Decrypt data (backups without "cipher" are Fernet)
+        if backup_data.get("cipher") == EncryptionAlgorithm.AES_GCM.value:
+            decrypted = AESGCM(key).decrypt(
+                encrypted_data[:_GCM_NONCE_SIZE], encrypted_data[_GCM_NONCE_SIZE:], None
+            )
+        else:
+            decrypted = Fernet(_b64enc(key)).decrypt(encrypted_data)
 
-        return json.loads(decrypted_json)
+        return _loads(decrypted)
 
 # Global instance
 encryption_manager = EncryptionManager(
@@ -807,43 +1296,43 @@ encryption_manager = EncryptionManager(
 def encrypt_sensitive_data(data: str, user_id: str = "system") -> str:
     """Quick encrypt for sensitive data"""
     encrypted = encryption_manager.encrypt(data)
-    return json.dumps({
+    return _dumps({
         "data": encrypted.data,
         "key_id": encrypted.key_id,
         "algorithm": encrypted.algorithm.value,
-        "timestamp": encrypted.timestamp.isoformat()
-    })
+        "timestamp": _ts_isoformat(encrypted.timestamp)
+    }).decode()
 
 def decrypt_sensitive_data(encrypted_str: str) -> str:
     """Quick decrypt for sensitive data"""
-    data = json.loads(encrypted_str)
+    data = _loads(encrypted_str)
     encrypted_data = EncryptedData(
         data=data["data"],
         key_id=data["key_id"],
         algorithm=EncryptionAlgorithm(data["algorithm"]),
-        timestamp=datetime.fromisoformat(data["timestamp"])
+        timestamp=_datetime_to_ts(datetime.fromisoformat(data["timestamp"]))
     )
     return encryption_manager.decrypt(encrypted_data)
 
 def encrypt_user_field(field_name: str, value: Any, user_id: str) -> str:
     """Encrypt user-specific field"""
     encrypted = encryption_manager.encrypt_field(field_name, value, user_id)
-    return json.dumps({
+    return _dumps({
         "data": encrypted.data,
         "key_id": encrypted.key_id,
         "algorithm": encrypted.algorithm.value,
         "metadata": encrypted.metadata,
-        "timestamp": encrypted.timestamp.isoformat()
-    })
+        "timestamp": _ts_isoformat(encrypted.timestamp)
+    }).decode()
 
 def decrypt_user_field(field_name: str, encrypted_str: str, user_id: str) -> Any:
     """Decrypt user-specific field"""
-    data = json.loads(encrypted_str)
+    data = _loads(encrypted_str)
     encrypted_data = EncryptedData(
         data=data["data"],
         key_id=data["key_id"],
         algorithm=EncryptionAlgorithm(data["algorithm"]),
         metadata=data["metadata"],
-        timestamp=datetime.fromisoformat(data["timestamp"])
+        timestamp=_datetime_to_ts(datetime.fromisoformat(data["timestamp"]))
     )
-    return encryption_manager.decrypt_field(field_name, encrypted_data, user_id)
\ No newline at end of file
+    return encryption_manager.decrypt_field(field_name, encrypted_data, user_id)
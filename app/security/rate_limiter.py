@@ -8,15 +8,150 @@ from datetime import datetime, timedelta
 import redis.asyncio as redis
 from typing import Dict, Optional, Tuple, List
 import json
+import functools
 import hashlib
+import math
+import secrets
 from enum import Enum
 import asyncio
 import time
 import logging
-from dataclasses import dataclass, field
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
 
 logger = logging.getLogger(__name__)
 
+# SCAN page size hint and keys per UNLINK call for bulk admin operations
+_SCAN_COUNT = 1000
+_UNLINK_BATCH = 500
+
+# Windows checked with the sorted-set sliding log (one member per request)
+_SLIDING_WINDOWS = frozenset(("minute", "hour", "day"))
+
+# Fixed windows whose start is a whole multiple of their length since the epoch
+_EPOCH_ALIGNED_WINDOWS = frozenset(("minute", "hour", "day"))
+
+# Sliding log: drop entries older than the window, record `pending` requests
+# already allowed elsewhere unconditionally, then add `increment` members
+# scored with now only if the limit allows, atomically.
+# Returns {allowed, usage (after add if allowed), oldest score in window}
+_SLIDING_LOG_FN = """
+local function sliding_log(key, now, window_ms, limit, increment, member, ttl, pending)
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window_ms)
+    for i = 1, pending do
+        redis.call('ZADD', key, now, member .. ':p' .. i)
+    end
+    local usage = redis.call('ZCARD', key)
+    local allowed = 0
+    if usage + increment <= limit then
+        for i = 1, increment do
+            redis.call('ZADD', key, now, member .. ':' .. i)
+        end
+        usage = usage + increment
+        allowed = 1
+    end
+    if allowed == 1 or pending > 0 then
+        redis.call('EXPIRE', key, ttl)
+    end
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    return {allowed, usage, tonumber(oldest[2] or now)}
+end
+"""
+
+# KEYS: log key
+# ARGV: now_ms, window_ms, limit, increment, member prefix, ttl, pending
+_SLIDING_WINDOW_LUA = _SLIDING_LOG_FN + """
+return sliding_log(KEYS[1], tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]),
+                   tonumber(ARGV[4]), ARGV[5], ARGV[6], tonumber(ARGV[7]))
+"""
+
+# Burst counter: count the request, start the window on first use.
+# KEYS: burst key; ARGV: burst window seconds, max burst
+# Returns 1 if within the burst limit, else 0
+_BURST_LUA = """
+local count = redis.call('INCR', KEYS[1])
+if count == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+if count > tonumber(ARGV[2]) then
+    return 0
+end
+return 1
+"""
+
+# Concurrent slot: take a slot only while under the limit (-1 = unlimited)
+# KEYS: counter key, executions set; ARGV: execution id, ttl, limit
+# Returns 1 if the slot was acquired, else 0
+_ACQUIRE_SLOT_LUA = """
+local limit = tonumber(ARGV[3])
+if limit ~= -1 and tonumber(redis.call('GET', KEYS[1]) or '0') >= limit then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+# Middleware preflight: blacklist, whitelist, burst and sliding-log rate limit
+# in one round trip, in that order, stopping at the first decision. `pending`
+# requests admitted from a local bucket count towards the burst and are
+# recorded in the log even when this request is rejected for bursting.
+# KEYS: blacklist, whitelist, burst, log key
+# ARGV: max_burst, burst_window, now_ms, window_ms, limit (-1 = unlimited),
+#       increment, member prefix, ttl, pending
+# Returns {1, reason, 'hash'} | {1, legacy JSON, 'string'} blacklisted |
+#         {2} whitelisted | {3} burst exceeded |
+#         {0} unlimited | {0, allowed, usage, oldest, burst count}
+_PREFLIGHT_LUA = _SLIDING_LOG_FN + """
+local blocked = redis.call('TYPE', KEYS[1])['ok']
+if blocked == 'hash' then
+    return {1, redis.call('HGET', KEYS[1], 'reason') or 'unknown', blocked}
+elseif blocked ~= 'none' then
+    return {1, redis.call('GET', KEYS[1]), blocked}
+end
+if redis.call('GET', KEYS[2]) then
+    return {2}
+end
+local pending = tonumber(ARGV[9])
+local burst = redis.call('INCRBY', KEYS[3], 1 + pending)
+if burst == 1 + pending then
+    redis.call('EXPIRE', KEYS[3], ARGV[2])
+end
+local limit = tonumber(ARGV[5])
+if burst > tonumber(ARGV[1]) then
+    if pending > 0 and limit ~= -1 then
+        sliding_log(KEYS[4], tonumber(ARGV[3]), tonumber(ARGV[4]), limit,
+                    0, ARGV[7], ARGV[8], pending)
+    end
+    return {3}
+end
+if limit == -1 then
+    return {0}
+end
+local result = sliding_log(KEYS[4], tonumber(ARGV[3]), tonumber(ARGV[4]), limit,
+                           tonumber(ARGV[6]), ARGV[7], ARGV[8], pending)
+return {0, result[1], result[2], result[3], burst}
+"""
+
+# Fixed-window counter that never increments past the limit.
+# KEYS: counter key; ARGV: increment, limit, window seconds
+# Returns {allowed, counter value, ttl}
+_FIXED_WINDOW_LUA = """
+local increment = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', KEYS[1])) or 0
+if current + increment > tonumber(ARGV[2]) then
+    return {0, current, redis.call('TTL', KEYS[1])}
+end
+local value = redis.call('INCRBY', KEYS[1], increment)
+if value == increment then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, value, redis.call('TTL', KEYS[1])}
+"""
+
 class RateLimitTier(Enum):
     FREE = "free"
     STARTER = "starter"
@@ -35,7 +170,7 @@ class RateLimitConfig:
     storage_mb: int = 1000
     bandwidth_mb_per_day: int = 1000
 
-@dataclass
+@dataclass(slots=True)
 class RateLimitResult:
     allowed: bool
     limit: int
@@ -45,10 +180,39 @@ class RateLimitResult:
     retry_after: Optional[int] = None
     tier: Optional[str] = None
 
+@dataclass
+class RateLimitCheck:
+    identifier: str
+    resource: str
+    tier: RateLimitTier = RateLimitTier.FREE
+    increment: int = 1
+
+@dataclass
+class PreflightResult:
+    blacklisted: bool = False
+    reason: Optional[str] = None
+    whitelisted: bool = False
+    burst_ok: bool = True
+    rate_limit: Optional[RateLimitResult] = None
+
 class AdvancedRateLimiter:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
+    def __init__(
+        self,
+        redis_url: str = "redis://localhost:6379",
+        max_connections: Optional[int] = None
+    ):
         self.redis_url = redis_url
+        self.max_connections = max_connections or int(
+            os.getenv("RATE_LIMIT_REDIS_MAX_CONNECTIONS", "64")
+        )
+        self._pool = None
         self._redis_client = None
+        self._init_lock = asyncio.Lock()
+        self._sliding_script = None
+        self._fixed_script = None
+        self._preflight_script = None
+        self._burst_script = None
+        self._acquire_slot_script = None
 
         # Tier-based rate limits
         self.tier_limits = {
@@ -107,34 +271,114 @@ class AdvancedRateLimiter:
             "month": 2592000
         }
 
-        # Sliding window configurations
-        self.sliding_windows = {
-            "minute": {"bucket_size": 10, "buckets": 6},  # 10-second buckets
-            "hour": {"bucket_size": 300, "buckets": 12},  # 5-minute buckets
-            "day": {"bucket_size": 3600, "buckets": 24}   # 1-hour buckets
+        # Flattened limits per tier, e.g. {"requests_per_minute": 20, ...}
+        self._tier_limit_map: Dict[RateLimitTier, Dict[str, int]] = {
+            tier: asdict(config) for tier, config in self.tier_limits.items()
         }
 
-    async def get_redis(self) -> redis.Redis:
-        """Get or create Redis connection"""
-        if not self._redis_client:
-            self._redis_client = redis.from_url(
-                self.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
-                socket_keepalive=True,
-                health_check_interval=30
+        # Shared results for unlimited checks; treat returned results as read-only
+        self._unlimited: Dict[RateLimitTier, RateLimitResult] = {
+            tier: RateLimitResult(
+                allowed=True,
+                limit=-1,
+                current=0,
+                remaining=-1,
+                reset_at="never",
+                tier=tier.value
             )
+            for tier in RateLimitTier
+        }
+
+        # Sliding-window resources counted in-process between Redis syncs.
+        # After a sync, up to local_flush_threshold - 1 further requests within
+        # local_flush_interval seconds are decided against the last known usage
+        # and recorded in Redis on the next sync (eventually consistent; each
+        # process may undercount by less than the threshold meanwhile)
+        self.local_count_resources = frozenset(("requests",))
+        self.local_flush_threshold = 10
+        self.local_flush_interval = 1.0
+        self.local_counters_max = 10000
+        # (identifier, resource, window) -> [pending, usage at sync, synced at, reset_at]
+        self._local_counters: "OrderedDict[Tuple[str, str, str], list]" = OrderedDict()
+
+        # Process-local token buckets for anonymous traffic in the middleware.
+        # A bucket is seeded by an allowed preflight and admits requests
+        # without Redis while it has tokens (refilled at the tier's rate,
+        # capped at local_bucket_capacity), the last sync is recent and the
+        # burst count at that sync plus the requests admitted since stays
+        # within max_burst; the admitted requests are recorded on the next
+        # preflight, burst counter included. Redis remains the authoritative
+        # check, and blacklisting reaches other processes within
+        # local_bucket_sync_interval seconds
+        self.local_bucket_capacity = 5
+        self.local_bucket_sync_interval = 5.0
+        self.local_buckets_max = 100000
+        # identifier -> {resource: [tokens, updated at, pending, synced at,
+        #                           usage at sync, reset_at, burst at sync]}
+        self._local_buckets: "OrderedDict[str, Dict[str, list]]" = OrderedDict()
+
+        # In-process whitelist lookups, LRU-bounded with a TTL. Changes made
+        # through this instance invalidate immediately; other processes see
+        # them within whitelist_cache_ttl seconds
+        self.whitelist_cache_size = 10000
+        self.whitelist_cache_ttl = 30.0
+        # identifier -> (expires at, whitelisted)
+        self._whitelist_cache: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+
+    async def get_redis(self) -> redis.Redis:
+        """Get or create Redis client backed by a bounded connection pool"""
+        if self._redis_client:
+            return self._redis_client
+
+        async with self._init_lock:
+            if not self._redis_client:
+                # Concurrent checks each borrow a connection; callers wait up to
+                # `timeout` for one when all max_connections are in use
+                self._pool = redis.BlockingConnectionPool.from_url(
+                    self.redis_url,
+                    max_connections=self.max_connections,
+                    timeout=1,
+                    encoding="utf-8",
+                    # Replies are mostly integers; skip decoding every reply
+                    # to str and decode the few text values explicitly
+                    decode_responses=False,
+                    socket_keepalive=True,
+                    health_check_interval=30
+                )
+                client = redis.Redis(connection_pool=self._pool)
+
+                # Scripts run via EVALSHA, falling back to EVAL on NOSCRIPT
+                self._sliding_script = client.register_script(_SLIDING_WINDOW_LUA)
+                self._fixed_script = client.register_script(_FIXED_WINDOW_LUA)
+                self._preflight_script = client.register_script(_PREFLIGHT_LUA)
+                self._burst_script = client.register_script(_BURST_LUA)
+                self._acquire_slot_script = client.register_script(_ACQUIRE_SLOT_LUA)
+                self._redis_client = client
+
         return self._redis_client
 
+    async def close(self):
+        """Close the Redis client and its connection pool (app shutdown)"""
+
+        async with self._init_lock:
+            if self._redis_client is None:
+                return
+
+            client, pool = self._redis_client, self._pool
+            self._redis_client = None
+            self._pool = None
+
+            await client.aclose()
+            await pool.aclose()
+
     def _get_sliding_window_key(
         self,
         identifier: str,
         resource: str,
-        window: str,
-        bucket_time: int
+        window: str
     ) -> str:
-        """Generate sliding window bucket key"""
-        return f"rate_limit:sliding:{identifier}:{resource}:{window}:{bucket_time}"
+        """Generate sliding log (sorted set) key"""
+        return f"rate_limit:zwin:{identifier}:{resource}:{window}"
 
     def _get_counter_key(
         self,
@@ -143,15 +387,17 @@ class AdvancedRateLimiter:
         window: str
     ) -> str:
         """Generate counter key for fixed windows"""
+
+        if window in _EPOCH_ALIGNED_WINDOWS:
+            # Minute/hour/day boundaries are multiples of the window in UTC epoch time
+            window_seconds = self.windows[window]
+            window_start = int(time.time()) // window_seconds * window_seconds
+            return f"rate_limit:counter:{identifier}:{resource}:{window}:{window_start}"
+
+        # Weeks start on Monday and months vary in length, so use the calendar
         now = datetime.utcnow()
 
-        if window == "minute":
-            window_start = now.replace(second=0, microsecond=0)
-        elif window == "hour":
-            window_start = now.replace(minute=0, second=0, microsecond=0)
-        elif window == "day":
-            window_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif window == "week":
+        if window == "week":
             # Start of week (Monday)
             days_since_monday = now.weekday()
             week_start = now - timedelta(days=days_since_monday)
@@ -174,84 +420,123 @@ class AdvancedRateLimiter:
     ) -> RateLimitResult:
         """Check rate limit using sliding window algorithm"""
 
-        r = await self.get_redis()
-        config = self.tier_limits[tier]
+        await self.get_redis()
 
         # Get limit for this resource and window
-        limit_attr = f"{resource}_per_{window}"
-        limit = getattr(config, limit_attr, -1)
+        limit = self._tier_limit_map[tier].get(f"{resource}_per_{window}", -1)
 
         # Unlimited
         if limit == -1:
-            return RateLimitResult(
-                allowed=True,
-                limit=limit,
-                current=0,
-                remaining=-1,
-                reset_at="never",
-                tier=tier.value
+            return self._unlimited[tier]
+
+        local_key = None
+        entry = None
+        pending = 0
+
+        if resource in self.local_count_resources:
+            local_key = (identifier, resource, window)
+            entry = self._local_counters.get(local_key)
+
+            if entry is not None:
+                pending, synced_usage, synced_at, reset_at = entry
+                usage = synced_usage + pending + increment
+
+                if (
+                    usage <= limit
+                    and pending + increment < self.local_flush_threshold
+                    and time.monotonic() - synced_at < self.local_flush_interval
+                ):
+                    entry[0] = pending + increment
+                    return RateLimitResult(
+                        allowed=True,
+                        limit=limit,
+                        current=usage,
+                        remaining=limit - usage,
+                        reset_at=reset_at,
+                        tier=tier.value
+                    )
+
+                # Claim the pending batch so concurrent requests don't resend it
+                entry[0] = 0
+                entry[1] += pending
+
+        now_ms = int(time.time() * 1000)
+
+        # Trim, record pending, count and add server-side in one atomic call
+        try:
+            allowed, current_usage, oldest_ms = await self._sliding_script(
+                keys=[self._get_sliding_window_key(identifier, resource, window)],
+                args=[now_ms, *self._sliding_log_args(window, limit, increment, now_ms), pending]
             )
+        except Exception:
+            if pending:
+                entry[0] += pending
+                entry[1] -= pending
+            raise
+
+        result = self._sliding_result(
+            tier, window, limit, now_ms, allowed, current_usage, oldest_ms
+        )
 
-        # Get sliding window config
-        window_config = self.sliding_windows.get(window, {"bucket_size": 60, "buckets": 60})
-        bucket_size = window_config["bucket_size"]
-        num_buckets = window_config["buckets"]
-
-        now = int(time.time())
-        current_bucket = now // bucket_size
-
-        # Use pipeline for atomic operations
-        pipe = r.pipeline()
-
-        # Clean old buckets and count current usage
-        bucket_keys = []
-        for i in range(num_buckets):
-            bucket_time = current_bucket - i
-            bucket_key = self._get_sliding_window_key(identifier, resource, window, bucket_time)
-            bucket_keys.append(bucket_key)
-            pipe.get(bucket_key)
+        if local_key is not None:
+            # Keep requests counted locally while the call was in flight
+            current = self._local_counters.get(local_key)
+            unsynced = current[0] if current is not None else 0
+            self._local_counters[local_key] = [unsynced, current_usage, time.monotonic(), result.reset_at]
+            self._local_counters.move_to_end(local_key)
+            if len(self._local_counters) > self.local_counters_max:
+                self._local_counters.popitem(last=False)
+
+        return result
+
+    def _sliding_log_args(self, window: str, limit: int, increment: int, now_ms: int) -> list:
+        """Sliding log script args after now_ms: window_ms, limit, increment, member, ttl"""
+
+        window_seconds = self.windows[window]
+
+        # The random member suffix keeps requests in the same millisecond distinct
+        return [
+            window_seconds * 1000,
+            limit,
+            increment,
+            f"{now_ms}:{secrets.token_hex(4)}",
+            window_seconds + 10
+        ]
 
-        # Get all bucket values
-        bucket_values = await pipe.execute()
+    def _sliding_result(
+        self,
+        tier: RateLimitTier,
+        window: str,
+        limit: int,
+        now_ms: int,
+        allowed: int,
+        current_usage: int,
+        oldest_ms: int
+    ) -> RateLimitResult:
+        """Build result from sliding log script output"""
 
-        # Calculate current usage
-        current_usage = sum(int(val) if val else 0 for val in bucket_values)
+        window_seconds = self.windows[window]
 
-        # Check if adding increment would exceed limit
-        if current_usage + increment > limit:
-            # Calculate when oldest bucket expires
-            oldest_bucket_time = (current_bucket - num_buckets + 1) * bucket_size
-            reset_time = oldest_bucket_time + self.windows[window]
-            reset_at = datetime.fromtimestamp(reset_time).isoformat()
+        # Usage drops when the oldest entry leaves the window
+        reset_time = (oldest_ms + window_seconds * 1000) / 1000
+        reset_at = datetime.fromtimestamp(reset_time).isoformat()
 
+        if not allowed:
             return RateLimitResult(
                 allowed=False,
                 limit=limit,
                 current=current_usage,
                 remaining=0,
                 reset_at=reset_at,
-                retry_after=max(1, reset_time - now),
+                retry_after=max(1, math.ceil(reset_time - now_ms / 1000)),
                 tier=tier.value
             )
 
-        # Increment current bucket
-        current_bucket_key = self._get_sliding_window_key(identifier, resource, window, current_bucket)
-
-        pipe = r.pipeline()
-        pipe.incrby(current_bucket_key, increment)
-        pipe.expire(current_bucket_key, self.windows[window])
-
-        await pipe.execute()
-
-        # Calculate reset time
-        reset_time = (current_bucket + 1) * bucket_size
-        reset_at = datetime.fromtimestamp(reset_time).isoformat()
-
         return RateLimitResult(
             allowed=True,
             limit=limit,
-            current=current_usage + increment,
-            remaining=max(0, limit - current_usage - increment),
+            current=current_usage,
+            remaining=max(0, limit - current_usage),
             reset_at=reset_at,
             tier=tier.value
         )
@@ -266,28 +551,9 @@ class AdvancedRateLimiter:
     ) -> RateLimitResult:
         """Check rate limit with automatic window detection"""
 
-        # Determine appropriate window based on resource
-        if "_per_minute" in resource:
-            window = "minute"
-            limit_key = resource
-        elif "_per_hour" in resource:
-            window = "hour"
-            limit_key = resource
-        elif "_per_day" in resource:
-            window = "day"
-            limit_key = resource
-        elif "_per_week" in resource:
-            window = "week"
-            limit_key = resource
-        elif "_per_month" in resource:
-            window = "month"
-            limit_key = resource
-        else:
-            # Default for generic resources
-            window = "hour"
-            limit_key = f"{resource}_per_hour"
+        resource, window = self._split_resource(resource)
 
-        if use_sliding_window and window in self.sliding_windows:
+        if use_sliding_window and window in _SLIDING_WINDOWS:
             return await self.check_rate_limit_sliding(
                 identifier, resource, tier, increment, window
             )
@@ -296,6 +562,253 @@ class AdvancedRateLimiter:
                 identifier, resource, tier, increment, window
             )
 
+    async def check_many(self, checks: List[RateLimitCheck]) -> List[RateLimitResult]:
+        """Run several rate limit checks (e.g. per IP, per user and global)
+        in a single pipelined round trip
+
+        Each check behaves like check_rate_limit with the default sliding
+        window, except that in-process counting is bypassed. Results are
+        returned in the order of checks.
+        """
+
+        r = await self.get_redis()
+        now_ms = int(time.time() * 1000)
+
+        pipe = r.pipeline(transaction=False)
+        # Per check: (tier, window, limit, sliding), or None when unlimited
+        pending = []
+
+        for check in checks:
+            resource, window = self._split_resource(check.resource)
+            limit = self._tier_limit_map[check.tier].get(f"{resource}_per_{window}", -1)
+
+            if limit == -1:
+                pending.append(None)
+                continue
+
+            sliding = window in _SLIDING_WINDOWS
+            if sliding:
+                # Queued on the pipeline; replies arrive from execute()
+                await self._sliding_script(
+                    keys=[self._get_sliding_window_key(check.identifier, resource, window)],
+                    args=[now_ms, *self._sliding_log_args(window, limit, check.increment, now_ms), 0],
+                    client=pipe
+                )
+            else:
+                await self._fixed_script(
+                    keys=[self._get_counter_key(check.identifier, resource, window)],
+                    args=[check.increment, limit, self.windows[window]],
+                    client=pipe
+                )
+            pending.append((check.tier, window, limit, sliding))
+
+        replies = iter(await pipe.execute())
+        results = []
+
+        for check, entry in zip(checks, pending):
+            if entry is None:
+                results.append(self._unlimited[check.tier])
+                continue
+
+            tier, window, limit, sliding = entry
+            reply = next(replies)
+            if sliding:
+                results.append(self._sliding_result(tier, window, limit, now_ms, *reply))
+            else:
+                results.append(self._fixed_result(tier, window, limit, *reply))
+
+        return results
+
+    def _split_resource(self, resource: str) -> Tuple[str, str]:
+        """Split "<resource>_per_<window>" into (resource, window); bare
+        resources default to the hourly window"""
+
+        for window in self.windows:
+            suffix = f"_per_{window}"
+            if resource.endswith(suffix):
+                return resource[:-len(suffix)], window
+
+        return resource, "hour"
+
+    async def preflight(
+        self,
+        identifier: str,
+        resource: str,
+        tier: RateLimitTier = RateLimitTier.FREE,
+        increment: int = 1,
+        max_burst: int = 10,
+        burst_window: int = 60,
+        local_bucket: bool = False
+    ) -> PreflightResult:
+        """Blacklist, whitelist, burst and sliding-window rate limit checks
+        for one request in a single Redis round trip
+
+        Same decisions, in the same order, as calling is_blacklisted,
+        is_whitelisted, check_burst_protection and check_rate_limit in turn.
+        Identifiers found whitelisted are cached in-process; until the cache
+        entry expires only their blacklist entry is checked in Redis. With
+        local_bucket, requests may be admitted from a process-local token
+        bucket instead (see __init__).
+        """
+
+        r = await self.get_redis()
+
+        resource, window = self._split_resource(resource)
+        if window not in _SLIDING_WINDOWS:
+            raise ValueError(f"Preflight supports sliding windows only, got: {window}")
+
+        # The blacklist still wins over a cached whitelist entry; on a hit
+        # the full script below reports the reason
+        if self._cached_whitelist(identifier) and not await r.exists(f"blacklist:{identifier}"):
+            return PreflightResult(whitelisted=True)
+
+        limit = self._tier_limit_map[tier].get(f"{resource}_per_{window}", -1)
+
+        local_bucket = local_bucket and limit != -1
+        bucket_key = f"{resource}_per_{window}"
+        entry = None
+        pending = 0
+
+        if local_bucket:
+            buckets = self._local_buckets.get(identifier)
+            entry = buckets.get(bucket_key) if buckets else None
+
+            if entry is not None:
+                rate_limit = self._take_local_token(entry, tier, window, limit, increment, max_burst)
+                if rate_limit is not None:
+                    return PreflightResult(rate_limit=rate_limit)
+                # Claim the pending batch so concurrent requests don't resend it
+                pending = entry[2]
+                entry[2] = 0
+                entry[4] += pending
+
+        now_ms = int(time.time() * 1000)
+
+        try:
+            reply = await self._preflight_script(
+                keys=[
+                    f"blacklist:{identifier}",
+                    f"whitelist:{identifier}",
+                    f"burst:{identifier}",
+                    self._get_sliding_window_key(identifier, resource, window)
+                ],
+                args=[
+                    max_burst,
+                    burst_window,
+                    now_ms,
+                    *self._sliding_log_args(window, limit, increment, now_ms),
+                    pending
+                ]
+            )
+        except Exception:
+            if pending:
+                entry[2] += pending
+                entry[4] -= pending
+            raise
+
+        status = reply[0]
+
+        if status != 0 and local_bucket:
+            self._local_buckets.pop(identifier, None)
+
+        if status == 1:
+            reason = reply[1].decode() if reply[2] == b"hash" else self._blacklist_reason(reply[1])
+            return PreflightResult(blacklisted=True, reason=reason)
+        if status == 2:
+            self._cache_whitelist(identifier, True)
+            return PreflightResult(whitelisted=True)
+        if status == 3:
+            return PreflightResult(burst_ok=False)
+
+        if len(reply) == 1:
+            # Unlimited
+            rate_limit = self._unlimited[tier]
+        else:
+            rate_limit = self._sliding_result(tier, window, limit, now_ms, *reply[1:4])
+
+            if local_bucket:
+                self._sync_local_bucket(identifier, bucket_key, rate_limit, reply[4])
+
+        return PreflightResult(rate_limit=rate_limit)
+
+    def _take_local_token(
+        self,
+        entry: list,
+        tier: RateLimitTier,
+        window: str,
+        limit: int,
+        increment: int,
+        max_burst: int
+    ) -> Optional[RateLimitResult]:
+        """Admit a request from a local token bucket, None if Redis must decide"""
+
+        tokens, updated_at, pending, synced_at, synced_usage, reset_at, synced_burst = entry
+        now = time.monotonic()
+
+        # Blacklist and burst decisions must come from a recent sync; the
+        # burst count is a lower bound, as other processes may add to it
+        if now - synced_at >= self.local_bucket_sync_interval or synced_burst + pending + 1 > max_burst:
+            return None
+
+        tokens = min(
+            self.local_bucket_capacity,
+            tokens + (now - updated_at) * limit / self.windows[window]
+        )
+        entry[0] = tokens
+        entry[1] = now
+
+        usage = synced_usage + pending + increment
+        if tokens < increment or usage > limit:
+            return None
+
+        entry[0] = tokens - increment
+        entry[2] = pending + increment
+
+        return RateLimitResult(
+            allowed=True,
+            limit=limit,
+            current=usage,
+            remaining=limit - usage,
+            reset_at=reset_at,
+            tier=tier.value
+        )
+
+    def _sync_local_bucket(
+        self,
+        identifier: str,
+        bucket_key: str,
+        rate_limit: RateLimitResult,
+        burst: int
+    ):
+        """Refresh a local token bucket from a preflight decision"""
+
+        buckets = self._local_buckets.get(identifier)
+
+        if not rate_limit.allowed:
+            if buckets:
+                buckets.pop(bucket_key, None)
+            return
+
+        if buckets is None:
+            buckets = self._local_buckets[identifier] = {}
+            if len(self._local_buckets) > self.local_buckets_max:
+                self._local_buckets.popitem(last=False)
+        else:
+            self._local_buckets.move_to_end(identifier)
+
+        now = time.monotonic()
+        entry = buckets.get(bucket_key)
+
+        if entry is None:
+            # New buckets start full
+            buckets[bucket_key] = [
+                self.local_bucket_capacity, now, 0, now, rate_limit.current, rate_limit.reset_at, burst
+            ]
+        else:
+            # Keep the token balance and requests admitted locally while
+            # the call was in flight; the claimed batch was just recorded
+            entry[3:] = [now, rate_limit.current, rate_limit.reset_at, burst]
+
     async def check_rate_limit_fixed(
         self,
         identifier: str,
@@ -306,50 +819,46 @@ class AdvancedRateLimiter:
     ) -> RateLimitResult:
         """Check rate limit using fixed window algorithm"""
 
-        r = await self.get_redis()
-        config = self.tier_limits[tier]
+        await self.get_redis()
 
         # Get limit for this resource
-        limit_attr = f"{resource}_per_{window}"
-        limit = getattr(config, limit_attr, -1)
+        limit = self._tier_limit_map[tier].get(f"{resource}_per_{window}", -1)
 
         # Unlimited
         if limit == -1:
-            return RateLimitResult(
-                allowed=True,
-                limit=limit,
-                current=0,
-                remaining=-1,
-                reset_at="never",
-                tier=tier.value
-            )
+            return self._unlimited[tier]
 
         # Generate key for current window
         key = self._get_counter_key(identifier, resource, window)
 
-        # Use pipeline for atomic operations
-        pipe = r.pipeline()
-        pipe.get(key)
-        pipe.incrby(key, increment)
-        pipe.expire(key, self.windows[window])
+        # Check and increment atomically; rejected checks leave the counter as is
+        allowed, value, ttl = await self._fixed_script(
+            keys=[key],
+            args=[increment, limit, self.windows[window]]
+        )
 
-        results = await pipe.execute()
-        current = int(results[0]) if results[0] else 0
-        new_value = results[1]
+        return self._fixed_result(tier, window, limit, allowed, value, ttl)
+
+    def _fixed_result(
+        self,
+        tier: RateLimitTier,
+        window: str,
+        limit: int,
+        allowed: int,
+        value: int,
+        ttl: int
+    ) -> RateLimitResult:
+        """Build result from fixed window script output"""
 
         # Calculate reset time
-        ttl = await r.ttl(key)
         reset_at = datetime.utcnow() + timedelta(seconds=ttl if ttl > 0 else self.windows[window])
 
         # Check if limit exceeded
-        if new_value > limit:
-            # Revert increment
-            await r.decrby(key, increment)
-
+        if not allowed:
             return RateLimitResult(
                 allowed=False,
                 limit=limit,
-                current=current,
+                current=value,
                 remaining=0,
                 reset_at=reset_at.isoformat(),
                 retry_after=ttl,
@@ -359,8 +868,8 @@ class AdvancedRateLimiter:
         return RateLimitResult(
             allowed=True,
             limit=limit,
-            current=new_value,
-            remaining=max(0, limit - new_value),
+            current=value,
+            remaining=max(0, limit - value),
             reset_at=reset_at.isoformat(),
             tier=tier.value
         )
@@ -399,35 +908,17 @@ class AdvancedRateLimiter:
     ) -> bool:
         """Acquire slot for concurrent execution"""
 
-        r = await self.get_redis()
-
-        # Check if slot is available
-        allowed, current, limit = await self.check_concurrent_limit(user_id, tier, resource_type)
-
-        if not allowed:
-            return False
-
-        # Increment counter atomically
-        key = f"concurrent:{user_id}:{resource_type}"
-        exec_key = f"concurrent_execs:{user_id}:{resource_type}"
-
-        pipe = r.pipeline()
-        pipe.incr(key)
-        pipe.sadd(exec_key, execution_id)
-        pipe.expire(key, timeout)
-        pipe.expire(exec_key, timeout)
-
-        results = await pipe.execute()
-        new_count = results[0]
+        await self.get_redis()
+        limit = self.tier_limits[tier].concurrent_executions
 
-        # Check if we exceeded limit after increment
-        if new_count > limit and limit != -1:
-            # Revert
-            await r.decr(key)
-            await r.srem(exec_key, execution_id)
-            return False
-
-        return True
+        # Check and increment atomically so concurrent acquires cannot overshoot
+        return bool(await self._acquire_slot_script(
+            keys=[
+                f"concurrent:{user_id}:{resource_type}",
+                f"concurrent_execs:{user_id}:{resource_type}"
+            ],
+            args=[execution_id, timeout, limit]
+        ))
 
     async def release_concurrent_slot(
         self,
@@ -458,29 +949,26 @@ class AdvancedRateLimiter:
 
         r = await self.get_redis()
         config = self.tier_limits[tier]
+        tier_limits = self._tier_limit_map[tier]
 
         stats = {
             "tier": tier.value,
             "usage": {},
-            "limits": {}
+            "limits": dict(tier_limits)
         }
 
-        # Get limits
-        for attr in dir(config):
-            if not attr.startswith('_') and not callable(getattr(config, attr)):
-                value = getattr(config, attr)
-                stats["limits"][attr] = value
-
         # Get current usage for each resource type
         resource_types = ["requests", "agent_executions", "workflow_executions", "api_calls"]
         windows = ["minute", "hour", "day"]
 
+        # Collect limited (resource, window) counters, then read them all in one pipeline
+        counters = []
+
         for resource in resource_types:
             stats["usage"][resource] = {}
 
             for window in windows:
-                limit_attr = f"{resource}_per_{window}"
-                limit = getattr(config, limit_attr, None)
+                limit = tier_limits.get(f"{resource}_per_{window}")
 
                 if limit is None:
                     continue
@@ -489,32 +977,44 @@ class AdvancedRateLimiter:
                     stats["usage"][resource][window] = "unlimited"
                     continue
 
-                # Get current usage
-                key = self._get_counter_key(identifier, resource, window)
-                current = await r.get(key)
-                current = int(current) if current else 0
-
-                usage_info = {
-                    "current": current,
-                    "limit": limit,
-                    "remaining": max(0, limit - current),
-                    "percentage": round((current / limit * 100), 2) if limit > 0 else 0
-                }
-
-                if detailed:
-                    # Add TTL info
-                    ttl = await r.ttl(key)
-                    if ttl > 0:
-                        usage_info["resets_in_seconds"] = ttl
-                        usage_info["resets_at"] = (
-                            datetime.utcnow() + timedelta(seconds=ttl)
-                        ).isoformat()
-
-                stats["usage"][resource][window] = usage_info
+                counters.append((resource, window, limit))
 
-        # Get concurrent usage
         concurrent_key = f"concurrent:{identifier}:execution"
-        concurrent_current = await r.get(concurrent_key)
+
+        pipe = r.pipeline()
+        for resource, window, limit in counters:
+            key = self._get_counter_key(identifier, resource, window)
+            pipe.get(key)
+            if detailed:
+                pipe.ttl(key)
+        pipe.get(concurrent_key)
+
+        results = iter(await pipe.execute())
+
+        for resource, window, limit in counters:
+            current = next(results)
+            current = int(current) if current else 0
+
+            usage_info = {
+                "current": current,
+                "limit": limit,
+                "remaining": max(0, limit - current),
+                "percentage": round((current / limit * 100), 2) if limit > 0 else 0
+            }
+
+            if detailed:
+                # Add TTL info
+                ttl = next(results)
+                if ttl > 0:
+                    usage_info["resets_in_seconds"] = ttl
+                    usage_info["resets_at"] = (
+                        datetime.utcnow() + timedelta(seconds=ttl)
+                    ).isoformat()
+
+            stats["usage"][resource][window] = usage_info
+
+        # Get concurrent usage
+        concurrent_current = next(results)
         concurrent_current = int(concurrent_current) if concurrent_current else 0
 
         stats["usage"]["concurrent_executions"] = {
@@ -549,14 +1049,7 @@ class AdvancedRateLimiter:
 
         elif resource:
             # Reset all windows for resource
-            pattern = f"rate_limit:counter:{identifier}:{resource}:*"
-            keys = []
-            async for key in r.scan_iter(match=pattern):
-                keys.append(key)
-
-            deleted = 0
-            if keys:
-                deleted = await r.delete(*keys)
+            deleted = await self._unlink_matching(r, f"rate_limit:counter:{identifier}:{resource}:*")
 
             return {
                 "reset": True,
@@ -569,20 +1062,14 @@ class AdvancedRateLimiter:
             # Reset all limits for identifier
             patterns = [
                 f"rate_limit:counter:{identifier}:*",
-                f"rate_limit:sliding:{identifier}:*",
+                f"rate_limit:zwin:{identifier}:*",
                 f"concurrent:{identifier}:*",
                 f"concurrent_execs:{identifier}:*"
             ]
 
             total_deleted = 0
             for pattern in patterns:
-                keys = []
-                async for key in r.scan_iter(match=pattern):
-                    keys.append(key)
-
-                if keys:
-                    deleted = await r.delete(*keys)
-                    total_deleted += deleted
+                total_deleted += await self._unlink_matching(r, pattern)
 
             return {
                 "reset": True,
@@ -590,6 +1077,23 @@ class AdvancedRateLimiter:
                 "keys_deleted": total_deleted
             }
 
+    async def _unlink_matching(self, r: redis.Redis, pattern: str) -> int:
+        """UNLINK keys matching pattern in batches, returning the number removed"""
+
+        deleted = 0
+        batch = []
+
+        async for key in r.scan_iter(match=pattern, count=_SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= _UNLINK_BATCH:
+                deleted += await r.unlink(*batch)
+                batch = []
+
+        if batch:
+            deleted += await r.unlink(*batch)
+
+        return deleted
+
     async def get_global_stats(self) -> Dict:
         """Get global rate limiting statistics"""
 
@@ -598,7 +1102,7 @@ class AdvancedRateLimiter:
         # Count active rate limit keys
         patterns = [
             "rate_limit:counter:*",
-            "rate_limit:sliding:*",
+            "rate_limit:zwin:*",
             "concurrent:*"
         ]
 
@@ -613,10 +1117,10 @@ class AdvancedRateLimiter:
             key_type = pattern.split(':')[1]
             key_count = 0
 
-            async for key in r.scan_iter(match=pattern):
+            async for key in r.scan_iter(match=pattern, count=_SCAN_COUNT):
                 key_count += 1
                 # Extract user ID from key
-                parts = key.split(':')
+                parts = key.split(b':')
                 if len(parts) >= 3:
                     stats["active_users"].add(parts[2])
 
@@ -635,23 +1139,13 @@ class AdvancedRateLimiter:
     ) -> bool:
         """Check if identifier is making burst requests"""
 
-        r = await self.get_redis()
-
-        key = f"burst:{identifier}"
-        current = await r.get(key)
+        await self.get_redis()
 
-        if not current:
-            # First request in window
-            await r.setex(key, burst_window, 1)
-            return True
-
-        current = int(current)
-        if current >= max_burst:
-            return False
-
-        # Increment
-        await r.incr(key)
-        return True
+        # Count and check in one atomic call; the window starts on first request
+        return bool(await self._burst_script(
+            keys=[f"burst:{identifier}"],
+            args=[burst_window, max_burst]
+        ))
 
     async def whitelist_identifier(
         self,
@@ -668,12 +1162,51 @@ class AdvancedRateLimiter:
         else:
             await r.set(key, "true")
 
+        self._whitelist_cache.pop(identifier, None)
+
+    async def remove_from_whitelist(self, identifier: str) -> bool:
+        """Remove identifier from whitelist"""
+
+        r = await self.get_redis()
+        removed = await r.delete(f"whitelist:{identifier}")
+
+        self._whitelist_cache.pop(identifier, None)
+        return removed > 0
+
     async def is_whitelisted(self, identifier: str) -> bool:
         """Check if identifier is whitelisted"""
 
+        cached = self._cached_whitelist(identifier)
+        if cached is not None:
+            return cached
+
         r = await self.get_redis()
         key = f"whitelist:{identifier}"
-        return bool(await r.get(key))
+        whitelisted = bool(await r.get(key))
+
+        self._cache_whitelist(identifier, whitelisted)
+        return whitelisted
+
+    def _cached_whitelist(self, identifier: str) -> Optional[bool]:
+        """Whitelist status from the in-process cache, None on miss or expiry"""
+
+        cached = self._whitelist_cache.get(identifier)
+        if cached is None:
+            return None
+
+        expires, whitelisted = cached
+        if expires <= time.monotonic():
+            del self._whitelist_cache[identifier]
+            return None
+
+        self._whitelist_cache.move_to_end(identifier)
+        return whitelisted
+
+    def _cache_whitelist(self, identifier: str, whitelisted: bool):
+        self._whitelist_cache[identifier] = (time.monotonic() + self.whitelist_cache_ttl, whitelisted)
+        self._whitelist_cache.move_to_end(identifier)
+        if len(self._whitelist_cache) > self.whitelist_cache_size:
+            self._whitelist_cache.popitem(last=False)
 
     async def blacklist_identifier(
         self,
@@ -683,51 +1216,57 @@ class AdvancedRateLimiter:
     ):
         """Add identifier to blacklist (blocks all requests)"""
 
+        # Locally cached whitelist entries and token buckets skip the blacklist check
+        self._whitelist_cache.pop(identifier, None)
+        self._local_buckets.pop(identifier, None)
+
         r = await self.get_redis()
         key = f"blacklist:{identifier}"
         data = {"reason": reason, "blocked_at": datetime.utcnow().isoformat()}
 
+        # Stored as a hash so checks read the reason without parsing JSON;
+        # delete first in case a legacy JSON string entry exists
+        pipe = r.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping=data)
         if expiry:
-            await r.setex(key, expiry, json.dumps(data))
-        else:
-            await r.set(key, json.dumps(data))
+            pipe.expire(key, expiry)
+        await pipe.execute()
 
     async def is_blacklisted(self, identifier: str) -> Tuple[bool, Optional[str]]:
         """Check if identifier is blacklisted"""
 
         r = await self.get_redis()
         key = f"blacklist:{identifier}"
-        data = await r.get(key)
 
-        if data:
-            try:
-                parsed = json.loads(data)
-                return True, parsed.get("reason", "unknown")
-            except:
-                return True, "unknown"
+        try:
+            reason = await r.hget(key, "reason")
+        except redis.ResponseError:
+            # Legacy entry stored as a JSON string
+            return True, self._blacklist_reason(await r.get(key))
 
-        return False, None
+        if reason is None:
+            return False, None
+        return True, reason.decode()
 
-    async def cleanup_expired_keys(self) -> int:
-        """Clean up expired rate limit keys"""
+    def _blacklist_reason(self, data: bytes) -> str:
+        """Reason stored in a legacy JSON blacklist entry"""
+        try:
+            parsed = json.loads(data)
+            return parsed.get("reason", "unknown")
+        except:
+            return "unknown"
 
-        r = await self.get_redis()
-        patterns = [
-            "rate_limit:counter:*",
-            "rate_limit:sliding:*",
-            "concurrent:*",
-            "burst:*"
-        ]
+    async def cleanup_expired_keys(self) -> int:
+        """Clean up expired rate limit keys
 
-        cleaned = 0
-        for pattern in patterns:
-            async for key in r.scan_iter(match=pattern, count=100):
-                ttl = await r.ttl(key)
-                if ttl == -2:  # Key doesn't exist (expired)
-                    cleaned += 1
+        Every rate limit key is written with a TTL, so Redis expires them on its
+        own and SCAN never returns an expired key; there is nothing to remove.
+        Kept for API compatibility, always returns 0.
+        """
 
-        logger.info(f"Rate limiter cleanup: found {cleaned} expired keys")
-        return cleaned
+        logger.info("Rate limiter cleanup: keys expire via Redis TTLs, nothing to do")
+        return 0
 
 # Global instance
 rate_limiter = AdvancedRateLimiter()
@@ -736,6 +1275,24 @@ rate_limiter = AdvancedRateLimiter()
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import JSONResponse
 
+# Path pattern -> rate-limited resource, first match wins. Executions are
+# typically hourly limits; API calls and general requests use minute limits
+_ROUTE_TABLE = (
+    ("/api/agents/execute", "agent_executions_per_hour"),
+    ("/api/workflows/execute", "workflow_executions_per_hour"),
+    ("/api/", "api_calls_per_minute"),
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def _resource_for(path: str) -> str:
+    """Rate-limited resource for a request path"""
+    for pattern, resource in _ROUTE_TABLE:
+        if pattern in path:
+            return resource
+    return "requests_per_minute"
+
+
 async def rate_limit_middleware(request: Request, call_next):
     """FastAPI middleware for automatic rate limiting"""
 
@@ -747,30 +1304,35 @@ async def rate_limit_middleware(request: Request, call_next):
     user = getattr(request.state, "user", None)
     if user:
         identifier = f"user:{user.id}"
-        tier = RateLimitTier(getattr(user, "tier", "free"))
+        tier = get_tier_from_user(user)
     else:
         # Rate limit by IP for unauthenticated users
         identifier = f"ip:{request.client.host}"
         tier = RateLimitTier.FREE
 
-    # Check if blacklisted
-    is_blocked, reason = await rate_limiter.is_blacklisted(identifier)
-    if is_blocked:
+    # Determine resource type based on endpoint
+    resource = _resource_for(request.url.path)
+
+    # Blacklist, whitelist, burst protection and rate limit in one round trip
+    # Anonymous traffic may be admitted from a process-local token bucket
+    preflight = await rate_limiter.preflight(
+        identifier, resource, tier, local_bucket=user is None
+    )
+
+    if preflight.blacklisted:
         return JSONResponse(
             status_code=403,
             content={
                 "error": "Access denied",
-                "reason": reason,
+                "reason": preflight.reason,
                 "blocked": True
             }
         )
 
-    # Check if whitelisted
-    if await rate_limiter.is_whitelisted(identifier):
+    if preflight.whitelisted:
         return await call_next(request)
 
-    # Check burst protection
-    if not await rate_limiter.check_burst_protection(identifier):
+    if not preflight.burst_ok:
         return JSONResponse(
             status_code=429,
             content={
@@ -779,34 +1341,7 @@ async def rate_limit_middleware(request: Request, call_next):
             }
         )
 
-    # Determine resource type based on endpoint
-    path = request.url.path
-    method = request.method
-
-    if "/api/agents/execute" in path:
-        resource = "agent_executions"
-    elif "/api/workflows/execute" in path:
-        resource = "workflow_executions"
-    elif "/api/" in path:
-        resource = "api_calls"
-    else:
-        resource = "requests"
-
-    # Check appropriate rate limit
-    if resource in ["agent_executions", "workflow_executions"]:
-        # These are typically hourly/daily limits
-        result = await rate_limiter.check_rate_limit(
-            identifier,
-            f"{resource}_per_hour",
-            tier
-        )
-    else:
-        # API calls and general requests use minute limits
-        result = await rate_limiter.check_rate_limit(
-            identifier,
-            f"{resource}_per_minute",
-            tier
-        )
+    result = preflight.rate_limit
 
     if not result.allowed:
         response_data = {
@@ -853,15 +1388,11 @@ def get_tier_from_user(user) -> RateLimitTier:
     if not user:
         return RateLimitTier.FREE
 
-    tier_mapping = {
-        "free": RateLimitTier.FREE,
-        "starter": RateLimitTier.STARTER,
-        "pro": RateLimitTier.PRO,
-        "enterprise": RateLimitTier.ENTERPRISE
-    }
-
-    user_tier = getattr(user, "tier", "free").lower()
-    return tier_mapping.get(user_tier, RateLimitTier.FREE)
+    # Enum value lookup; unknown tiers fall back to free
+    try:
+        return RateLimitTier(getattr(user, "tier", "free").lower())
+    except ValueError:
+        return RateLimitTier.FREE
 
 async def check_endpoint_rate_limit(
     identifier: str,
@@ -9,9 +9,15 @@ import asyncio
 import tempfile
 import hashlib
 import uuid
-from typing import Dict, Any, Optional, List
+import shutil
+import sys
+import marshal
+from functools import partial
+from typing import Dict, Any, Optional, List, Tuple
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import docker
+import numpy as np
 from docker.types import Mount, RestartPolicy, LogConfig
 import resource
 import signal
@@ -20,15 +26,63 @@ import aiofiles
 import logging
 import time
 import threading
-from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
+from app.security._pattern_backend import PatternSet
 
 logger = logging.getLogger(__name__)
 
+# Python version of the sandbox image; marshalled code only loads there
+SANDBOX_PYTHON_VERSION = (3, 11)
+
+# Constant scaffold of the Python security wrapper; user code is spliced
+# between head and tail
+_PY_WRAPPER_HEAD = b"""
+# Auto-generated security wrapper
+import signal
+import sys
+import time
+
+def timeout_handler(signum, frame):
+    print("TIMEOUT: Execution time limit exceeded", file=sys.stderr)
+    sys.exit(124)
+
+signal.signal(signal.SIGALRM, timeout_handler)
+signal.alarm(30)
+
+start_time = time.time()
+
+try:
+    # User code starts here
+"""
+
+_PY_WRAPPER_TAIL = b"""
+
+except Exception as e:
+    print(f"ERROR: {str(e)}", file=sys.stderr)
+    sys.exit(1)
+finally:
+    elapsed = time.time() - start_time
+    print(f"\\n# Execution completed in {elapsed:.3f} seconds", file=sys.stderr)
+    signal.alarm(0)
+"""
+
+# Imports the in-container Python wrapper rejects in source files. It skips
+# that check for .pyc files, so the host applies it before precompiling.
+_WRAPPER_DANGEROUS_IMPORTS = ('os', 'subprocess', 'socket', 'ctypes', 'sys')
+
+def _compile_python(source: bytes) -> Optional[bytes]:
+    """Marshalled code object for wrapped user code, None if it does not compile"""
+    try:
+        return marshal.dumps(compile(source, "<user>", "exec"))
+    except (SyntaxError, ValueError):
+        # Let the sandbox report the error as it would for source
+        return None
+
 @dataclass
 class SandboxResult:
     success: bool
-    output: str
+    output: str = ""
     error: Optional[str] = None
     execution_id: str = ""
     duration_ms: float = 0
@@ -46,7 +100,97 @@ class SandboxConfig:
     max_file_size: int = 10485760  # 10MB
     max_output_size: int = 1048576  # 1MB
 
+@dataclass
+class WarmContainer:
+    """Idle, already started sandbox container waiting for one execution"""
+    container: Any
+    language: str
+    workdir: str
+    code_file: str
+    input_file: str
+    compiled_file: Optional[str] = None
+    created_at: float = field(default_factory=time.monotonic)
+
 class SecureSandbox:
+    # Language-specific dangerous patterns
+    DANGEROUS_PATTERNS = {
+        "python": [
+            r"import\s+os\b",
+            r"import\s+subprocess\b",
+            r"import\s+socket\b",
+            r"import\s+ctypes\b",
+            r"from\s+os\s+import",
+            r"from\s+subprocess\s+import",
+            r"__import__\s*\(",
+            r"eval\s*\(",
+            r"exec\s*\(",
+            r"compile\s*\(",
+            r"open\s*\(",
+            r"file\s*\(",
+            r"input\s*\(",
+            r"raw_input\s*\(",
+            r"__builtins__",
+            r"globals\s*\(",
+            r"locals\s*\(",
+            r"vars\s*\(",
+            r"dir\s*\(",
+            r"getattr\s*\(",
+            r"setattr\s*\(",
+            r"delattr\s*\(",
+            r"hasattr\s*\(",
+            r"while\s+True\s*:",  # Potential infinite loop
+            r"for.*while.*:"  # Nested loops
+        ],
+        "javascript": [
+            r"require\s*\(\s*['\"]fs['\"]",
+            r"require\s*\(\s*['\"]child_process['\"]",
+            r"require\s*\(\s*['\"]net['\"]",
+            r"require\s*\(\s*['\"]http['\"]",
+            r"eval\s*\(",
+            r"Function\s*\(",
+            r"setTimeout\s*\(",
+            r"setInterval\s*\(",
+            r"process\.exit",
+            r"process\.kill",
+            r"process\.env",
+            r"__dirname",
+            r"__filename",
+            r"while\s*\(\s*true\s*\)",  # Infinite loop
+            r"for\s*\(\s*;\s*;\s*\)"  # Infinite loop
+        ],
+        "bash": [
+            r"rm\s+-rf",
+            r"dd\s+if=",
+            r"mkfs",
+            r":\(\)\{\s*:\|\:&\s*\};:",  # Fork bomb
+            r">\s*/dev/sd[a-z]",
+            r"chmod\s+777",
+            r"sudo\b",
+            r"su\s+-",
+            r"nc\s+-",
+            r"telnet\b",
+            r"wget\b",
+            r"curl\b",
+            r"ssh\b",
+            r"while\s+true",  # Infinite loop
+            r"until\s+false"  # Infinite loop
+        ],
+        "sql": [
+            r"DROP\s+DATABASE",
+            r"DROP\s+TABLE",
+            r"DELETE\s+FROM",
+            r"TRUNCATE\b",
+            r"ALTER\s+TABLE",
+            r"CREATE\s+USER",
+            r"GRANT\b",
+            r"REVOKE\b",
+            r"SHUTDOWN\b",
+            r"EXEC\b",
+            r"xp_cmdshell",
+            r"WHILE\s+1\s*=\s*1"  # Infinite loop
+        ]
+    }
+
     def __init__(self, config: Dict = None):
         self.config = config or {}
         self.docker_client = docker.from_env()
@@ -57,11 +201,79 @@ class SecureSandbox:
         self.container_timeout = 30
         self.memory_limit = "256m"
         self.cpu_quota = 50000
+        self.max_output = 50000  # 50KB of output kept per execution
 
         # Container tracking
         self.active_containers = {}
-        self.execution_history = Queue(maxsize=1000)
-        self.container_lock = threading.RLock()
+
+        # Execution history: ring buffer of the latest history_size records,
+        # one column per field; _history_count is the total ever recorded
+        self.history_size = 1000
+        self._history_count = 0
+        self._history_lock = threading.Lock()
+        self._history_duration_ms = np.zeros(self.history_size, dtype=np.float64)
+        self._history_timestamp = np.zeros(self.history_size, dtype=np.float64)
+        self._history_success = np.zeros(self.history_size, dtype=np.bool_)
+        self._history_execution_id: List[Optional[str]] = [None] * self.history_size
+        self._history_user_id: List[Optional[str]] = [None] * self.history_size
+        self._history_language: List[Optional[str]] = [None] * self.history_size
+        self._history_code_hash: List[Optional[str]] = [None] * self.history_size
+        # Guards active_containers only; execution slots are the semaphore
+        self.container_lock = threading.Lock()
+        self._slot_semaphore = asyncio.BoundedSemaphore(self.max_containers)
+
+        # docker-py calls block on the Docker socket; run them here, off the loop
+        self._docker_pool = ThreadPoolExecutor(
+            max_workers=self.config.get("docker_workers", min(32, self.max_containers * 3)),
+            thread_name_prefix="sandbox-docker"
+        )
+
+        # Prewarmed containers per language. Each one is started idle with
+        # the code and input files bind-mounted from a host directory, runs
+        # a single execution via exec and is then discarded, so no state
+        # carries over between users; the pool refills in the background
+        self.warm_pool_size = self.config.get("warm_pool_size", 2)
+        # Idle warm containers older than this many seconds are replaced
+        self.warm_max_idle = self.config.get("warm_max_idle", 600)
+
+        # Host-side code and input files; memory-backed when /dev/shm exists
+        self.temp_dir = self.config.get(
+            "temp_dir",
+            "/dev/shm/agentos-sandbox" if os.path.isdir("/dev/shm") else os.path.join(tempfile.gettempdir(), "agentos-sandbox")
+        )
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+        # Wrappers are bind-mounted into containers from the host rather than
+        # baked into the images; by default kept under temp_dir, which the
+        # service user can write to
+        self.wrapper_dir = self.config.get("wrapper_dir", os.path.join(self.temp_dir, "wrappers"))
+        self.wrapper_names = {
+            "python": "sandbox_wrapper.py",
+            "javascript": "node_wrapper.js",
+            "bash": "bash_wrapper.sh"
+        }
+        self.wrapper_host_paths: Dict[str, str] = {}
+
+        # Container cgroups are read directly for resource usage instead of
+        # a stats API round-trip, when the host hierarchy is visible
+        self.cgroup_root = self.config.get("cgroup_root", "/sys/fs/cgroup")
+
+        # Compile Python on the host and ship a marshalled code object, so
+        # the sandbox skips parsing; only valid when interpreters match
+        self.precompile_python = self.config.get(
+            "precompile_python", sys.version_info[:2] == SANDBOX_PYTHON_VERSION
+        )
+
+        # Optional BuildKit registry cache for image builds, e.g.
+        # "registry.example.com/agentos/sandbox-{language}:cache"
+        self.build_cache_ref = self.config.get("build_cache_ref")
+        # Re-pull base images on build; otherwise locally cached bases are reused
+        self.refresh_base_images = self.config.get("refresh_base_images", False)
+        self.warm_pool: Dict[str, asyncio.Queue] = {}
+        self._warm_entrypoints: Dict[str, List[str]] = {}
+        self._warm_filling = set()
+        self._warm_reaper: Optional[asyncio.Task] = None
+        self._background_tasks = set()
 
         # Pre-built images for different languages
         self.sandbox_images = {
@@ -73,6 +285,20 @@ class SecureSandbox:
             "java": "agentos/sandbox-java:latest"
         }
 
+        # Validator patterns compiled once per language
+        self._pattern_sets = {
+            language: PatternSet(patterns)
+            for language, patterns in self.DANGEROUS_PATTERNS.items()
+        }
+
+        # Validation verdicts by (language, sha256 of code), LRU-bounded
+        self.validate_cache_size = 4096
+        self._validate_cache: "OrderedDict[Tuple[str, bytes], bool]" = OrderedDict()
+
+        # Precompiled Python by sha256 of code (None: ship as source), LRU-bounded
+        self.compile_cache_size = 1024
+        self._compile_cache: "OrderedDict[bytes, Optional[bytes]]" = OrderedDict()
+
         # Language-specific configurations
         self.language_configs = {
             "python": SandboxConfig(
@@ -104,16 +330,62 @@ class SecureSandbox:
             logger.warning("gVisor not found, falling back to standard Docker isolation")
             self.runtime = "runc"
 
-        # Build sandbox images if they don't exist
-        for language, image in self.sandbox_images.items():
-            if not await self._image_exists(image):
-                await self._build_sandbox_image(language, image)
+        # Write wrappers for bind-mounting
+        await self._install_wrapper_files()
+
+        # Build missing sandbox images concurrently
+        existing = await self._existing_image_tags()
+        missing = [
+            (language, image)
+            for language, image in self.sandbox_images.items()
+            if image not in existing
+        ]
+
+        results = await asyncio.gather(
+            *(self._build_sandbox_image(language, image) for language, image in missing),
+            return_exceptions=True
+        )
+
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
 
         # Clean up old containers
         await self._cleanup_old_containers()
 
+        # Start prewarming containers for configured languages
+        if self.warm_pool_size > 0:
+            for language in self.language_configs:
+                self.warm_pool.setdefault(language, asyncio.Queue())
+                self._schedule_warm_fill(language)
+
+            if self._warm_reaper is None:
+                self._warm_reaper = asyncio.create_task(self._reap_idle_warm_containers())
+
         logger.info("Sandbox manager initialized successfully")
 
+    async def close(self):
+        """Remove prewarmed containers and stop background work"""
+
+        if self._warm_reaper is not None:
+            self._warm_reaper.cancel()
+            self._warm_reaper = None
+
+        # Detached pools stop refills; in-flight fills discard what they create
+        pools, self.warm_pool = self.warm_pool, {}
+
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+
+        stale = []
+        for pool in pools.values():
+            while not pool.empty():
+                stale.append(pool.get_nowait())
+
+        await asyncio.gather(*(self._discard_warm_container(warm) for warm in stale))
+
+        self._docker_pool.shutdown(wait=True)
+
     async def _check_gvisor(self) -> bool:
         """Check if gVisor runtime is available"""
         try:
@@ -128,13 +400,18 @@ class SecureSandbox:
             logger.error(f"Error checking gVisor: {e}")
             return False
 
-    async def _image_exists(self, image_name: str) -> bool:
-        """Check if Docker image exists"""
-        try:
-            self.docker_client.images.get(image_name)
-            return True
-        except docker.errors.ImageNotFound:
-            return False
+    async def _docker(self, fn, *args, **kwargs):
+        """Run a blocking docker-py call in the Docker thread pool"""
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._docker_pool, partial(fn, *args, **kwargs)
+        )
+
+    async def _existing_image_tags(self) -> set:
+        """Tags of all local Docker images, from one image list call"""
+
+        images = await self._docker(self.docker_client.images.list)
+        return {tag for image in images for tag in (image.tags or [])}
 
     async def _build_sandbox_image(self, language: str, image_name: str):
         """Build sandbox Docker image for specific language"""
@@ -143,10 +420,8 @@ class SecureSandbox:
             "python": """
 FROM python:3.11-slim
 
-# Create non-root user
-RUN useradd -m -u 1000 sandbox && \
-    mkdir -p /sandbox/code && \
-    chown -R sandbox:sandbox /sandbox
+# Layers are ordered from least to most frequently changed: packages,
+# then the sandbox user. The wrapper is bind-mounted at run time
 
 # Install allowed libraries only
 RUN pip install --no-cache-dir \
@@ -162,11 +437,10 @@ RUN rm -rf /var/lib/apt/lists/* && \
     rm -rf /root/.cache && \
     find /usr/local -name "*.pyc" -delete
 
-# Copy security wrapper
-COPY sandbox_wrapper.py /usr/local/bin/sandbox_wrapper.py
-
-USER sandbox
-WORKDIR /sandbox
+# Create non-root user
+RUN useradd -m -u 1000 sandbox && \
+    mkdir -p /sandbox/code && \
+    chown -R sandbox:sandbox /sandbox
 
 # Environment restrictions
 ENV PYTHONDONTWRITEBYTECODE=1
@@ -174,6 +448,9 @@ ENV PYTHONUNBUFFERED=1
 ENV PYTHONPATH=/sandbox
 ENV HOME=/sandbox
 
+USER sandbox
+WORKDIR /sandbox
+
 # Resource limits
 RUN ulimit -n 100 && \
     ulimit -u 10 && \
@@ -185,10 +462,6 @@ ENTRYPOINT ["python", "/usr/local/bin/sandbox_wrapper.py"]
             "javascript": """
 FROM node:18-slim
 
-RUN useradd -m -u 1000 sandbox && \
-    mkdir -p /sandbox/code && \
-    chown -R sandbox:sandbox /sandbox
-
 # Install allowed packages
 RUN npm install -g --production \
     axios@1.4.0 \
@@ -201,6 +474,10 @@ RUN rm -rf /var/lib/apt/lists/* && \
     rm -rf /root/.npm && \
     npm cache clean --force
 
+RUN useradd -m -u 1000 sandbox && \
+    mkdir -p /sandbox/code && \
+    chown -R sandbox:sandbox /sandbox
+
 USER sandbox
 WORKDIR /sandbox
 
@@ -208,9 +485,6 @@ WORKDIR /sandbox
 ENV NODE_OPTIONS="--no-expose-wasm --disable-proto=delete"
 ENV NODE_ENV=production
 
-# Copy security wrapper
-COPY node_wrapper.js /usr/local/bin/node_wrapper.js
-
 ENTRYPOINT ["node", "/usr/local/bin/node_wrapper.js"]
             """,
 
@@ -240,10 +514,6 @@ ENTRYPOINT ["/usr/local/bin/sql_wrapper.sh"]
             "bash": """
 FROM alpine:latest
 
-RUN adduser -D -u 1000 sandbox && \
-    mkdir -p /sandbox && \
-    chown -R sandbox:sandbox /sandbox
-
 # Install safe tools only
 RUN apk add --no-cache \
     coreutils \
@@ -260,6 +530,10 @@ RUN rm -f /bin/kill /bin/ps /bin/top /usr/bin/killall \
     /bin/mount /bin/umount /usr/bin/wget \
     /usr/bin/ssh /usr/bin/scp /usr/bin/nc
 
+RUN adduser -D -u 1000 sandbox && \
+    mkdir -p /sandbox && \
+    chown -R sandbox:sandbox /sandbox
+
 USER sandbox
 WORKDIR /sandbox
 
@@ -268,21 +542,19 @@ RUN ulimit -n 50 && \
     ulimit -u 5 && \
     ulimit -f 5120
 
-COPY bash_wrapper.sh /usr/local/bin/bash_wrapper.sh
-
 ENTRYPOINT ["/usr/local/bin/bash_wrapper.sh"]
             """,
 
             "r": """
 FROM r-base:4.3.1
 
+# Install allowed packages
+RUN R -e "install.packages(c('dplyr', 'ggplot2', 'jsonlite', 'httr'), repos='https://cran.rstudio.com/')"
+
 RUN useradd -m -u 1000 sandbox && \
     mkdir -p /sandbox/code && \
     chown -R sandbox:sandbox /sandbox
 
-# Install allowed packages
-RUN R -e "install.packages(c('dplyr', 'ggplot2', 'jsonlite', 'httr'), repos='https://cran.rstudio.com/')"
-
 USER sandbox
 WORKDIR /sandbox
 
@@ -303,11 +575,11 @@ RUN useradd -m -u 1000 sandbox && \
 USER sandbox
 WORKDIR /sandbox
 
+ENV JAVA_OPTS="-Djava.security.manager -Djava.security.policy=/sandbox/java.policy -Xmx128m"
+
 # Security policy
 COPY java.policy /sandbox/java.policy
 
-ENV JAVA_OPTS="-Djava.security.manager -Djava.security.policy=/sandbox/java.policy -Xmx128m"
-
 COPY java_wrapper.sh /usr/local/bin/java_wrapper.sh
 
 ENTRYPOINT ["/usr/local/bin/java_wrapper.sh"]
@@ -318,9 +590,6 @@ ENTRYPOINT ["/usr/local/bin/java_wrapper.sh"]
         if not dockerfile_content:
             raise ValueError(f"Unsupported language: {language}")
 
-        # Create wrapper files
-        await self._create_wrapper_files(language)
-
         # Create temporary directory for build context
         with tempfile.TemporaryDirectory() as build_dir:
             dockerfile_path = os.path.join(build_dir, "Dockerfile")
@@ -328,20 +597,21 @@ ENTRYPOINT ["/usr/local/bin/java_wrapper.sh"]
             with open(dockerfile_path, 'w') as f:
                 f.write(dockerfile_content)
 
-            # Copy wrapper files to build context
-            await self._copy_wrapper_files(language, build_dir)
-
             try:
                 logger.info(f"Building sandbox image for {language}...")
 
-                # Build image
-                image, logs = self.docker_client.images.build(
-                    path=build_dir,
-                    tag=image_name,
-                    forcerm=True,
-                    rm=True,
-                    pull=True
-                )
+                if self.build_cache_ref:
+                    await self._buildx_build(language, image_name, build_dir)
+                else:
+                    # Build image off the event loop so builds run concurrently
+                    image, logs = await self._docker(
+                        self.docker_client.images.build,
+                        path=build_dir,
+                        tag=image_name,
+                        forcerm=True,
+                        rm=True,
+                        pull=self.refresh_base_images
+                    )
 
                 logger.info(f"Successfully built {image_name}")
 
@@ -349,6 +619,31 @@ ENTRYPOINT ["/usr/local/bin/java_wrapper.sh"]
                 logger.error(f"Failed to build {image_name}: {e}")
                 raise
 
+    async def _buildx_build(self, language: str, image_name: str, build_dir: str):
+        """Build with BuildKit, importing and exporting layers via the registry cache"""
+
+        cache_ref = self.build_cache_ref.format(language=language)
+
+        process = await asyncio.create_subprocess_exec(
+            "docker", "buildx", "build",
+            f"--cache-from=type=registry,ref={cache_ref}",
+            f"--cache-to=type=registry,ref={cache_ref},mode=max",
+            *(["--pull"] if self.refresh_base_images else []),
+            "--tag", image_name,
+            "--load",
+            build_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, "DOCKER_BUILDKIT": "1"}
+        )
+        stdout, stderr = await process.communicate()
+
+        if process.returncode != 0:
+            raise docker.errors.BuildError(
+                stderr.decode('utf-8', errors='replace').strip() or f"docker buildx exited with {process.returncode}",
+                build_log=[]
+            )
+
     async def _create_wrapper_files(self, language: str):
         """Create security wrapper files for each language"""
 
@@ -360,6 +655,7 @@ import signal
 import resource
 import subprocess
 import json
+import marshal
 from datetime import datetime
 
 def set_limits():
@@ -396,16 +692,21 @@ def main():
             print(f"ERROR: Script file {script_file} not found", file=sys.stderr)
             sys.exit(1)
 
-        # Execute the script
-        with open(script_file, 'r') as f:
-            code = f.read()
+        if script_file.endswith('.pyc'):
+            # Code object compiled on the host from already validated source
+            with open(script_file, 'rb') as f:
+                code = marshal.load(f)
+        else:
+            # Execute the script
+            with open(script_file, 'r') as f:
+                code = f.read()
 
-        # Basic security checks
-        dangerous_imports = ['os', 'subprocess', 'socket', 'ctypes', 'sys']
-        for imp in dangerous_imports:
-            if f'import {imp}' in code or f'from {imp}' in code:
-                print(f"ERROR: Dangerous import '{imp}' detected", file=sys.stderr)
-                sys.exit(1)
+            # Basic security checks (mirrored on the host for .pyc files)
+            dangerous_imports = ['os', 'subprocess', 'socket', 'ctypes', 'sys']
+            for imp in dangerous_imports:
+                if f'import {imp}' in code or f'from {imp}' in code:
+                    print(f"ERROR: Dangerous import '{imp}' detected", file=sys.stderr)
+                    sys.exit(1)
 
         # Execute in restricted environment
         restricted_globals = {
@@ -570,23 +871,42 @@ timeout 30s sh "$SCRIPT_FILE"
         # Store wrappers temporarily (would be better to use a proper build system)
         self.wrapper_files = wrappers
 
-    async def _copy_wrapper_files(self, language: str, build_dir: str):
-        """Copy wrapper files to build directory"""
+    async def _install_wrapper_files(self):
+        """Write wrapper files to the host for bind-mounting into containers
 
-        wrapper_files = {
-            "python": "sandbox_wrapper.py",
-            "javascript": "node_wrapper.js",
-            "bash": "bash_wrapper.sh"
-        }
+        Each wrapper goes to <wrapper_dir>/<language>/<content hash>/, so a
+        changed wrapper gets a new path and needs no image rebuild.
+        """
+
+        for language, wrapper_name in self.wrapper_names.items():
+            await self._create_wrapper_files(language)
+            # A shebang must be the first line
+            content = self.wrapper_files[language].lstrip()
+            digest = hashlib.sha256(content.encode()).hexdigest()[:16]
+
+            directory = os.path.join(self.wrapper_dir, language, digest)
+            wrapper_path = os.path.join(directory, wrapper_name)
+
+            if not os.path.exists(wrapper_path):
+                os.makedirs(directory, mode=0o755, exist_ok=True)
+                with open(wrapper_path, 'w') as f:
+                    f.write(content)
 
-        if language in wrapper_files:
-            wrapper_path = os.path.join(build_dir, wrapper_files[language])
-            with open(wrapper_path, 'w') as f:
-                f.write(self.wrapper_files[language])
+                # Readable by the sandbox user, executable if shell script
+                os.chmod(wrapper_path, 0o755 if language == "bash" else 0o644)
 
-            # Make executable if shell script
-            if language == "bash":
-                os.chmod(wrapper_path, 0o755)
+            self.wrapper_host_paths[language] = wrapper_path
+
+    def _wrapper_volumes(self, language: str) -> Dict[str, Dict[str, str]]:
+        """Read-only bind mount of the language wrapper, if it has one"""
+
+        wrapper_path = self.wrapper_host_paths.get(language)
+        if not wrapper_path:
+            return {}
+
+        return {
+            wrapper_path: {"bind": f"/usr/local/bin/{self.wrapper_names[language]}", "mode": "ro"}
+        }
 
     async def execute_code(
         self,
@@ -608,126 +928,132 @@ timeout 30s sh "$SCRIPT_FILE"
             config.timeout = timeout
 
         # Security validation
-        if not await self._validate_code(code, language):
+        code_digest = hashlib.sha256(code.encode()).digest()
+
+        if not await self._validate_code(code, language, code_digest):
             return SandboxResult(
                 success=False,
                 error="Code validation failed - potentially malicious code detected",
                 execution_id=execution_id
             )
 
-        # Check concurrent container limit
-        with self.container_lock:
-            if len(self.active_containers) >= self.max_containers:
-                return SandboxResult(
-                    success=False,
-                    error="Too many concurrent executions, please try again later",
-                    execution_id=execution_id
-                )
+        # Check concurrent container limit; check and acquire happen without
+        # yielding to the loop, so concurrent calls cannot overshoot
+        if self._slot_semaphore.locked():
+            return SandboxResult(
+                success=False,
+                error="Too many concurrent executions, please try again later",
+                execution_id=execution_id
+            )
+        await self._slot_semaphore.acquire()
 
         # Prepare execution environment
-        code_hash = hashlib.sha256(code.encode()).hexdigest()[:8]
+        code_hash = code_digest.hex()[:8]
         container_name = f"sandbox_{user_id}_{code_hash}_{execution_id[:8]}"
+        code_file = None
+        input_file = None
+
+        # Prewarmed containers have no network; networked runs start cold
+        warm = None if allowed_network else self._take_warm_container(language)
 
         try:
-            # Create temporary files
-            code_file = await self._prepare_code_file(code, language)
-            input_file = None
+            if warm is not None:
+                container = warm.container
+                container_name = container.name
+                code_file, input_file = warm.code_file, warm.input_file
+
+                # Track active container
+                with self.container_lock:
+                    self.active_containers[container_name] = {
+                        "container": container,
+                        "start_time": start_time,
+                        "user_id": user_id,
+                        "execution_id": execution_id
+                    }
+
+                script = await self._write_warm_files(warm, code, inputs, code_digest)
+
+                # Run in the idle container with timeout
+                result = await asyncio.wait_for(
+                    self._exec_in_container(warm, script, execution_id, config.timeout),
+                    timeout=config.timeout
+                )
 
-            if inputs:
-                input_file = await self._prepare_input_file(inputs)
+            else:
+                # Create temporary files
+                code_file = await self._prepare_code_file(code, language, code_digest)
 
-            # Container configuration
-            volumes = {
-                code_file: {"bind": f"/sandbox/code.{self._get_extension(language)}", "mode": "ro"}
-            }
+                if inputs:
+                    input_file = await self._prepare_input_file(inputs)
 
-            if input_file:
-                volumes[input_file] = {"bind": "/sandbox/inputs.json", "mode": "ro"}
-
-            container_config = {
-                "image": self.sandbox_images[language],
-                "name": container_name,
-                "runtime": self.runtime,
-                "detach": True,
-                "mem_limit": config.memory_limit,
-                "memswap_limit": config.memory_limit,
-                "cpu_quota": config.cpu_quota,
-                "cpu_period": 100000,
-                "network_mode": "bridge" if allowed_network else "none",
-                "read_only": True,
-                "security_opt": [
-                    "no-new-privileges:true",
-                    "seccomp:default"
-                ],
-                "cap_drop": ["ALL"],
-                "cap_add": [],  # No additional capabilities
-                "pids_limit": 50,
-                "volumes": volumes,
-                "working_dir": "/sandbox",
-                "user": "1000:1000",
-                "environment": {
-                    "EXECUTION_ID": execution_id,
-                    "TIMEOUT": str(config.timeout),
-                    "LANG": "C.UTF-8",
-                    "LC_ALL": "C.UTF-8"
-                },
-                "labels": {
-                    "user_id": user_id,
-                    "execution_id": execution_id,
-                    "language": language,
-                    "created_at": datetime.utcnow().isoformat()
-                },
-                "tmpfs": {
-                    "/tmp": "size=10m,noexec,nosuid,nodev",
-                    "/var/tmp": "size=10m,noexec,nosuid,nodev"
+                # Container configuration
+                script = f"/sandbox/code{os.path.splitext(code_file)[1]}"
+                volumes = {
+                    code_file: {"bind": script, "mode": "ro"}
                 }
-            }
 
-            # Create and start container
-            container = self.docker_client.containers.run(
-                command=f"/sandbox/code.{self._get_extension(language)}",
-                **container_config
-            )
+                if input_file:
+                    volumes[input_file] = {"bind": "/sandbox/inputs.json", "mode": "ro"}
+
+                volumes.update(self._wrapper_volumes(language))
+
+                container_config = self._container_config(language, config, allowed_network)
+                container_config.update({
+                    "name": container_name,
+                    "volumes": volumes,
+                    "environment": {
+                        "EXECUTION_ID": execution_id,
+                        "TIMEOUT": str(config.timeout),
+                        "LANG": "C.UTF-8",
+                        "LC_ALL": "C.UTF-8"
+                    },
+                    "labels": {
+                        "user_id": user_id,
+                        "execution_id": execution_id,
+                        "language": language,
+                        "created_at": datetime.utcnow().isoformat()
+                    }
+                })
 
-            # Track active container
-            with self.container_lock:
-                self.active_containers[container_name] = {
-                    "container": container,
-                    "start_time": start_time,
-                    "user_id": user_id
-                }
+                # Create and start container
+                container = await self._docker(
+                    self.docker_client.containers.run,
+                    command=script,
+                    **container_config
+                )
+
+                # Track active container
+                with self.container_lock:
+                    self.active_containers[container_name] = {
+                        "container": container,
+                        "start_time": start_time,
+                        "user_id": user_id
+                    }
 
-            # Wait for completion with timeout
-            result = await self._wait_for_container(container, config.timeout)
+                # Wait for completion with timeout
+                result = await self._wait_for_container(container, config.timeout)
 
             # Calculate execution time
             duration_ms = (time.time() - start_time) * 1000
 
-            # Get resource usage
-            try:
-                stats = container.stats(stream=False)
-                resource_usage = self._extract_resource_usage(stats)
-            except Exception:
-                resource_usage = {}
+            # Get resource usage from the cgroup, falling back to the stats API
+            resource_usage = await self._read_cgroup_usage(container.id, duration_ms)
+            if resource_usage is None:
+                try:
+                    stats = await self._docker(container.stats, stream=False, one_shot=True)
+                    resource_usage = self._extract_resource_usage(stats)
+                except Exception:
+                    resource_usage = {}
 
             # Clean up
             await self._cleanup_container(container, code_file, input_file)
+            if warm is not None:
+                shutil.rmtree(warm.workdir, ignore_errors=True)
 
             # Log execution
-            execution_record = {
-                "execution_id": execution_id,
-                "user_id": user_id,
-                "language": language,
-                "code_hash": code_hash,
-                "duration_ms": duration_ms,
-                "success": result.success,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-
-            try:
-                self.execution_history.put_nowait(execution_record)
-            except:
-                pass  # Queue full, ignore
+            self._record_execution(
+                execution_id, user_id, language, code_hash, duration_ms, result.success
+            )
 
             result.execution_id = execution_id
             result.duration_ms = duration_ms
@@ -737,6 +1063,8 @@ timeout 30s sh "$SCRIPT_FILE"
 
         except asyncio.TimeoutError:
             await self._cleanup_container_by_name(container_name, code_file, input_file)
+            if warm is not None:
+                shutil.rmtree(warm.workdir, ignore_errors=True)
 
             return SandboxResult(
                 success=False,
@@ -747,6 +1075,8 @@ timeout 30s sh "$SCRIPT_FILE"
 
         except Exception as e:
             await self._cleanup_container_by_name(container_name, code_file, input_file)
+            if warm is not None:
+                shutil.rmtree(warm.workdir, ignore_errors=True)
 
             return SandboxResult(
                 success=False,
@@ -755,7 +1085,287 @@ timeout 30s sh "$SCRIPT_FILE"
                 duration_ms=(time.time() - start_time) * 1000
             )
 
-    async def _validate_code(self, code: str, language: str) -> bool:
+        finally:
+            self._slot_semaphore.release()
+
+    def _container_config(
+        self,
+        language: str,
+        config: SandboxConfig,
+        allowed_network: bool = False
+    ) -> Dict[str, Any]:
+        """Isolation and resource settings shared by cold and prewarmed containers"""
+
+        return {
+            "image": self.sandbox_images[language],
+            "runtime": self.runtime,
+            "detach": True,
+            "mem_limit": config.memory_limit,
+            "memswap_limit": config.memory_limit,
+            "cpu_quota": config.cpu_quota,
+            "cpu_period": 100000,
+            "network_mode": "bridge" if allowed_network else "none",
+            "read_only": True,
+            "security_opt": [
+                "no-new-privileges:true",
+                "seccomp:default"
+            ],
+            "cap_drop": ["ALL"],
+            "cap_add": [],  # No additional capabilities
+            "pids_limit": 50,
+            # Cap what the daemon keeps on disk for runaway output
+            "log_config": LogConfig(
+                type=LogConfig.types.JSON,
+                config={"max-size": "1m", "max-file": "1"}
+            ),
+            "working_dir": "/sandbox",
+            "user": "1000:1000",
+            "tmpfs": {
+                "/tmp": "size=10m,noexec,nosuid,nodev",
+                "/var/tmp": "size=10m,noexec,nosuid,nodev"
+            }
+        }
+
+    def _create_warm_container(self, language: str) -> WarmContainer:
+        """Start an idle sandbox container for later exec (blocking)"""
+
+        config = self.language_configs.get(language, SandboxConfig(language=language))
+        image = self.sandbox_images[language]
+
+        # The image entrypoint is the language wrapper; exec runs it directly
+        if language not in self._warm_entrypoints:
+            entrypoint = self.docker_client.images.get(image).attrs["Config"]["Entrypoint"]
+            self._warm_entrypoints[language] = list(entrypoint or [])
+
+        # Code and inputs are rewritten in place on the host per execution,
+        # so the bind mounts set up at creation see them
+        workdir = tempfile.mkdtemp(prefix="sandbox_warm_", dir=self.temp_dir)
+        code_file = os.path.join(workdir, f"code.{self._get_extension(language)}")
+        input_file = os.path.join(workdir, "inputs.json")
+        compiled_file = None
+        if language == "python" and self.precompile_python:
+            compiled_file = os.path.join(workdir, "code.pyc")
+
+        for path in (code_file, input_file, compiled_file):
+            if path is None:
+                continue
+            with open(path, 'w'):
+                pass
+            os.chmod(path, 0o644)
+
+        container_config = self._container_config(language, config)
+        container_config.update({
+            "name": f"sandbox_warm_{language}_{uuid.uuid4().hex[:12]}",
+            "entrypoint": ["sh", "-c", "while true; do sleep 3600; done"],
+            "volumes": {
+                code_file: {"bind": f"/sandbox/code.{self._get_extension(language)}", "mode": "ro"},
+                input_file: {"bind": "/sandbox/inputs.json", "mode": "ro"},
+                **({compiled_file: {"bind": "/sandbox/code.pyc", "mode": "ro"}} if compiled_file else {}),
+                **self._wrapper_volumes(language)
+            },
+            "environment": {
+                "LANG": "C.UTF-8",
+                "LC_ALL": "C.UTF-8"
+            },
+            "labels": {
+                "language": language,
+                "warm": "true",
+                "created_at": datetime.utcnow().isoformat()
+            }
+        })
+
+        try:
+            container = self.docker_client.containers.run(**container_config)
+        except Exception:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+
+        return WarmContainer(
+            container=container,
+            language=language,
+            workdir=workdir,
+            code_file=code_file,
+            input_file=input_file,
+            compiled_file=compiled_file
+        )
+
+    async def _fill_warm_pool(self, language: str):
+        """Top up the warm pool for language to warm_pool_size"""
+
+        pool = self.warm_pool[language]
+
+        try:
+            while self.warm_pool.get(language) is pool and pool.qsize() < self.warm_pool_size:
+                warm = await self._docker(self._create_warm_container, language)
+                if self.warm_pool.get(language) is not pool:
+                    # Closed while the container was starting
+                    await self._discard_warm_container(warm)
+                    break
+                pool.put_nowait(warm)
+        except Exception as e:
+            logger.error(f"Error prewarming {language} sandbox: {e}")
+        finally:
+            self._warm_filling.discard(language)
+
+    def _schedule_warm_fill(self, language: str):
+        """Refill the warm pool for language in the background"""
+
+        if language not in self.warm_pool or language in self._warm_filling:
+            return
+
+        self._warm_filling.add(language)
+        task = asyncio.create_task(self._fill_warm_pool(language))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def _take_warm_container(self, language: str) -> Optional[WarmContainer]:
+        """Pop a prewarmed container for language, None if none is ready"""
+
+        pool = self.warm_pool.get(language)
+        if pool is None:
+            return None
+
+        # Oldest first, so only a stale head needs skipping
+        warm = None
+        while not pool.empty():
+            warm = pool.get_nowait()
+            if not self._warm_container_stale(warm):
+                break
+            self._schedule_warm_discard(warm)
+            warm = None
+
+        self._schedule_warm_fill(language)
+        return warm
+
+    def _warm_container_stale(self, warm: WarmContainer) -> bool:
+        """Whether warm has been idle longer than warm_max_idle"""
+        return time.monotonic() - warm.created_at > self.warm_max_idle
+
+    async def _reap_idle_warm_containers(self):
+        """Periodically replace warm containers idle longer than warm_max_idle"""
+
+        while True:
+            await asyncio.sleep(max(1, self.warm_max_idle / 2))
+
+            for language, pool in list(self.warm_pool.items()):
+                kept = []
+                while not pool.empty():
+                    warm = pool.get_nowait()
+                    if self._warm_container_stale(warm):
+                        self._schedule_warm_discard(warm)
+                    else:
+                        kept.append(warm)
+
+                for warm in kept:
+                    pool.put_nowait(warm)
+
+                self._schedule_warm_fill(language)
+
+    async def _discard_warm_container(self, warm: WarmContainer):
+        """Remove an unused warm container and its host files"""
+
+        try:
+            await self._docker(warm.container.remove, force=True)
+        except Exception as e:
+            logger.error(f"Error removing warm {warm.language} sandbox: {e}")
+        finally:
+            shutil.rmtree(warm.workdir, ignore_errors=True)
+
+    def _schedule_warm_discard(self, warm: WarmContainer):
+        """Remove a warm container in the background"""
+
+        task = asyncio.create_task(self._discard_warm_container(warm))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _write_warm_files(
+        self,
+        warm: WarmContainer,
+        code: str,
+        inputs: Optional[Dict],
+        digest: bytes
+    ) -> str:
+        """Write code and inputs into a warm container's bind-mounted files,
+        returning the in-container path of the script to run"""
+
+        compiled = await self._compiled_python(code, digest) if warm.compiled_file else None
+        wrapped_code = None if compiled is not None else self._wrap_code(code, warm.language)
+
+        # Truncate and rewrite in place: the bind mounts follow the inode
+        if compiled is not None:
+            async with aiofiles.open(warm.compiled_file, 'wb') as f:
+                await f.write(compiled)
+            script = "/sandbox/code.pyc"
+        else:
+            async with aiofiles.open(warm.code_file, 'wb') as f:
+                await f.write(wrapped_code)
+            script = f"/sandbox/code.{self._get_extension(warm.language)}"
+
+        if inputs:
+            async with aiofiles.open(warm.input_file, 'w') as f:
+                await f.write(json.dumps(inputs, indent=2))
+
+        return script
+
+    async def _exec_in_container(
+        self,
+        warm: WarmContainer,
+        script: str,
+        execution_id: str,
+        timeout: int
+    ) -> SandboxResult:
+        """Run the language wrapper on the mounted code inside a warm container"""
+
+        command = self._warm_entrypoints[warm.language] + [script]
+
+        exit_code, logs = await self._docker(
+            self._run_exec,
+            warm.container,
+            command,
+            {"EXECUTION_ID": execution_id, "TIMEOUT": str(timeout)}
+        )
+
+        return SandboxResult(
+            success=exit_code == 0,
+            output=logs,
+            exit_code=exit_code
+        )
+
+    def _run_exec(self, container, command: List[str], environment: Dict[str, str]):
+        """Run command in container, returning (exit code, capped output) (blocking)"""
+
+        api = self.docker_client.api
+        exec_id = api.exec_create(
+            container.id,
+            command,
+            user="1000:1000",
+            workdir="/sandbox",
+            environment=environment
+        )["Id"]
+
+        chunks = api.exec_start(exec_id, stream=True)
+        logs = self._read_output(chunks)
+
+        # Drain (without keeping) anything past the cap so the exit code is final
+        for _ in chunks:
+            pass
+
+        return api.exec_inspect(exec_id)["ExitCode"], logs
+
+    def _read_output(self, chunks) -> str:
+        """Read an output stream up to max_output bytes"""
+
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) > self.max_output:
+                del buffer[self.max_output:]
+                buffer.extend(b"\n... (output truncated)")
+                break
+
+        return buffer.decode('utf-8', errors='replace')
+
+    async def _validate_code(self, code: str, language: str, digest: Optional[bytes] = None) -> bool:
         """Validate code for malicious patterns"""
 
         # Size limits
@@ -763,171 +1373,107 @@ timeout 30s sh "$SCRIPT_FILE"
             logger.warning("Code too large")
             return False
 
-        # Language-specific dangerous patterns
-        dangerous_patterns = {
-            "python": [
-                r"import\s+os\b",
-                r"import\s+subprocess\b",
-                r"import\s+socket\b",
-                r"import\s+ctypes\b",
-                r"from\s+os\s+import",
-                r"from\s+subprocess\s+import",
-                r"__import__\s*\(",
-                r"eval\s*\(",
-                r"exec\s*\(",
-                r"compile\s*\(",
-                r"open\s*\(",
-                r"file\s*\(",
-                r"input\s*\(",
-                r"raw_input\s*\(",
-                r"__builtins__",
-                r"globals\s*\(",
-                r"locals\s*\(",
-                r"vars\s*\(",
-                r"dir\s*\(",
-                r"getattr\s*\(",
-                r"setattr\s*\(",
-                r"delattr\s*\(",
-                r"hasattr\s*\(",
-                r"while\s+True\s*:",  # Potential infinite loop
-                r"for.*while.*:"  # Nested loops
-            ],
-            "javascript": [
-                r"require\s*\(\s*['\"]fs['\"]",
-                r"require\s*\(\s*['\"]child_process['\"]",
-                r"require\s*\(\s*['\"]net['\"]",
-                r"require\s*\(\s*['\"]http['\"]",
-                r"eval\s*\(",
-                r"Function\s*\(",
-                r"setTimeout\s*\(",
-                r"setInterval\s*\(",
-                r"process\.exit",
-                r"process\.kill",
-                r"process\.env",
-                r"__dirname",
-                r"__filename",
-                r"while\s*\(\s*true\s*\)",  # Infinite loop
-                r"for\s*\(\s*;\s*;\s*\)"  # Infinite loop
-            ],
-            "bash": [
-                r"rm\s+-rf",
-                r"dd\s+if=",
-                r"mkfs",
-                r":\(\)\{\s*:\|\:&\s*\};:",  # Fork bomb
-                r">\s*/dev/sd[a-z]",
-                r"chmod\s+777",
-                r"sudo\b",
-                r"su\s+-",
-                r"nc\s+-",
-                r"telnet\b",
-                r"wget\b",
-                r"curl\b",
-                r"ssh\b",
-                r"while\s+true",  # Infinite loop
-                r"until\s+false"  # Infinite loop
-            ],
-            "sql": [
-                r"DROP\s+DATABASE",
-                r"DROP\s+TABLE",
-                r"DELETE\s+FROM",
-                r"TRUNCATE\b",
-                r"ALTER\s+TABLE",
-                r"CREATE\s+USER",
-                r"GRANT\b",
-                r"REVOKE\b",
-                r"SHUTDOWN\b",
-                r"EXEC\b",
-                r"xp_cmdshell",
-                r"WHILE\s+1\s*=\s*1"  # Infinite loop
-            ]
-        }
+        # Resubmitted code reuses its earlier verdict
+        cache_key = (language, digest or hashlib.sha256(code.encode()).digest())
+        cached = self._validate_cache.get(cache_key)
+        if cached is not None:
+            self._validate_cache.move_to_end(cache_key)
+            return cached
 
-        patterns = dangerous_patterns.get(language, [])
+        # One scan over the code for all of the language's patterns
+        pattern_set = self._pattern_sets.get(language)
+        pattern = pattern_set.search(code) if pattern_set else None
 
-        import re
-        for pattern in patterns:
-            if re.search(pattern, code, re.IGNORECASE):
-                logger.warning(f"Dangerous pattern detected: {pattern}")
-                return False
+        if pattern is not None:
+            logger.warning(f"Dangerous pattern detected: {pattern}")
+
+        valid = pattern is None
+        self._validate_cache[cache_key] = valid
+        if len(self._validate_cache) > self.validate_cache_size:
+            self._validate_cache.popitem(last=False)
 
-        return True
+        return valid
 
-    async def _prepare_code_file(self, code: str, language: str) -> str:
+    async def _prepare_code_file(self, code: str, language: str, digest: bytes) -> str:
         """Prepare code file for execution"""
 
         extension = self._get_extension(language)
 
-        # Add security wrappers for certain languages
-        if language == "python":
-            wrapped_code = f"""
-# Auto-generated security wrapper
-import signal
-import sys
-import time
+        if language == "python" and self.precompile_python:
+            compiled = await self._compiled_python(code, digest)
+            if compiled is not None:
+                path = self._temp_path('.pyc')
+                async with aiofiles.open(path, 'wb') as f:
+                    await f.write(compiled)
+                return path
 
-def timeout_handler(signum, frame):
-    print("TIMEOUT: Execution time limit exceeded", file=sys.stderr)
-    sys.exit(124)
+        # Create temporary file
+        path = self._temp_path(f'.{extension}')
+        async with aiofiles.open(path, 'wb') as f:
+            await f.write(self._wrap_code(code, language))
+        return path
+
+    async def _compiled_python(self, code: str, digest: bytes) -> Optional[bytes]:
+        """Marshalled wrapped Python code, cached by the code's sha256;
+        None when the code must be shipped as source"""
+
+        if digest in self._compile_cache:
+            self._compile_cache.move_to_end(digest)
+            return self._compile_cache[digest]
+
+        if any(f'import {imp}' in code or f'from {imp}' in code for imp in _WRAPPER_DANGEROUS_IMPORTS):
+            # Ship as source so the wrapper rejects it as before
+            compiled = None
+        else:
+            compiled = await asyncio.get_running_loop().run_in_executor(
+                None, _compile_python, self._wrap_code(code, "python")
+            )
 
-signal.signal(signal.SIGALRM, timeout_handler)
-signal.alarm(30)
+        self._compile_cache[digest] = compiled
+        if len(self._compile_cache) > self.compile_cache_size:
+            self._compile_cache.popitem(last=False)
 
-start_time = time.time()
+        return compiled
 
-try:
-    # User code starts here
-{self._indent_code(code, 4)}
+    def _temp_path(self, suffix: str) -> str:
+        """Unique path for a host-side temporary file"""
+        return os.path.join(self.temp_dir, f"{uuid.uuid4().hex}{suffix}")
 
-except Exception as e:
-    print(f"ERROR: {{str(e)}}", file=sys.stderr)
-    sys.exit(1)
-finally:
-    elapsed = time.time() - start_time
-    print(f"\\n# Execution completed in {{elapsed:.3f}} seconds", file=sys.stderr)
-    signal.alarm(0)
-"""
-        else:
-            wrapped_code = code
+    def _wrap_code(self, code: str, language: str) -> bytes:
+        """Add security wrappers for certain languages"""
 
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(
-            mode='w',
-            suffix=f'.{extension}',
-            delete=False
-        ) as f:
-            f.write(wrapped_code)
-            return f.name
-
-    def _indent_code(self, code: str, indent: int) -> str:
-        """Indent code by specified number of spaces"""
-        lines = code.split('\n')
-        return '\n'.join(' ' * indent + line if line.strip() else line for line in lines)
+        source = code.encode()
+        if language != "python":
+            return source
+
+        # Indent non-blank lines into the wrapper's try block
+        indented = b"\n".join(
+            b"    " + line if line.strip() else line
+            for line in source.split(b"\n")
+        )
+        return b"".join((_PY_WRAPPER_HEAD, indented, _PY_WRAPPER_TAIL))
 
     async def _prepare_input_file(self, inputs: Dict) -> str:
         """Prepare input file"""
 
-        with tempfile.NamedTemporaryFile(
-            mode='w',
-            suffix='.json',
-            delete=False
-        ) as f:
-            json.dump(inputs, f, indent=2)
-            return f.name
+        path = self._temp_path('.json')
+        async with aiofiles.open(path, 'w') as f:
+            await f.write(json.dumps(inputs, indent=2))
+        return path
 
     async def _wait_for_container(self, container, timeout: int) -> SandboxResult:
         """Wait for container to complete execution"""
 
         try:
             # Wait for container to finish
-            exit_code = container.wait(timeout=timeout)['StatusCode']
-
-            # Get output
-            logs = container.logs(stdout=True, stderr=True).decode('utf-8', errors='replace')
+            exit_code = (await self._docker(container.wait, timeout=timeout))['StatusCode']
 
-            # Limit output size
-            max_output = 50000  # 50KB
-            if len(logs) > max_output:
-                logs = logs[:max_output] + "\n... (output truncated)"
+            # Get output, reading no more than the size limit
+            logs = await self._docker(
+                lambda: self._read_output(
+                    container.logs(stdout=True, stderr=True, stream=True, follow=False)
+                )
+            )
 
             return SandboxResult(
                 success=exit_code == 0,
@@ -950,6 +1496,81 @@ finally:
                 exit_code=1
             )
 
+    def _cgroup_dirs(self, container_id: str) -> List[Tuple[str, str]]:
+        """Candidate (memory, cpu) cgroup directories of a container,
+        for cgroup v2 and v1 under the systemd and cgroupfs drivers"""
+
+        root = self.cgroup_root
+        return [
+            (os.path.join(root, "system.slice", f"docker-{container_id}.scope"),) * 2,
+            (os.path.join(root, "docker", container_id),) * 2,
+            (
+                os.path.join(root, "memory", "docker", container_id),
+                os.path.join(root, "cpuacct", "docker", container_id)
+            ),
+            (
+                os.path.join(root, "memory", "system.slice", f"docker-{container_id}.scope"),
+                os.path.join(root, "cpuacct", "system.slice", f"docker-{container_id}.scope")
+            ),
+        ]
+
+    async def _read_cgroup_usage(self, container_id: str, duration_ms: float) -> Optional[Dict[str, Any]]:
+        """Resource usage read from the container's cgroup files,
+        None if its cgroup is not visible from this host"""
+
+        for memory_dir, cpu_dir in self._cgroup_dirs(container_id):
+            if not os.path.isdir(memory_dir):
+                continue
+
+            if os.path.exists(os.path.join(memory_dir, "memory.current")):
+                # cgroup v2
+                memory_usage = await self._read_cgroup_value(memory_dir, "memory.current")
+                memory_max = await self._read_cgroup_value(memory_dir, "memory.peak")
+                memory_limit = await self._read_cgroup_value(memory_dir, "memory.max")
+                cpu_usec = await self._read_cgroup_value(cpu_dir, "cpu.stat", "usage_usec")
+            else:
+                memory_usage = await self._read_cgroup_value(memory_dir, "memory.usage_in_bytes")
+                memory_max = await self._read_cgroup_value(memory_dir, "memory.max_usage_in_bytes")
+                memory_limit = await self._read_cgroup_value(memory_dir, "memory.limit_in_bytes")
+                cpu_usec = await self._read_cgroup_value(cpu_dir, "cpuacct.usage") // 1000
+
+            return {
+                "cpu_usage_percent": round(cpu_usec / 10 / duration_ms, 2) if duration_ms > 0 else 0.0,
+                "memory_usage_bytes": memory_usage,
+                "memory_max_bytes": memory_max,
+                "memory_limit_bytes": memory_limit,
+                # Sandboxes run without networking by default
+                "network_rx_bytes": 0,
+                "network_tx_bytes": 0
+            }
+
+        return None
+
+    async def _read_cgroup_value(self, directory: str, name: str, key: Optional[str] = None) -> int:
+        """Integer value of a cgroup file, or of one key in a flat-keyed
+        file such as cpu.stat; 0 when missing or unlimited"""
+
+        try:
+            async with aiofiles.open(os.path.join(directory, name)) as f:
+                content = await f.read()
+        except OSError:
+            return 0
+
+        if key is not None:
+            for line in content.splitlines():
+                field_name, _, value = line.partition(" ")
+                if field_name == key:
+                    content = value
+                    break
+            else:
+                return 0
+
+        try:
+            return int(content.strip())
+        except ValueError:
+            # "max" for no limit
+            return 0
+
     def _extract_resource_usage(self, stats: Dict) -> Dict[str, Any]:
         """Extract resource usage from container stats"""
 
@@ -1002,7 +1623,7 @@ finally:
 
         try:
             # Remove container
-            container.remove(force=True)
+            await self._docker(container.remove, force=True)
 
             # Remove from active containers
             with self.container_lock:
@@ -1012,7 +1633,7 @@ finally:
                         break
 
             # Clean up temporary files
-            if os.path.exists(code_file):
+            if code_file and os.path.exists(code_file):
                 os.unlink(code_file)
 
             if input_file and os.path.exists(input_file):
@@ -1026,16 +1647,17 @@ finally:
 
         try:
             with self.container_lock:
-                if container_name in self.active_containers:
-                    container_info = self.active_containers[container_name]
-                    container = container_info["container"]
+                container_info = self.active_containers.get(container_name)
 
-                    try:
-                        container.kill()
-                    except:
-                        pass
+            if container_info:
+                container = container_info["container"]
 
-                    await self._cleanup_container(container, code_file, input_file)
+                try:
+                    await self._docker(container.kill)
+                except:
+                    pass
+
+                await self._cleanup_container(container, code_file, input_file)
 
         except Exception as e:
             logger.error(f"Cleanup by name error: {e}")
@@ -1044,7 +1666,8 @@ finally:
         """Clean up old sandbox containers"""
 
         try:
-            containers = self.docker_client.containers.list(
+            containers = await self._docker(
+                self.docker_client.containers.list,
                 all=True,
                 filters={"name": "sandbox_"}
             )
@@ -1057,7 +1680,7 @@ finally:
                     )
 
                     if datetime.now(created.tzinfo) - created > timedelta(hours=1):
-                        container.remove(force=True)
+                        await self._docker(container.remove, force=True)
                         logger.info(f"Cleaned up old container: {container.name}")
 
                 except Exception as e:
@@ -1079,48 +1702,78 @@ finally:
         }
         return extensions.get(language, "txt")
 
+    def _record_execution(
+        self,
+        execution_id: str,
+        user_id: str,
+        language: str,
+        code_hash: str,
+        duration_ms: float,
+        success: bool
+    ):
+        """Write an execution record into the history ring buffer"""
+
+        with self._history_lock:
+            slot = self._history_count % self.history_size
+            self._history_count += 1
+
+            self._history_execution_id[slot] = execution_id
+            self._history_user_id[slot] = user_id
+            self._history_language[slot] = language
+            self._history_code_hash[slot] = code_hash
+            self._history_duration_ms[slot] = duration_ms
+            self._history_timestamp[slot] = time.time()
+            self._history_success[slot] = success
+
+    def _history_record(self, slot: int) -> Dict[str, Any]:
+        """Execution record at a history slot, as a dict"""
+
+        return {
+            "execution_id": self._history_execution_id[slot],
+            "user_id": self._history_user_id[slot],
+            "language": self._history_language[slot],
+            "code_hash": self._history_code_hash[slot],
+            "duration_ms": float(self._history_duration_ms[slot]),
+            "success": bool(self._history_success[slot]),
+            "timestamp": datetime.utcfromtimestamp(self._history_timestamp[slot]).isoformat()
+        }
+
     async def get_execution_stats(self, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Get execution statistics"""
 
-        # Convert queue to list for analysis
-        history = []
-        temp_queue = Queue()
+        with self._history_lock:
+            # Slots in recording order, oldest first
+            count = min(self._history_count, self.history_size)
+            first = self._history_count - count
+            slots = [(first + i) % self.history_size for i in range(count)]
 
-        try:
-            while True:
-                record = self.execution_history.get_nowait()
-                history.append(record)
-                temp_queue.put(record)
-        except Empty:
-            pass
+            # Filter by user if specified
+            if user_id:
+                slots = [slot for slot in slots if self._history_user_id[slot] == user_id]
 
-        # Restore queue
-        while not temp_queue.empty():
-            self.execution_history.put(temp_queue.get())
+            if not slots:
+                return {"message": "No execution history found"}
 
-        # Filter by user if specified
-        if user_id:
-            history = [h for h in history if h.get("user_id") == user_id]
+            index = np.array(slots, dtype=np.intp)
+            success = self._history_success[index]
+            durations = self._history_duration_ms[index]
 
-        if not history:
-            return {"message": "No execution history found"}
+            # Language statistics
+            languages = {}
+            for slot, ok in zip(slots, success.tolist()):
+                stats = languages.setdefault(self._history_language[slot] or "unknown", {"count": 0, "success": 0})
+                stats["count"] += 1
+                if ok:
+                    stats["success"] += 1
 
-        total = len(history)
-        successful = sum(1 for h in history if h.get("success", False))
+            recent_activity = [self._history_record(slot) for slot in slots[-10:]]
 
-        # Language statistics
-        languages = {}
-        for h in history:
-            lang = h.get("language", "unknown")
-            if lang not in languages:
-                languages[lang] = {"count": 0, "success": 0}
-            languages[lang]["count"] += 1
-            if h.get("success", False):
-                languages[lang]["success"] += 1
+        total = len(slots)
+        successful = int(success.sum())
 
         # Calculate averages
-        durations = [h.get("duration_ms", 0) for h in history if h.get("duration_ms")]
-        avg_duration = sum(durations) / len(durations) if durations else 0
+        durations = durations[durations != 0]
+        avg_duration = float(durations.mean()) if durations.size else 0
 
         return {
             "total_executions": total,
@@ -1130,23 +1783,30 @@ finally:
             "average_duration_ms": round(avg_duration, 2),
             "active_containers": len(self.active_containers),
             "languages": languages,
-            "recent_activity": history[-10:] if history else []
+            "recent_activity": recent_activity
         }
 
     async def kill_execution(self, execution_id: str) -> bool:
         """Kill running execution by ID"""
 
         with self.container_lock:
-            for name, info in self.active_containers.items():
-                if execution_id in name:
-                    try:
-                        container = info["container"]
-                        container.kill()
-                        logger.info(f"Killed execution {execution_id}")
-                        return True
-                    except Exception as e:
-                        logger.error(f"Error killing execution {execution_id}: {e}")
-                        return False
+            container = next(
+                (
+                    info["container"]
+                    for name, info in self.active_containers.items()
+                    if execution_id in name or info.get("execution_id") == execution_id
+                ),
+                None
+            )
+
+        if container is not None:
+            try:
+                await self._docker(container.kill)
+                logger.info(f"Killed execution {execution_id}")
+                return True
+            except Exception as e:
+                logger.error(f"Error killing execution {execution_id}: {e}")
+                return False
 
         return False
 
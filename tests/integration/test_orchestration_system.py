@@ -575,6 +575,41 @@ class TestTemplateSystem:
         for result in results_with_filter:
             assert result.category == "marketing"
 
+    def test_custom_template_is_searchable(self):
+        """Test que un template custom queda indexado para búsqueda"""
+
+        base_template = template_manager.get_template_by_id("content_creation")
+        custom_template = template_manager.create_custom_template(
+            workflow=base_template.workflow_definition,
+            template_metadata={
+                "name": "Quarterly Newsletter",
+                "description": "Genera el boletín trimestral",
+                "category": "newsletters",
+                "tags": ["newsletter"]
+            },
+            author="test_author"
+        )
+
+        # Substring dentro de un token y filtros por índices secundarios
+        results = template_manager.search_templates(
+            "letter",
+            filters={"category": "newsletters", "author": "test_author"}
+        )
+        assert custom_template.id in [t.id for t in results]
+
+    def test_template_export_import_roundtrip(self):
+        """Test exportar e importar templates (individual y en lote)"""
+
+        exported = template_manager.export_template("content_creation")
+        imported = template_manager.import_template(exported)
+
+        assert imported.name == "Content Creation Workflow"
+        assert template_manager.get_template_by_id(imported.id) is imported
+
+        batch = template_manager.import_templates(f"[{exported}, {exported}]")
+        assert len(batch) == 2
+        assert batch[0].id != batch[1].id
+
     def test_template_categories(self):
         """Test agrupación por categorías"""
 
@@ -0,0 +1,376 @@
+import base64
+import hashlib
+import json
+import pytest
+from datetime import datetime, timedelta
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from app.security._fernet_backend import Fernet, InvalidToken
+from app.security.encryption import (
+    DEFAULT_KEY_ID, EncryptedData, EncryptionAlgorithm, EncryptionManager, KeyDerivationFunction
+)
+
+
+@pytest.fixture
+def manager():
+    return EncryptionManager()
+
+
+class TestFileEncryption:
+    """Test cases for streaming file encryption"""
+
+    @pytest.fixture
+    def plain_file(self, tmp_path):
+        path = tmp_path / "plain.bin"
+        # Spans several 1 MiB chunks with a partial last chunk
+        path.write_bytes(bytes(range(256)) * 9000)
+        return path
+
+    def test_round_trip(self, manager, plain_file, tmp_path):
+        """Test decrypting an encrypted file restores its contents"""
+        encrypted = manager.encrypt_file(str(plain_file))
+        output = tmp_path / "restored.bin"
+
+        manager.decrypt_file(encrypted, str(output))
+
+        assert output.read_bytes() == plain_file.read_bytes()
+
+    def test_round_trip_empty_file(self, manager, tmp_path):
+        """Test an empty file round-trips"""
+        path = tmp_path / "empty.txt"
+        path.write_bytes(b"")
+        output = tmp_path / "restored.txt"
+
+        manager.decrypt_file(manager.encrypt_file(str(path)), str(output))
+
+        assert output.read_bytes() == b""
+
+    def test_round_trip_multi_fernet(self, manager, plain_file, tmp_path):
+        """Test files encrypted with a multi-key setup decrypt"""
+        encrypted = manager.encrypt_file(str(plain_file), key_id="default_multi_fernet")
+        output = tmp_path / "restored.bin"
+
+        manager.decrypt_file(encrypted, str(output))
+
+        assert output.read_bytes() == plain_file.read_bytes()
+
+    def test_batch_round_trip(self, manager, tmp_path):
+        """Test batch-encrypted files decrypt individually"""
+        paths = []
+        for i in range(3):
+            path = tmp_path / f"file{i}.txt"
+            path.write_bytes(f"content {i}".encode() * 100)
+            paths.append(str(path))
+
+        for path, encrypted in zip(paths, manager.encrypt_files_batch(paths)):
+            output = f"{path}.out"
+            manager.decrypt_file(encrypted, output)
+            assert open(output, "rb").read() == open(path, "rb").read()
+
+    @pytest.mark.parametrize("offset", [-1, -40, -1000])
+    def test_tampered_ciphertext_rejected(self, manager, plain_file, tmp_path, offset):
+        """Test flipping a tag or ciphertext byte fails and leaves no output"""
+        encrypted = manager.encrypt_file(str(plain_file))
+        data = bytearray(open(encrypted, "rb").read())
+        data[offset] ^= 0x01
+        open(encrypted, "wb").write(bytes(data))
+        output = tmp_path / "restored.bin"
+
+        with pytest.raises(InvalidToken):
+            manager.decrypt_file(encrypted, str(output))
+
+        assert not output.exists()
+
+    def test_tampered_keeps_existing_output(self, manager, plain_file, tmp_path):
+        """Test a failed decrypt leaves an existing output file and no partial file behind"""
+        encrypted = manager.encrypt_file(str(plain_file), key_id="default_multi_fernet")
+        data = bytearray(open(encrypted, "rb").read())
+        data[-1000] ^= 0x01
+        open(encrypted, "wb").write(bytes(data))
+        output = tmp_path / "restored.bin"
+        output.write_bytes(b"previous contents")
+        before = set(tmp_path.iterdir())
+
+        with pytest.raises(InvalidToken):
+            manager.decrypt_file(encrypted, str(output))
+
+        assert output.read_bytes() == b"previous contents"
+        assert set(tmp_path.iterdir()) == before
+
+    def test_tampered_header_rejected(self, manager, plain_file, tmp_path):
+        """Test the metadata header is covered by the MAC"""
+        encrypted = manager.encrypt_file(str(plain_file))
+        data = open(encrypted, "rb").read()
+        header_length = int.from_bytes(data[:4], "big")
+        metadata = json.loads(data[4:4 + header_length])
+        metadata["original_filename"] = "other.bin"
+        header = json.dumps(metadata).encode()
+        open(encrypted, "wb").write(len(header).to_bytes(4, "big") + header + data[4 + header_length:])
+
+        with pytest.raises(InvalidToken):
+            manager.decrypt_file(encrypted, str(tmp_path / "restored.bin"))
+
+    def test_truncated_file_rejected(self, manager, plain_file, tmp_path):
+        """Test a file cut short of its tag is rejected"""
+        encrypted = manager.encrypt_file(str(plain_file))
+        data = open(encrypted, "rb").read()
+        header_length = int.from_bytes(data[:4], "big")
+        open(encrypted, "wb").write(data[:4 + header_length + 10])
+
+        with pytest.raises(InvalidToken):
+            manager.decrypt_file(encrypted, str(tmp_path / "restored.bin"))
+
+    def test_legacy_fernet_format(self, manager, tmp_path):
+        """Test files in the pre-streaming single Fernet token format decrypt"""
+        key = manager.keys["default_fernet"]
+        metadata = json.dumps({
+            "original_filename": "legacy.txt",
+            "encrypted_at": "2024-01-01T00:00:00",
+            "key_id": "default_fernet",
+            "algorithm": key.algorithm.value
+        }).encode()
+        encrypted = tmp_path / "legacy.txt.encrypted"
+        encrypted.write_bytes(
+            len(metadata).to_bytes(4, "big") + metadata + Fernet(key.key_data).encrypt(b"legacy contents")
+        )
+        output = tmp_path / "restored.txt"
+
+        manager.decrypt_file(str(encrypted), str(output))
+
+        assert output.read_bytes() == b"legacy contents"
+
+    def test_legacy_fernet_format_tampered(self, manager, tmp_path):
+        """Test a tampered legacy file is rejected"""
+        key = manager.keys["default_fernet"]
+        metadata = json.dumps({"key_id": "default_fernet"}).encode()
+        token = bytearray(Fernet(key.key_data).encrypt(b"legacy contents"))
+        token[-5] = ord("A") if token[-5] != ord("A") else ord("B")
+        encrypted = tmp_path / "legacy.encrypted"
+        encrypted.write_bytes(len(metadata).to_bytes(4, "big") + metadata + bytes(token))
+
+        with pytest.raises(InvalidToken):
+            manager.decrypt_file(str(encrypted), str(tmp_path / "restored.txt"))
+
+
+class TestAesGcmDefault:
+    """Test cases for AES-GCM as the default field cipher"""
+
+    def test_default_algorithm(self, manager):
+        """Test new ciphertext uses AES-GCM by default"""
+        encrypted = manager.encrypt("secret value")
+
+        assert encrypted.key_id == DEFAULT_KEY_ID
+        assert encrypted.algorithm == EncryptionAlgorithm.AES_GCM
+
+    def test_round_trip(self, manager):
+        """Test AES-GCM ciphertext decrypts to the original"""
+        assert manager.decrypt(manager.encrypt("secret value ñ")) == "secret value ñ"
+
+    def test_nonce_unique(self, manager):
+        """Test encrypting the same value twice gives different ciphertext"""
+        assert manager.encrypt("same").data != manager.encrypt("same").data
+
+    def test_tampered_rejected(self, manager):
+        """Test a modified AES-GCM ciphertext fails authentication"""
+        encrypted = manager.encrypt("secret value")
+        raw = bytearray(base64.urlsafe_b64decode(encrypted.data))
+        raw[-1] ^= 0x01
+        encrypted.data = base64.urlsafe_b64encode(bytes(raw)).decode()
+
+        with pytest.raises(InvalidTag):
+            manager.decrypt(encrypted)
+
+    def test_fernet_ciphertext_still_decrypts(self, manager):
+        """Test data encrypted under the former Fernet default decrypts"""
+        encrypted = manager.encrypt("older value", key_id="default_fernet")
+
+        assert encrypted.algorithm == EncryptionAlgorithm.FERNET
+        assert manager.decrypt(encrypted) == "older value"
+
+    @pytest.mark.parametrize("value,plaintext", [
+        ("555-0100", "555-0100"),
+        ({"street": "Main St", "number": 1}, json.dumps({"street": "Main St", "number": 1})),
+    ])
+    def test_legacy_field_ciphertext_decrypts(self, manager, value, plaintext):
+        """Test field data written with the former PBKDF2 Fernet field key decrypts"""
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=hashlib.sha256(b"phone:user-1").digest()[:16],
+            iterations=100000
+        )
+        legacy_key = base64.urlsafe_b64encode(kdf.derive(manager.master_key))
+        token = Fernet(legacy_key).encrypt(plaintext.encode())
+        encrypted = EncryptedData(
+            data=base64.urlsafe_b64encode(token).decode(),
+            key_id="field_phone_user-1",
+            algorithm=EncryptionAlgorithm.FERNET,
+            metadata={"field_name": "phone", "user_id": "user-1"}
+        )
+
+        # Also once the user's AES-GCM field key exists
+        new = manager.encrypt_field("phone", "555-0199", "user-1")
+
+        assert new.algorithm == EncryptionAlgorithm.AES_GCM
+        assert manager.decrypt_field("phone", encrypted, "user-1") == value
+        assert manager.decrypt_field("phone", new, "user-1") == "555-0199"
+
+
+class TestKeyState:
+    """Test cases for key state changes made after a key is created"""
+
+    def test_deactivated_key_refused(self, manager):
+        """Test a key deactivated in place can no longer encrypt"""
+        manager.keys[DEFAULT_KEY_ID].is_active = False
+
+        with pytest.raises(ValueError, match="inactive"):
+            manager.encrypt("x")
+
+    def test_reactivated_key_usable(self, manager):
+        """Test a key reactivated in place encrypts again"""
+        key = manager.keys[DEFAULT_KEY_ID]
+        key.is_active = False
+        key.is_active = True
+
+        assert manager.decrypt(manager.encrypt("x")) == "x"
+
+    def test_expired_key_refused(self, manager):
+        """Test setting a past expiry on a key stops it encrypting"""
+        manager.keys[DEFAULT_KEY_ID].expires_at = datetime.utcnow() - timedelta(seconds=1)
+
+        with pytest.raises(ValueError, match="expired"):
+            manager.encrypt("x")
+
+    def test_usage_limit_refused(self, manager):
+        """Test a usage limit set on a key is enforced"""
+        key = manager.keys[DEFAULT_KEY_ID]
+        key.max_usage = key.usage_count + 1
+        manager.encrypt("x")
+
+        with pytest.raises(ValueError, match="usage limit"):
+            manager.encrypt("x")
+
+
+    def test_cleanup_removes_key_deactivated_in_place(self, manager):
+        """Test cleanup sees expiry and deactivation set directly on a key"""
+        key = manager.keys["default_fernet"]
+        key.expires_at = datetime.utcnow() - timedelta(seconds=5)
+        assert manager.cleanup_expired_keys() == 0
+
+        key.is_active = False
+        assert manager.cleanup_expired_keys() == 1
+        assert "default_fernet" not in manager.keys
+
+    def test_cleanup_keeps_key_reactivated_in_place(self, manager):
+        """Test cleanup keeps an expired key that was reactivated"""
+        key_id = manager.rotate_key(DEFAULT_KEY_ID)
+        key = manager.keys[key_id]
+        key.expires_at = datetime.utcnow() - timedelta(seconds=5)
+        key.is_active = False
+        key.is_active = True
+
+        assert manager.cleanup_expired_keys() == 0
+        assert key_id in manager.keys
+
+    def test_cleanup_keeps_key_with_expiry_removed(self, manager):
+        """Test clearing a key's expiry takes it out of cleanup"""
+        key_id = manager.rotate_key(DEFAULT_KEY_ID)
+        key = manager.keys[key_id]
+        key.is_active = False
+        key.expires_at = datetime.utcnow() - timedelta(seconds=5)
+        key.expires_at = None
+
+        assert manager.cleanup_expired_keys() == 0
+        assert key_id in manager.keys
+
+
+class TestHybridEncryption:
+    """Test cases for RSA + Fernet hybrid framing"""
+
+    def test_round_trip(self, manager):
+        """Test hybrid ciphertext decrypts with the private key"""
+        encrypted = manager.encrypt("hybrid secret", key_id="default_rsa_private")
+
+        assert encrypted.algorithm == EncryptionAlgorithm.HYBRID
+        assert manager.decrypt(encrypted) == "hybrid secret"
+
+    def test_ciphertext_containing_separator(self, manager):
+        """Test the length-prefixed framing holds whatever bytes the RSA key encrypts to"""
+        for _ in range(20):
+            encrypted = manager.encrypt("x" * 500, key_id="default_rsa_private")
+            assert manager.decrypt(encrypted) == "x" * 500
+
+    def test_legacy_framing(self, manager):
+        """Test data in the legacy "<key>|<data>" framing decrypts"""
+        public_key = manager._load_rsa_public_key(manager.keys["default_rsa_public"])
+        temp_key = Fernet.generate_key()
+        oaep = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+        # Only legacy keys without the separator byte were ever readable
+        encrypted_key = b"|"
+        while b"|" in encrypted_key:
+            encrypted_key = public_key.encrypt(temp_key, oaep)
+        combined = encrypted_key + b"|" + Fernet(temp_key).encrypt(b"legacy hybrid")
+        encrypted = EncryptedData(
+            data=base64.urlsafe_b64encode(combined).decode(),
+            key_id="default_rsa_private",
+            algorithm=EncryptionAlgorithm.HYBRID
+        )
+
+        assert manager.decrypt(encrypted) == "legacy hybrid"
+
+    def test_tampered_rejected(self, manager):
+        """Test a modified hybrid payload is rejected"""
+        encrypted = manager.encrypt("hybrid secret", key_id="default_rsa_private")
+        raw = bytearray(base64.urlsafe_b64decode(encrypted.data))
+        raw[-10] ^= 0x01
+        encrypted.data = base64.urlsafe_b64encode(bytes(raw)).decode()
+
+        with pytest.raises(Exception):
+            manager.decrypt(encrypted)
+
+
+class TestEncryptedBackup:
+    """Test cases for password-encrypted backups"""
+
+    def test_round_trip(self, manager):
+        """Test a backup restores with the right password"""
+        data = {"api_key": "sk-test", "nested": {"values": [1, 2, 3]}}
+        backup = manager.create_encrypted_backup(data, "correct horse")
+
+        assert json.loads(backup)["cipher"] == EncryptionAlgorithm.AES_GCM.value
+        assert manager.restore_from_backup(backup, "correct horse") == data
+
+    def test_wrong_password_rejected(self, manager):
+        """Test a backup does not restore with another password"""
+        backup = manager.create_encrypted_backup({"a": 1}, "correct horse")
+
+        with pytest.raises(InvalidTag):
+            manager.restore_from_backup(backup, "battery staple")
+
+    def test_tampered_rejected(self, manager):
+        """Test a modified backup payload fails authentication"""
+        backup = json.loads(manager.create_encrypted_backup({"a": 1}, "correct horse"))
+        raw = bytearray(base64.b64decode(backup["data"]))
+        raw[-1] ^= 0x01
+        backup["data"] = base64.b64encode(bytes(raw)).decode()
+
+        with pytest.raises(InvalidTag):
+            manager.restore_from_backup(json.dumps(backup), "correct horse")
+
+    def test_legacy_fernet_backup(self, manager):
+        """Test backups written before AES-GCM (no "cipher" field) restore"""
+        salt = manager.generate_salt()
+        key = manager._derive_raw_key("correct horse", salt, KeyDerivationFunction.SCRYPT)
+        backup = json.dumps({
+            "salt": base64.b64encode(salt).decode(),
+            "data": base64.b64encode(
+                Fernet(base64.urlsafe_b64encode(key)).encrypt(json.dumps({"a": 1}).encode())
+            ).decode(),
+            "created_at": "2024-01-01T00:00:00",
+            "kdf": "scrypt"
+        })
+
+        assert manager.restore_from_backup(backup, "correct horse") == {"a": 1}
@@ -0,0 +1,195 @@
+import json
+import pytest
+from app.security import rate_limiter as rate_limiter_module
+from app.security.rate_limiter import AdvancedRateLimiter, RateLimitTier
+
+# The limiter's decisions live in Lua scripts; fakeredis runs them with lupa
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+class TestRateLimiterScripts:
+    """Test cases for the Lua rate limit scripts against fakeredis"""
+
+    @pytest.fixture
+    def server(self):
+        return fakeredis.FakeServer()
+
+    @pytest.fixture
+    def limiter(self, server, monkeypatch):
+        monkeypatch.setattr(
+            rate_limiter_module.redis.BlockingConnectionPool,
+            "from_url",
+            lambda url, **kwargs: fakeredis.FakeAsyncRedis(server=server).connection_pool
+        )
+        return AdvancedRateLimiter()
+
+    @pytest.fixture
+    def redis_client(self, server):
+        return fakeredis.FakeAsyncRedis(server=server)
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_limit(self, limiter):
+        """Test the sliding log admits up to the limit and then rejects"""
+        results = [
+            await limiter.check_rate_limit_sliding("user:1", "requests", RateLimitTier.FREE)
+            for _ in range(21)
+        ]
+
+        assert all(result.allowed for result in results[:20])
+        assert results[19].remaining == 0
+        assert not results[20].allowed
+        assert results[20].retry_after > 0
+
+    @pytest.mark.asyncio
+    async def test_sliding_window_rejection_not_recorded(self, limiter, redis_client):
+        """Test rejected requests do not add log entries"""
+        for _ in range(25):
+            await limiter.check_rate_limit_sliding("user:1", "requests", RateLimitTier.FREE)
+
+        key = limiter._get_sliding_window_key("user:1", "requests", "minute")
+        assert await redis_client.zcard(key) == 20
+
+    @pytest.mark.asyncio
+    async def test_fixed_window_limit(self, limiter, redis_client):
+        """Test the fixed window counter stops at the limit"""
+        results = [
+            await limiter.check_rate_limit_fixed("user:1", "agent_executions", RateLimitTier.FREE)
+            for _ in range(11)
+        ]
+
+        assert all(result.allowed for result in results[:10])
+        assert not results[10].allowed
+        assert results[10].current == 10
+
+        key = limiter._get_counter_key("user:1", "agent_executions", "hour")
+        assert int(await redis_client.get(key)) == 10
+        assert await redis_client.ttl(key) > 0
+
+    @pytest.mark.asyncio
+    async def test_preflight_allows(self, limiter):
+        """Test a clean identifier passes every check"""
+        result = await limiter.preflight("ip:1", "requests_per_minute")
+
+        assert not result.blacklisted
+        assert not result.whitelisted
+        assert result.burst_ok
+        assert result.rate_limit.allowed
+        assert result.rate_limit.current == 1
+
+    @pytest.mark.asyncio
+    async def test_preflight_blacklist_hash(self, limiter):
+        """Test a blacklist hash entry blocks with its reason"""
+        await limiter.blacklist_identifier("ip:1", "spam", 3600)
+
+        result = await limiter.preflight("ip:1", "requests_per_minute")
+
+        assert result.blacklisted
+        assert result.reason == "spam"
+        assert result.rate_limit is None
+
+    @pytest.mark.asyncio
+    async def test_preflight_blacklist_legacy(self, limiter, redis_client):
+        """Test a legacy JSON string blacklist entry blocks with its reason"""
+        await redis_client.set("blacklist:ip:1", json.dumps({"reason": "legacy abuse"}))
+
+        result = await limiter.preflight("ip:1", "requests_per_minute")
+
+        assert result.blacklisted
+        assert result.reason == "legacy abuse"
+
+    @pytest.mark.asyncio
+    async def test_preflight_blacklist_before_whitelist(self, limiter, redis_client):
+        """Test the blacklist wins over a whitelist, also when cached"""
+        await limiter.whitelist_identifier("ip:1")
+        assert (await limiter.preflight("ip:1", "requests_per_minute")).whitelisted
+
+        # Blacklisted by another worker, bypassing this process's cache
+        await redis_client.hset("blacklist:ip:1", mapping={"reason": "abuse"})
+
+        result = await limiter.preflight("ip:1", "requests_per_minute")
+        assert result.blacklisted
+
+    @pytest.mark.asyncio
+    async def test_preflight_whitelist(self, limiter, redis_client):
+        """Test whitelisted identifiers skip burst and rate limits"""
+        await limiter.whitelist_identifier("ip:1")
+
+        for _ in range(30):
+            result = await limiter.preflight("ip:1", "requests_per_minute", max_burst=2)
+            assert result.whitelisted
+            assert result.rate_limit is None
+
+        key = limiter._get_sliding_window_key("ip:1", "requests", "minute")
+        assert await redis_client.zcard(key) == 0
+
+    @pytest.mark.asyncio
+    async def test_preflight_burst(self, limiter):
+        """Test burst protection trips after max_burst requests"""
+        results = [
+            await limiter.preflight("ip:1", "requests_per_minute", max_burst=3)
+            for _ in range(4)
+        ]
+
+        assert all(result.burst_ok for result in results[:3])
+        assert not results[3].burst_ok
+        assert results[3].rate_limit is None
+
+    @pytest.mark.asyncio
+    async def test_preflight_limit_reached(self, limiter):
+        """Test the sliding-window limit applies after blacklist, whitelist and burst"""
+        results = [
+            await limiter.preflight("ip:1", "requests_per_minute", max_burst=100)
+            for _ in range(21)
+        ]
+
+        assert all(result.rate_limit.allowed for result in results[:20])
+        assert not results[20].rate_limit.allowed
+        assert results[20].rate_limit.remaining == 0
+
+    @pytest.mark.asyncio
+    async def test_preflight_unlimited(self, limiter, redis_client):
+        """Test unlimited tiers are admitted without a log entry"""
+        result = await limiter.preflight("ip:1", "requests_per_minute", RateLimitTier.ENTERPRISE)
+
+        assert result.rate_limit.allowed
+        assert result.rate_limit.limit == -1
+
+        key = limiter._get_sliding_window_key("ip:1", "requests", "minute")
+        assert await redis_client.zcard(key) == 0
+
+    @pytest.mark.asyncio
+    async def test_preflight_records_pending(self, limiter, redis_client):
+        """Test requests admitted from the local bucket are recorded on the next sync"""
+        key = limiter._get_sliding_window_key("ip:1", "requests", "minute")
+
+        await limiter.preflight("ip:1", "requests_per_minute", local_bucket=True)
+        for _ in range(3):
+            result = await limiter.preflight("ip:1", "requests_per_minute", local_bucket=True)
+            assert result.rate_limit.allowed
+
+        # Admitted locally, not yet in Redis
+        assert await redis_client.zcard(key) == 1
+
+        # Force the next request through Redis
+        limiter._local_buckets["ip:1"]["requests_per_minute"][3] -= limiter.local_bucket_sync_interval
+        await limiter.preflight("ip:1", "requests_per_minute", local_bucket=True)
+
+        assert await redis_client.zcard(key) == 5
+        assert limiter._local_buckets["ip:1"]["requests_per_minute"][2] == 0
+
+    @pytest.mark.asyncio
+    async def test_preflight_local_bucket_burst(self, limiter, redis_client):
+        """Test requests admitted from the local bucket count towards the burst limit"""
+        key = limiter._get_sliding_window_key("ip:1", "requests", "minute")
+
+        results = [
+            await limiter.preflight("ip:1", "requests_per_minute", max_burst=3, local_bucket=True)
+            for _ in range(4)
+        ]
+
+        assert all(result.burst_ok for result in results[:3])
+        assert not results[3].burst_ok
+        assert int(await redis_client.get("burst:ip:1")) == 4
+        # The locally admitted requests are still recorded
+        assert await redis_client.zcard(key) == 3